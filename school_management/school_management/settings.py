@@ -21,6 +21,9 @@ AUTH_USER_MODEL = 'student_management_app.CustomUser'
 MEDIA_URL="/media/"
 MEDIA_ROOT=os.path.join(BASE_DIR,"media")
 
+# Threads rendering profile picture thumbnails, see profile_pictures.py
+PROFILE_PIC_WORKERS = int(os.environ.get('PROFILE_PIC_WORKERS', 2))
+
 STATIC_URL="/static/"
 STATIC_ROOT=os.path.join(BASE_DIR,"static")
 
@@ -60,6 +63,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per view query counts and timings, served as JSON at /query_profile/
+if os.environ.get('QUERY_PROFILER') == '1':
+    MIDDLEWARE.insert(0, 'student_management_app.middleware.QueryProfilerMiddleware')
+
+QUERY_PROFILER_BUFFER_SIZE = 5000
+# query templates whose text is kept for the summary, by fingerprint
+QUERY_PROFILER_STATEMENTS = 500
+
+# Requests running more queries than this are logged, None disables it
+QUERY_PROFILER_BUDGET = (int(os.environ['QUERY_PROFILER_BUDGET'])
+                         if os.environ.get('QUERY_PROFILER_BUDGET') else None)
+
 ROOT_URLCONF = 'school_management.urls'
 
 TEMPLATES = [
@@ -73,6 +88,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'student_management_app.notifications.unread_notifications',
             ],
         },
     },
@@ -84,13 +100,133 @@ WSGI_APPLICATION = 'school_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Picked with DATABASE_PROFILE:
+#   development  SQLite with Django's defaults, one connection per request
+#   sqlite       SQLite tuned for concurrent writers, see SQLITE_PRAGMAS
+#   postgres     PostgreSQL configured from the POSTGRES_* variables
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'development')
+
+# Seconds a connection is reused across requests by the production profiles
+DATABASE_CONN_MAX_AGE = int(os.environ.get('DATABASE_CONN_MAX_AGE', 600))
+
+DATABASE_PROFILES = {
+    'development': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('POSTGRES_DB', 'school_management'),
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': 5,
+        },
+    },
+}
+
+DATABASES = {
+    'default': DATABASE_PROFILES[DATABASE_PROFILE],
+}
+
+# Applied to every new SQLite connection by student_management_app.database.
+# WAL lets readers run alongside the writer, NORMAL syncs at checkpoints
+# rather than on every commit, and writers wait for the lock (milliseconds)
+# instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+} if DATABASE_PROFILE == 'sqlite' else {}
+
+# Cache of the computed dashboards, locmem by default. Set DASHBOARD_CACHE_BACKEND
+# to "file" or "redis" (with REDIS_URL) to share it between worker processes.
+DASHBOARD_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboards',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DASHBOARD_CACHE_DIR',
+                                   os.path.join(BASE_DIR, 'cache', 'dashboards')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+# Stamp of the filter of taken usernames and emails (availability.py). The
+# filter answers most checks without a query, but only while this cache is
+# shared by every worker process, so it is file based by default; set
+# AVAILABILITY_CACHE_BACKEND to "redis" when the workers run on several
+# hosts. With "locmem" every check is looked up in the database.
+AVAILABILITY_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'availability',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('AVAILABILITY_CACHE_DIR',
+                                   os.path.join(BASE_DIR, 'cache', 'availability')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboards': DASHBOARD_CACHE_BACKENDS[
+        os.environ.get('DASHBOARD_CACHE_BACKEND', 'locmem')],
+    'availability': AVAILABILITY_CACHE_BACKENDS[
+        os.environ.get('AVAILABILITY_CACHE_BACKEND', 'file')],
 }
 
+DASHBOARD_CACHE = 'dashboards'
+
+# Seconds a dashboard may be served from cache, bounds staleness of changes
+# made outside the ORM signals
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Course and semister choice lists of the student forms, cached under a
+# version stamp that the model signals replace
+CHOICES_CACHE = 'default'
+CHOICES_CACHE_TIMEOUT = 3600
+
+# Per user unread notification counters behind the notification badge;
+# use a cache shared by every worker (e.g. Redis) when running several
+NOTIFICATION_CACHE = 'default'
+NOTIFICATION_CACHE_TIMEOUT = 300
+
+# Stamp telling each worker to rebuild its filter of taken usernames and
+# emails after another process added users, see AVAILABILITY_CACHE_BACKENDS.
+# Filters are rebuilt after AVAILABILITY_FILTER_TIMEOUT seconds in any case
+AVAILABILITY_CACHE = 'availability'
+AVAILABILITY_FILTER_TIMEOUT = 300
+
+# Server-sent event streams (EventViews): events queued per stream, seconds
+# between keepalive comments, and seconds before a stream is ended for the
+# browser to reconnect
+EVENT_QUEUE_SIZE = 50
+EVENT_KEEPALIVE = 20
+EVENT_STREAM_MAX_AGE = 600
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
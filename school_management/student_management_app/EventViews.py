@@ -0,0 +1,75 @@
+'''
+Server-sent events stream of the logged in user.
+
+Served by the ASGI application (school_management/asgi.py): each open
+stream is a suspended coroutine waiting on its events.broker queue, so
+thousands of idle browsers hold no worker thread. The stream starts with
+the unread notification count, then pushes new notifications, feedback
+replies and leave decisions as they are committed, with a comment line
+every EVENT_KEEPALIVE seconds. It ends after EVENT_STREAM_MAX_AGE seconds
+and EventSource reconnects by itself, so streams whose client vanished
+unnoticed do not pile up.
+'''
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .events import broker, format_event
+from .models import CustomUser
+from .notifications import unread_count
+
+
+@sync_to_async
+def stream_user(request):
+    user = get_user(request)
+    if not user.is_authenticated or \
+            user.user_type not in (CustomUser.STAFF, CustomUser.STUDENT):
+        return None
+    return user
+
+
+async def events(subscription, unread: int):
+    keepalive = getattr(settings, 'EVENT_KEEPALIVE', 20)
+    ends = time.monotonic() + getattr(settings, 'EVENT_STREAM_MAX_AGE', 600)
+    try:
+        yield 'retry: 5000\n\n'
+        yield format_event({"type": "unread", "count": unread})
+        while True:
+            remaining = ends - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(), min(keepalive, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def event_stream(request):
+    user = await stream_user(request)
+    if user is None:
+        return JsonResponse({"error": "Only staff and students have events"},
+                            status=403)
+
+    # subscribed before the count is read, so an event committed in
+    # between is queued rather than lost
+    subscription = broker.subscribe(user.id)
+    try:
+        unread = await sync_to_async(unread_count)(user)
+    except BaseException:
+        broker.unsubscribe(subscription)
+        raise
+    response = StreamingHttpResponse(events(subscription, unread),
+                                     content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx would otherwise buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,148 @@
+from typing import Dict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import QuerySet
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import (
+    Students, Staffs, Subjects, LeaveReportStudent, LeaveReportStaff,
+    FeedBackStudent, FeedBackStaffs
+)
+from .pagination import KeysetPagination
+from .permissions import IsHOD
+from .search import DEFAULT_LIMIT, SearchError, search_people
+from .serialiser import (
+    StudentListSerializer, StaffListSerializer, SubjectListSerializer,
+    LeaveReportStudentSerializer, LeaveReportStaffSerializer,
+    FeedBackStudentSerializer, FeedBackStaffsSerializer
+)
+
+
+class HodListView(ListAPIView):
+    '''
+    Paginated list for the HOD manage pages.
+
+    Rows are served newest first with keyset pagination, and each query
+    parameter named in `filters` narrows the queryset with its lookup.
+    '''
+    permission_classes = [IsAuthenticated, IsHOD]
+    pagination_class = KeysetPagination
+    filters: Dict[str, str] = {}
+
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+        for param, lookup in self.filters.items():
+            value = self.request.query_params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: value})
+            except (DjangoValidationError, ValueError):
+                raise ValidationError({param: f'Invalid value {value!r}'})
+        return queryset
+
+
+class StudentListView(HodListView):
+    queryset = Students.objects.select_related('admin', 'course_id')
+    serializer_class = StudentListSerializer
+    filters = {
+        'course': 'course_id',
+        'semister': 'semister_year_id',
+        'gender': 'gender',
+    }
+
+
+class StaffListView(HodListView):
+    queryset = Staffs.objects.select_related('admin')
+    serializer_class = StaffListSerializer
+
+
+class SubjectListView(HodListView):
+    queryset = Subjects.objects.select_related('course_id', 'staff_id')
+    serializer_class = SubjectListSerializer
+    filters = {
+        'course': 'course_id',
+        'staff': 'staff_id',
+    }
+
+
+class LeaveReportStudentListView(HodListView):
+    queryset = LeaveReportStudent.objects.select_related('student_id__admin')
+    serializer_class = LeaveReportStudentSerializer
+    filters = {
+        'status': 'leave_status',
+        'course': 'student_id__course_id',
+        'semister': 'student_id__semister_year_id',
+        # leaves overlapping from..to, e.g. who is on leave this week
+        'from': 'leave_end__gte',
+        'to': 'leave_start__lte',
+    }
+
+
+class LeaveReportStaffListView(HodListView):
+    queryset = LeaveReportStaff.objects.select_related('staff_id__admin')
+    serializer_class = LeaveReportStaffSerializer
+    filters = {
+        'status': 'leave_status',
+        'from': 'leave_end__gte',
+        'to': 'leave_start__lte',
+    }
+
+
+class FeedBackStudentListView(HodListView):
+    queryset = FeedBackStudent.objects.select_related('student_id__admin')
+    serializer_class = FeedBackStudentSerializer
+    filters = {
+        'course': 'student_id__course_id',
+        'semister': 'student_id__semister_year_id',
+    }
+
+    def get_queryset(self) -> QuerySet:
+        return filter_replied(super().get_queryset(), self.request)
+
+
+class FeedBackStaffsListView(HodListView):
+    queryset = FeedBackStaffs.objects.select_related('staff_id__admin')
+    serializer_class = FeedBackStaffsSerializer
+
+    def get_queryset(self) -> QuerySet:
+        return filter_replied(super().get_queryset(), self.request)
+
+
+def filter_replied(queryset: QuerySet, request) -> QuerySet:
+    """
+    Applies the ?status=replied|pending filter of the feedback lists.
+    """
+    status = request.query_params.get('status')
+    if status == 'replied':
+        return queryset.exclude(feedback_reply='')
+    if status == 'pending':
+        return queryset.filter(feedback_reply='')
+    if status:
+        raise ValidationError({'status': 'Use replied or pending'})
+    return queryset
+
+
+class PeopleSearchView(APIView):
+    """
+    Typeahead search of students and staff, see search.search_people.
+
+    Query parameters: q, the text typed so far; kind, student, staff or
+    hod; limit, at most search.MAX_LIMIT.
+    """
+    permission_classes = [IsAuthenticated, IsHOD]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            results = search_people(params.get('q', ''),
+                                    kind=params.get('kind') or None,
+                                    limit=params.get('limit', DEFAULT_LIMIT))
+        except SearchError as error:
+            return Response({"status": "Error", "errors": error.errors},
+                            status=400)
+        return Response({"results": results})
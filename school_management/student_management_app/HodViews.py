@@ -1,96 +1,49 @@
 from django.shortcuts import render, redirect 
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse 
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse 
 from django.contrib import messages 
-from django.core.files.storage import FileSystemStorage 
 from django.urls import reverse 
+from django.db import transaction 
 from django.views.decorators.csrf import csrf_exempt 
+import datetime 
 import json 
 
 from .forms import AddStudentForm, EditStudentForm 
+from .dashboard import admin_home_context 
+from .dashboard_cache import HOD, cache_stats, cached_dashboard 
+from .middleware import profile_summary 
+from .attendance import attendance_dates, register_statuses 
+from .availability import AvailabilityError, check_availability, taken_values 
+from .exports import EXPORT_FORMATS, attendance_export_rows, stream_export 
+from .leaves import LeaveError, moderate_leaves 
+from .notifications import BroadcastError, broadcast 
+from .utils import is_uuid, stream_json_array 
+from .pagination import keyset_page 
+from .profile_pictures import ProfilePictureError, attach_profile_pic 
+from . import HodApiViews, student_import 
 
-from .models import CustomUser, Staffs, Courses, Subjects, Students, SemisterModel, FeedBackStudent, FeedBackStaffs, LeaveReportStudent, LeaveReportStaff, Attendance, AttendanceReport 
+from .models import CustomUser, Staffs, Courses, Subjects, Students, SemisterModel, FeedBackStudent, FeedBackStaffs 
 
 
-def admin_home(request): 
-	
-	all_student_count = Students.objects.all().count() 
-	subject_count = Subjects.objects.all().count() 
-	course_count = Courses.objects.all().count() 
-	staff_count = Staffs.objects.all().count() 
-	course_all = Courses.objects.all() 
-	course_name_list = [] 
-	subject_count_list = [] 
-	student_count_list_in_course = [] 
-
-	for course in course_all: 
-		subjects = Subjects.objects.filter(course_id=course.id).count() 
-		students = Students.objects.filter(course_id=course.id).count() 
-		course_name_list.append(course.course_name) 
-		subject_count_list.append(subjects) 
-		student_count_list_in_course.append(students) 
-	
-	subject_all = Subjects.objects.all() 
-	subject_list = [] 
-	student_count_list_in_subject = [] 
-	for subject in subject_all: 
-		course = Courses.objects.get(id=subject.course_id.id) 
-		student_count = Students.objects.filter(course_id=course.id).count() 
-		subject_list.append(subject.subject_name) 
-		student_count_list_in_subject.append(student_count) 
-	
-	# For Saffs 
-	staff_attendance_present_list=[] 
-	staff_attendance_leave_list=[] 
-	staff_name_list=[] 
-
-	staffs = Staffs.objects.all() 
-	for staff in staffs: 
-		subject_ids = Subjects.objects.filter(staff_id=staff.admin.id) 
-		attendance = Attendance.objects.filter(subject_id__in=subject_ids).count() 
-		leaves = LeaveReportStaff.objects.filter(staff_id=staff.id, 
-												leave_status=1).count() 
-		staff_attendance_present_list.append(attendance) 
-		staff_attendance_leave_list.append(leaves) 
-		staff_name_list.append(staff.admin.first_name) 
-
-	# For Students 
-	student_attendance_present_list=[] 
-	student_attendance_leave_list=[] 
-	student_name_list=[] 
-
-	students = Students.objects.all() 
-	for student in students: 
-		attendance = AttendanceReport.objects.filter(student_id=student.id, 
-													status=True).count() 
-		absent = AttendanceReport.objects.filter(student_id=student.id, 
-												status=False).count() 
-		leaves = LeaveReportStudent.objects.filter(student_id=student.id, 
-												leave_status=1).count() 
-		student_attendance_present_list.append(attendance) 
-		student_attendance_leave_list.append(leaves+absent) 
-		student_name_list.append(student.admin.first_name) 
+def first_page(queryset, api_name): 
+	# Newest rows of a manage page and the API link to the following ones 
+	rows, cursor = keyset_page(queryset) 
+	next_page = f"{reverse(api_name)}?cursor={cursor}" if cursor else None 
+	return rows, next_page 
 
 
-	context={ 
-		"all_student_count": all_student_count, 
-		"subject_count": subject_count, 
-		"course_count": course_count, 
-		"staff_count": staff_count, 
-		"course_name_list": course_name_list, 
-		"subject_count_list": subject_count_list, 
-		"student_count_list_in_course": student_count_list_in_course, 
-		"subject_list": subject_list, 
-		"student_count_list_in_subject": student_count_list_in_subject, 
-		"staff_attendance_present_list": staff_attendance_present_list, 
-		"staff_attendance_leave_list": staff_attendance_leave_list, 
-		"staff_name_list": staff_name_list, 
-		"student_attendance_present_list": student_attendance_present_list, 
-		"student_attendance_leave_list": student_attendance_leave_list, 
-		"student_name_list": student_name_list, 
-	} 
+def admin_home(request): 
+	context = cached_dashboard(HOD, request.user.id, admin_home_context) 
 	return render(request, "hod_template/home_content.html", context) 
 
 
+def dashboard_cache_stats(request): 
+	# Hit and miss counters of the dashboard cache, for HODs only 
+	if not request.user.is_authenticated or request.user.user_type != CustomUser.HOD: 
+		return JsonResponse({"error": "Only HODs can view cache statistics"}, 
+							status=403) 
+	return JsonResponse(cache_stats()) 
+
+
 def add_staff(request): 
 	return render(request, "hod_template/add_staff_template.html") 
 
@@ -125,9 +78,11 @@ def add_staff_save(request):
 
 
 def manage_staff(request): 
-	staffs = Staffs.objects.all() 
+	# First page only, the template fetches the rest from next_page 
+	staffs, next_page = first_page(HodApiViews.StaffListView.queryset, "api_staffs") 
 	context = { 
-		"staffs": staffs 
+		"staffs": staffs, 
+		"next_page": next_page 
 	} 
 	return render(request, "hod_template/manage_staff_template.html", context) 
 
@@ -357,36 +312,33 @@ def add_student_save(request):
 			course_id = form.cleaned_data['course_id'] 
 			gender = form.cleaned_data['gender'] 
 
-			
-			if len(request.FILES) != 0: 
-				profile_pic = request.FILES['profile_pic'] 
-				fs = FileSystemStorage() 
-				filename = fs.save(profile_pic.name, profile_pic) 
-				profile_pic_url = fs.url(filename) 
-			else: 
-				profile_pic_url = None
-
+			# Stored by content hash, resized copies are made in the background 
+			profile_pic = request.FILES.get('profile_pic') 
 
 			try: 
-				user = CustomUser.objects.create_user(username=username, 
-													password=password, 
-													email=email, 
-													first_name=first_name, 
-													last_name=last_name, 
-													user_type=3) 
-				user.students.address = address 
-
-				course_obj = Courses.objects.get(id=course_id) 
-				user.students.course_id = course_obj 
-
-				session_year_obj = SemisterModel.objects.get(id=session_year_id) 
-				user.students.session_year_id = session_year_obj 
-
-				user.students.gender = gender 
-				user.students.profile_pic = profile_pic_url 
-				user.save() 
+				with transaction.atomic(): 
+					user = CustomUser.objects.create_user(username=username, 
+														password=password, 
+														email=email, 
+														first_name=first_name, 
+														last_name=last_name, 
+														user_type=CustomUser.STUDENT) 
+
+					course_obj = Courses.objects.get(id=course_id) 
+					session_year_obj = SemisterModel.objects.get(id=session_year_id) 
+					student = Students.objects.create(admin=user, 
+													address=address, 
+													course_id=course_obj, 
+													semister_year_id=session_year_obj, 
+													gender=gender) 
+					if profile_pic is not None: 
+						attach_profile_pic(student, profile_pic) 
 				messages.success(request, "Student Added Successfully!") 
 				return redirect('add_student') 
+			except ProfilePictureError: 
+				# the transaction is rolled back, the student is not created 
+				messages.error(request, "Failed to Add Student! The profile picture is not an image.") 
+				return redirect('add_student') 
 			except: 
 				messages.error(request, "Failed to Add Student!") 
 				return redirect('add_student') 
@@ -394,10 +346,42 @@ def add_student_save(request):
 			return redirect('add_student') 
 
 
+def import_students(request): 
+	# Bulk enrolment from a CSV or JSON file, for HODs only 
+	if not request.user.is_authenticated or request.user.user_type != CustomUser.HOD: 
+		return JsonResponse({"error": "Only HODs can import students"}, 
+							status=403) 
+	if request.method != "POST": 
+		return JsonResponse({"error": "Invalid Method"}, status=405) 
+	upload = request.FILES.get("file") 
+	if upload is None: 
+		return JsonResponse({"error": "Upload the students as file"}, status=400) 
+
+	file_format = "json" if upload.name.lower().endswith(".json") else "csv" 
+	try: 
+		content = upload.read().decode("utf-8-sig") 
+		rows = student_import.validate_students( 
+			student_import.read_rows(content, file_format)) 
+	except UnicodeDecodeError: 
+		return JsonResponse({"status": "Error", 
+							"errors": [{"row": None, "error": "file is not UTF-8"}]}, 
+							status=400) 
+	except student_import.StudentImportError as error: 
+		return JsonResponse({"status": "Error", "errors": error.errors}, 
+							status=400) 
+
+	# Every row is valid, the hashing progress is streamed and the rows are 
+	# committed before the last line, whether or not the client still reads 
+	return StreamingHttpResponse(student_import.progress_lines(rows), 
+								content_type="application/x-ndjson") 
+
+
 def manage_student(request): 
-	students = Students.objects.all() 
+	# First page only, the template fetches the rest from next_page 
+	students, next_page = first_page(HodApiViews.StudentListView.queryset, "api_students") 
 	context = { 
-		"students": students 
+		"students": students, 
+		"next_page": next_page 
 	} 
 	return render(request, 'hod_template/manage_student_template.html', context) 
 
@@ -447,45 +431,42 @@ def edit_student_save(request):
 			gender = form.cleaned_data['gender'] 
 			session_year_id = form.cleaned_data['session_year_id'] 
 
-			# Getting Profile Pic first 
-			# First Check whether the file is selected or not 
-			# Upload only if file is selected 
-			if len(request.FILES) != 0: 
-				profile_pic = request.FILES['profile_pic'] 
-				fs = FileSystemStorage() 
-				filename = fs.save(profile_pic.name, profile_pic) 
-				profile_pic_url = fs.url(filename) 
-			else: 
-				profile_pic_url = None
+			# Upload only if file is selected, stored by content hash and 
+			# resized in the background 
+			profile_pic = request.FILES.get('profile_pic') 
 
 			try: 
-				# First Update into Custom User Model 
-				user = CustomUser.objects.get(id=student_id) 
-				user.first_name = first_name 
-				user.last_name = last_name 
-				user.email = email 
-				user.username = username 
-				user.save() 
-
-				# Then Update Students Table 
-				student_model = Students.objects.get(admin=student_id) 
-				student_model.address = address 
-
-				course = Courses.objects.get(id=course_id) 
-				student_model.course_id = course 
-
-				session_year_obj = SemisterModel.objects.get(id=session_year_id) 
-				student_model.session_year_id = session_year_obj 
-
-				student_model.gender = gender 
-				if profile_pic_url != None: 
-					student_model.profile_pic = profile_pic_url 
-				student_model.save() 
+				with transaction.atomic(): 
+					# First Update into Custom User Model 
+					user = CustomUser.objects.get(id=student_id) 
+					user.first_name = first_name 
+					user.last_name = last_name 
+					user.email = email 
+					user.username = username 
+					user.save() 
+
+					# Then Update Students Table 
+					student_model = Students.objects.get(admin=student_id) 
+					student_model.address = address 
+
+					course = Courses.objects.get(id=course_id) 
+					student_model.course_id = course 
+
+					session_year_obj = SemisterModel.objects.get(id=session_year_id) 
+					student_model.semister_year_id = session_year_obj 
+
+					student_model.gender = gender 
+					student_model.save() 
+					if profile_pic is not None: 
+						attach_profile_pic(student_model, profile_pic) 
 				# Delete student_id SESSION after the data is updated 
 				del request.session['student_id'] 
 
 				messages.success(request, "Student Updated Successfully!") 
 				return redirect('/edit_student/'+student_id) 
+			except ProfilePictureError: 
+				messages.error(request, "Failed to Update Student. The profile picture is not an image.") 
+				return redirect('/edit_student/'+student_id) 
 			except: 
 				messages.success(request, "Failed to Uupdate Student.") 
 				return redirect('/edit_student/'+student_id) 
@@ -541,9 +522,11 @@ def add_subject_save(request):
 
 
 def manage_subject(request): 
-	subjects = Subjects.objects.all() 
+	# First page only, the template fetches the rest from next_page 
+	subjects, next_page = first_page(HodApiViews.SubjectListView.queryset, "api_subjects") 
 	context = { 
-		"subjects": subjects 
+		"subjects": subjects, 
+		"next_page": next_page 
 	} 
 	return render(request, 'hod_template/manage_subject_template.html', context) 
 
@@ -608,27 +591,50 @@ def delete_subject(request, subject_id):
 
 @csrf_exempt
 def check_email_exist(request): 
-	email = request.POST.get("email") 
-	if CustomUser.objects.filter(email=email).exists():  
-		return HttpResponse(True) 
-	else: 
-		return HttpResponse(False) 
+	email = request.POST.get("email") or "" 
+	_, taken_emails = taken_values((), [email]) 
+	return HttpResponse(email.lower() in taken_emails) 
 
 
 @csrf_exempt
 def check_username_exist(request): 
-	username = request.POST.get("username") 
-	if CustomUser.objects.filter(username=username).exists():
-		return HttpResponse(True) 
-	else: 
-		return HttpResponse(False) 
+	username = request.POST.get("username") or "" 
+	taken_usernames, _ = taken_values([username], ()) 
+	return HttpResponse(username in taken_usernames) 
+
+
+@csrf_exempt
+def check_availability_view(request): 
+	# many usernames and emails per request, e.g. every row of an enrolment 
+	# file, for HODs only since it would otherwise list the accounts in bulk; 
+	# usernames and emails are JSON lists 
+	if not request.user.is_authenticated or request.user.user_type != CustomUser.HOD: 
+		return JsonResponse({"error": "Only HODs can check names in bulk"}, 
+							status=403) 
+	if request.method != "POST": 
+		return JsonResponse({"error": "Invalid Method"}, status=405) 
+
+	try: 
+		available = check_availability(json.loads(request.POST.get("usernames") or "[]"), 
+									json.loads(request.POST.get("emails") or "[]")) 
+	except AvailabilityError as error: 
+		return JsonResponse({"status": "Error", "errors": error.errors}, 
+							status=400) 
+	except (TypeError, ValueError): 
+		return JsonResponse({"status": "Error", 
+							"errors": [{"field": None, "error": "malformed request"}]}, 
+							status=400) 
+
+	return JsonResponse({"status": "OK", **available}) 
 
 
 
 def student_feedback_message(request): 
-	feedbacks = FeedBackStudent.objects.all() 
+	# First page only, the template fetches the rest from next_page 
+	feedbacks, next_page = first_page(HodApiViews.FeedBackStudentListView.queryset, "api_student_feedback") 
 	context = { 
-		"feedbacks": feedbacks 
+		"feedbacks": feedbacks, 
+		"next_page": next_page 
 	} 
 	return render(request, 'hod_template/student_feedback_template.html', context) 
 
@@ -649,9 +655,11 @@ def student_feedback_message_reply(request):
 
 
 def staff_feedback_message(request): 
-	feedbacks = FeedBackStaffs.objects.all() 
+	# First page only, the template fetches the rest from next_page 
+	feedbacks, next_page = first_page(HodApiViews.FeedBackStaffsListView.queryset, "api_staff_feedback") 
 	context = { 
-		"feedbacks": feedbacks 
+		"feedbacks": feedbacks, 
+		"next_page": next_page 
 	} 
 	return render(request, 'hod_template/staff_feedback_template.html', context) 
 
@@ -671,45 +679,65 @@ def staff_feedback_message_reply(request):
 
 
 def student_leave_view(request): 
-	leaves = LeaveReportStudent.objects.all() 
+	# First page only, the template fetches the rest from next_page 
+	leaves, next_page = first_page(HodApiViews.LeaveReportStudentListView.queryset, "api_student_leaves") 
 	context = { 
-		"leaves": leaves 
+		"leaves": leaves, 
+		"next_page": next_page 
 	} 
 	return render(request, 'hod_template/student_leave_view.html', context) 
 
 def student_leave_approve(request, leave_id): 
-	leave = LeaveReportStudent.objects.get(id=leave_id) 
-	leave.leave_status = 1
-	leave.save() 
+	try: 
+		summary = moderate_leaves("student", [leave_id], "approve") 
+	except LeaveError: 
+		messages.error(request, "Invalid leave") 
+	else: 
+		if summary["missing"]: 
+			messages.error(request, "Leave not found") 
 	return redirect('student_leave_view') 
 
 
 def student_leave_reject(request, leave_id): 
-	leave = LeaveReportStudent.objects.get(id=leave_id) 
-	leave.leave_status = 2
-	leave.save() 
+	try: 
+		summary = moderate_leaves("student", [leave_id], "reject") 
+	except LeaveError: 
+		messages.error(request, "Invalid leave") 
+	else: 
+		if summary["missing"]: 
+			messages.error(request, "Leave not found") 
 	return redirect('student_leave_view') 
 
 
 def staff_leave_view(request): 
-	leaves = LeaveReportStaff.objects.all() 
+	# First page only, the template fetches the rest from next_page 
+	leaves, next_page = first_page(HodApiViews.LeaveReportStaffListView.queryset, "api_staff_leaves") 
 	context = { 
-		"leaves": leaves 
+		"leaves": leaves, 
+		"next_page": next_page 
 	} 
 	return render(request, 'hod_template/staff_leave_view.html', context) 
 
 
 def staff_leave_approve(request, leave_id): 
-	leave = LeaveReportStaff.objects.get(id=leave_id) 
-	leave.leave_status = 1
-	leave.save() 
+	try: 
+		summary = moderate_leaves("staff", [leave_id], "approve") 
+	except LeaveError: 
+		messages.error(request, "Invalid leave") 
+	else: 
+		if summary["missing"]: 
+			messages.error(request, "Leave not found") 
 	return redirect('staff_leave_view') 
 
 
 def staff_leave_reject(request, leave_id): 
-	leave = LeaveReportStaff.objects.get(id=leave_id) 
-	leave.leave_status = 2
-	leave.save() 
+	try: 
+		summary = moderate_leaves("staff", [leave_id], "reject") 
+	except LeaveError: 
+		messages.error(request, "Invalid leave") 
+	else: 
+		if summary["missing"]: 
+			messages.error(request, "Leave not found") 
 	return redirect('staff_leave_view') 
 
 
@@ -728,27 +756,12 @@ def admin_get_attendance_dates(request):
 	
 	subject_id = request.POST.get("subject") 
 	session_year = request.POST.get("session_year_id") 
+	if not (is_uuid(subject_id) and is_uuid(session_year)): 
+		return JsonResponse({"error": "Invalid subject or session year"}, status=400) 
 
-	# Students enroll to Course, Course has Subjects 
-	# Getting all data from subject model based on subject_id 
-	subject_model = Subjects.objects.get(id=subject_id) 
-
-	session_model = SemisterModel.objects.get(id=session_year) 
-	attendance = Attendance.objects.filter(subject_id=subject_model, 
-										session_year_id=session_model) 
-
-	# Only Passing Student Id and Student Name Only 
-	list_data = [] 
-
-	for attendance_single in attendance: 
-		data_small={"id":attendance_single.id, 
-					"attendance_date":str(attendance_single.attendance_date), 
-					"session_year_id":attendance_single.session_year_id.id} 
-		list_data.append(data_small) 
-
-	return JsonResponse(json.dumps(list_data), 
-						content_type="application/json", 
-						safe=False) 
+	# Attendance Id, Date and Session Year in a single query, read from 
+	# the archive when the semister is archived 
+	return stream_json_array(attendance_dates(subject_id, session_year)) 
 
 
 @csrf_exempt
@@ -756,19 +769,99 @@ def admin_get_attendance_student(request):
 	
 	# Getting Values from Ajax POST 'Fetch Student' 
 	attendance_date = request.POST.get('attendance_date') 
-	attendance = Attendance.objects.get(id=attendance_date) 
+	if not is_uuid(attendance_date): 
+		return JsonResponse({"error": "Invalid attendance"}, status=400) 
 
-	attendance_data = AttendanceReport.objects.filter(attendance_id=attendance) 
-	# Only Passing Student Id and Student Name Only 
-	list_data = [] 
+	# Student Id, Student Name and Status, read in a single query 
+	return stream_json_array(register_statuses(attendance_date)) 
 
-	for student in attendance_data: 
-		data_small={"id":student.student_id.admin.id, 
-					"name":student.student_id.admin.first_name+" "+student.student_id.admin.last_name, 
-					"status":student.status} 
-		list_data.append(data_small) 
 
-	return JsonResponse(json.dumps(list_data), content_type="application/json", safe=False) 
+@csrf_exempt
+def moderate_leaves_view(request): 
+	# approves or rejects many leaves at once, for HODs only; ids is a JSON 
+	# list of leave ids, kind is student or staff, action approve or reject 
+	if not request.user.is_authenticated or request.user.user_type != CustomUser.HOD: 
+		return JsonResponse({"error": "Only HODs can moderate leaves"}, 
+							status=403) 
+	if request.method != "POST": 
+		return JsonResponse({"error": "Invalid Method"}, status=405) 
+
+	try: 
+		summary = moderate_leaves(request.POST.get("kind"), 
+								json.loads(request.POST.get("ids")), 
+								request.POST.get("action")) 
+	except LeaveError as error: 
+		return JsonResponse({"status": "Error", "errors": error.errors}, 
+							status=400) 
+	except (TypeError, ValueError): 
+		return JsonResponse({"status": "Error", 
+							"errors": [{"id": None, "error": "malformed request"}]}, 
+							status=400) 
+
+	return JsonResponse({"status": "OK", **summary}) 
+
+
+@csrf_exempt
+def broadcast_notification(request): 
+	# one notification per student and staff member of the target, for HODs 
+	# only; course, subject, semister and role (student or staff) narrow it 
+	if not request.user.is_authenticated or request.user.user_type != CustomUser.HOD: 
+		return JsonResponse({"error": "Only HODs can broadcast notifications"}, 
+							status=403) 
+	if request.method != "POST": 
+		return JsonResponse({"error": "Invalid Method"}, status=405) 
+
+	targets = {name: request.POST.get(name) or None 
+				for name in ("course", "subject", "semister")} 
+	invalid = [{"field": name, "error": "invalid id"} 
+				for name, value in targets.items() if value and not is_uuid(value)] 
+	if invalid: 
+		return JsonResponse({"status": "Error", "errors": invalid}, status=400) 
+	try: 
+		sent = broadcast(request.POST.get("message"), role=request.POST.get("role") or None, 
+						**targets) 
+	except BroadcastError as error: 
+		return JsonResponse({"status": "Error", "errors": error.errors}, 
+							status=400) 
+
+	return JsonResponse({"status": "OK", "sent": sent}) 
+
+
+def export_attendance(request): 
+	# Attendance register of a semister as CSV or XLSX, for HODs only 
+	if not request.user.is_authenticated or request.user.user_type != CustomUser.HOD: 
+		return JsonResponse({"error": "Only HODs can export attendance"}, 
+							status=403) 
+
+	semister_id = request.GET.get("semister") 
+	course_id = request.GET.get("course") or None 
+	subject_id = request.GET.get("subject") or None 
+	export_format = request.GET.get("format", "csv") 
+	if export_format not in EXPORT_FORMATS: 
+		return JsonResponse({"error": "Use format=csv or format=xlsx"}, status=400) 
+	if not is_uuid(semister_id) or not all( 
+			is_uuid(value) for value in (course_id, subject_id) if value): 
+		return JsonResponse({"error": "Invalid semister, course or subject"}, 
+							status=400) 
+	try: 
+		date_from, date_to = ( 
+			datetime.date.fromisoformat(value) if value else None 
+			for value in (request.GET.get("date_from"), request.GET.get("date_to"))) 
+	except ValueError: 
+		return JsonResponse({"error": "Dates must be YYYY-MM-DD"}, status=400) 
+
+	# Rows are read in chunks and encoded as they arrive 
+	rows = attendance_export_rows(semister_id, course_id, subject_id, 
+								date_from, date_to) 
+	return stream_export(rows, export_format, f"attendance-{semister_id}") 
+
+
+def query_profile(request): 
+	# Per view timings collected by QueryProfilerMiddleware, for HODs only 
+	if not request.user.is_authenticated or request.user.user_type != CustomUser.HOD: 
+		return JsonResponse({"error": "Only HODs can view the query profile"}, 
+							status=403) 
+	return JsonResponse(profile_summary()) 
 
 
 def admin_profile(request): 
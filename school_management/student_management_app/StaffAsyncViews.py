@@ -0,0 +1,86 @@
+'''
+Async versions of the staff attendance AJAX endpoints.
+
+They answer the same requests as their StaffViews counterparts. Under the
+ASGI application (school_management/asgi.py) a request waiting on the
+database does not hold a worker, so a burst of registers submitted at the
+same time queues on the database rather than on the server.
+'''
+import json
+
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+
+from .attendance import (
+    AttendanceError, aattendance_dates, acourse_roster, asave_register,
+    aupdate_register
+)
+from .utils import is_uuid, stream_json_array
+
+
+def csrf_exempt(view):
+    # django.views.decorators.csrf.csrf_exempt hides coroutine views from
+    # the handler before Django 5.0, so only the flag is set here
+    view.csrf_exempt = True
+    return view
+
+
+def malformed_request() -> JsonResponse:
+    return JsonResponse({"status": "Error",
+                         "errors": [{"id": None, "error": "malformed request"}]},
+                        status=400)
+
+
+@csrf_exempt
+async def get_students(request):
+    subject_id = request.POST.get("subject")
+    session_year = request.POST.get("session_year")
+    if not (is_uuid(subject_id) and is_uuid(session_year)):
+        return JsonResponse({"error": "Invalid subject or session year"},
+                            status=400)
+    return stream_json_array(acourse_roster(subject_id, session_year))
+
+
+@csrf_exempt
+async def get_attendance_dates(request):
+    subject_id = request.POST.get("subject")
+    session_year = request.POST.get("session_year_id")
+    if not (is_uuid(subject_id) and is_uuid(session_year)):
+        return JsonResponse({"error": "Invalid subject or session year"},
+                            status=400)
+    return stream_json_array(aattendance_dates(subject_id, session_year))
+
+
+@csrf_exempt
+async def save_attendance_data(request):
+    try:
+        entries = json.loads(request.POST.get("student_ids"))
+        attendance = await asave_register(
+            request.POST.get("subject_id"),
+            request.POST.get("session_year_id"),
+            request.POST.get("attendance_date"),
+            entries)
+    except AttendanceError as error:
+        return JsonResponse({"status": "Error", "errors": error.errors},
+                            status=400)
+    except (TypeError, ValueError, ValidationError):
+        return malformed_request()
+
+    return JsonResponse({"status": "OK",
+                         "attendance_id": attendance.id,
+                         "saved": len(entries)})
+
+
+@csrf_exempt
+async def update_attendance_data(request):
+    try:
+        entries = json.loads(request.POST.get("student_ids"))
+        summary = await aupdate_register(
+            request.POST.get("attendance_date"), entries)
+    except AttendanceError as error:
+        return JsonResponse({"status": "Error", "errors": error.errors},
+                            status=400)
+    except (TypeError, ValueError, ValidationError):
+        return malformed_request()
+
+    return JsonResponse({"status": "OK", **summary})
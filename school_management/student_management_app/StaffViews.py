@@ -1,82 +1,25 @@
 from django.shortcuts import render, redirect 
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse 
+from django.http import HttpRequest, HttpResponseRedirect, JsonResponse 
 from django.contrib import messages 
 from django.core.files.storage import FileSystemStorage 
 from django.urls import reverse 
 from django.views.decorators.csrf import csrf_exempt 
 from django.core import serializers 
+from django.core.exceptions import ValidationError 
 import json 
 from typing import Dict
 
 
-from .models import CustomUser, Staffs, Courses, Subjects, Students, SemisterModel, Attendance, AttendanceReport, LeaveReportStaff, FeedBackStaffs, StudentResult 
+from .attendance import AttendanceError, attendance_dates, course_roster, register_statuses, save_register, update_register 
+from .dashboard import cached_staff_home_context 
+from .leaves import LEAVE_PENDING, LeaveError, leave_dates 
+from .results import ResultsError, save_mark_sheet 
+from .utils import is_uuid, stream_json_array 
+from .models import CustomUser, Staffs, Subjects, SemisterModel, LeaveReportStaff, FeedBackStaffs 
 
 
 def staff_home(request): 
-	
-	# Fetching All Students under Staff 
-	print(request.user.id) 
-	subjects = Subjects.objects.filter(staff_id=request.user.id) 
-	print(subjects) 
-	course_id_list = [] 
-	for subject in subjects: 
-		course = Courses.objects.get(id=subject.course_id.id) 
-		course_id_list.append(course.id) 
-
-	final_course = [] 
-	# Removing Duplicate Course Id 
-	for course_id in course_id_list: 
-		if course_id not in final_course: 
-			final_course.append(course_id) 
-			
-	print(final_course) 
-	students_count = Students.objects.filter(course_id__in=final_course).count() 
-	subject_count = subjects.count() 
-	print(subject_count) 
-	print(students_count) 
-	
-	# Fetch All Attendance Count 
-	attendance_count = Attendance.objects.filter(subject_id__in=subjects).count() 
-	
-	# Fetch All Approve Leave 
-	# print(request.user) 
-	print(request.user.user_type) 
-	staff = Staffs.objects.get(admin=request.user.id) 
-	leave_count = LeaveReportStaff.objects.filter(staff_id=staff.id, 
-												leave_status=1).count() 
-
-	# Fetch Attendance Data by Subjects 
-	subject_list = [] 
-	attendance_list = [] 
-	for subject in subjects: 
-		attendance_count1 = Attendance.objects.filter(subject_id=subject.id).count() 
-		subject_list.append(subject.subject_name) 
-		attendance_list.append(attendance_count1) 
-
-	students_attendance = Students.objects.filter(course_id__in=final_course) 
-	student_list = [] 
-	student_list_attendance_present = [] 
-	student_list_attendance_absent = [] 
-	for student in students_attendance: 
-		attendance_present_count = AttendanceReport.objects.filter(status=True, 
-																student_id=student.id).count() 
-		attendance_absent_count = AttendanceReport.objects.filter(status=False, 
-																student_id=student.id).count() 
-		student_list.append(student.admin.first_name+" "+ student.admin.last_name) 
-		student_list_attendance_present.append(attendance_present_count) 
-		student_list_attendance_absent.append(attendance_absent_count) 
-
-	context={ 
-		"students_count": students_count, 
-		"attendance_count": attendance_count, 
-		"leave_count": leave_count, 
-		"subject_count": subject_count, 
-		"subject_list": subject_list, 
-		"attendance_list": attendance_list, 
-		"student_list": student_list, 
-		"attendance_present_list": student_list_attendance_present, 
-		"attendance_absent_list": student_list_attendance_absent 
-	} 
+	context = cached_staff_home_context(request.user.id) 
 	return render(request, "staff_template/staff_home_template.html", context) 
 
 
@@ -104,17 +47,23 @@ def staff_apply_leave(request):
 def staff_apply_leave_save(request): 
 	if request.method == "POST": 
 		
-		leave_date = request.POST.get('leave_date') 
+		# a one day leave only posts leave_start (or the older leave_date) 
+		leave_start = request.POST.get('leave_start') or request.POST.get('leave_date') 
+		leave_end = request.POST.get('leave_end') 
 		leave_message = request.POST.get('leave_message') 
 
 		staff_obj = Staffs.objects.get(admin=request.user.id) 
 		try: 
+			leave_start, leave_end = leave_dates(leave_start, leave_end) 
 			leave_report = LeaveReportStaff(staff_id=staff_obj, 
-											leave_date=leave_date, 
+											leave_start=leave_start, 
+											leave_end=leave_end, 
 											leave_message=leave_message, 
-											leave_status=0) 
+											leave_status=LEAVE_PENDING) 
 			leave_report.save() 
 			messages.success(request, "Applied for Leave.") 
+		except LeaveError as error: 
+			messages.error(request, error.errors[0]["error"]) 
 		except: 
 			messages.error(request, "Failed to Apply Leave")
 	else:
@@ -152,25 +101,12 @@ def get_students(request):
 	
 	subject_id = request.POST.get("subject") 
 	session_year = request.POST.get("session_year") 
+	if not (is_uuid(subject_id) and is_uuid(session_year)): 
+		return JsonResponse({"error": "Invalid subject or session year"}, status=400) 
 
 	# Students enroll to Course, Course has Subjects 
-	# Getting all data from subject model based on subject_id 
-	subject_model = Subjects.objects.get(id=subject_id) 
-
-	session_model = SemisterModel.objects.get(id=session_year) 
-
-	students = Students.objects.filter(course_id=subject_model.course_id, 
-									session_year_id=session_model) 
-
-	# Only Passing Student Id and Student Name Only 
-	list_data = [] 
-
-	for student in students: 
-		data_small={"id":student.admin.id, 
-					"name":student.admin.first_name+" "+student.admin.last_name} 
-		list_data.append(data_small) 
-
-	return JsonResponse(json.dumps(list_data), content_type="application/json", safe=False) 
+	# Only Passing Student Id and Student Name, read in a single query 
+	return stream_json_array(course_roster(subject_id, session_year)) 
 
 
 
@@ -179,34 +115,27 @@ def get_students(request):
 def save_attendance_data(request): 
 	
 	# Get Values from Staf Take Attendance form via AJAX (JavaScript) 
-	# Use getlist to access HTML Array/List Input Data 
+	# student_ids is a JSON list of {"id": <admin id>, "status": <bool>} 
 	student_ids = request.POST.get("student_ids") 
 	subject_id = request.POST.get("subject_id") 
 	attendance_date = request.POST.get("attendance_date") 
 	session_year_id = request.POST.get("session_year_id") 
 
-	subject_model = Subjects.objects.get(id=subject_id) 
-	session_year_model = SemisterModel.objects.get(id=session_year_id) 
-
-	json_student = json.loads(student_ids) 
-	
 	try: 
-		# First Attendance Data is Saved on Attendance Model 
-		attendance = Attendance(subject_id=subject_model, 
-								attendance_date=attendance_date, 
-								session_year_id=session_year_model) 
-		attendance.save() 
+		json_student = json.loads(student_ids) 
+		attendance = save_register(subject_id, session_year_id, 
+								attendance_date, json_student) 
+	except AttendanceError as error: 
+		return JsonResponse({"status": "Error", "errors": error.errors}, 
+							status=400) 
+	except (TypeError, ValueError, ValidationError): 
+		return JsonResponse({"status": "Error", 
+							"errors": [{"id": None, "error": "malformed request"}]}, 
+							status=400) 
 
-		for stud in json_student: 
-			# Attendance of Individual Student saved on AttendanceReport Model 
-			student = Students.objects.get(admin=stud['id']) 
-			attendance_report = AttendanceReport(student_id=student, 
-												attendance_id=attendance, 
-												status=stud['status']) 
-			attendance_report.save() 
-		return HttpResponse("OK") 
-	except: 
-		return HttpResponse("Error") 
+	return JsonResponse({"status": "OK", 
+						"attendance_id": attendance.id, 
+						"saved": len(json_student)}) 
 
 
 
@@ -227,26 +156,11 @@ def get_attendance_dates(request):
 	# Getting Values from Ajax POST 'Fetch Student' 
 	subject_id = request.POST.get("subject") 
 	session_year = request.POST.get("session_year_id") 
+	if not (is_uuid(subject_id) and is_uuid(session_year)): 
+		return JsonResponse({"error": "Invalid subject or session year"}, status=400) 
 
-	# Students enroll to Course, Course has Subjects 
-	# Getting all data from subject model based on subject_id 
-	subject_model = Subjects.objects.get(id=subject_id) 
-
-	session_model = SemisterModel.objects.get(id=session_year) 
-	attendance = Attendance.objects.filter(subject_id=subject_model, 
-										session_year_id=session_model) 
-
-	# Only Passing Student Id and Student Name Only 
-	list_data = [] 
-
-	for attendance_single in attendance: 
-		data_small={"id":attendance_single.id, 
-					"attendance_date":str(attendance_single.attendance_date), 
-					"session_year_id":attendance_single.session_year_id.id} 
-		list_data.append(data_small) 
-
-	return JsonResponse(json.dumps(list_data), 
-						content_type="application/json", safe=False) 
+	# Only Passing Attendance Id, Date and Session Year, read in a single query 
+	return stream_json_array(attendance_dates(subject_id, session_year)) 
 
 
 @csrf_exempt
@@ -254,46 +168,30 @@ def get_attendance_student(request):
 	
 	# Getting Values from Ajax POST 'Fetch Student' 
 	attendance_date = request.POST.get('attendance_date') 
-	attendance = Attendance.objects.get(id=attendance_date) 
+	if not is_uuid(attendance_date): 
+		return JsonResponse({"error": "Invalid attendance"}, status=400) 
 
-	attendance_data = AttendanceReport.objects.filter(attendance_id=attendance) 
-	# Only Passing Student Id and Student Name Only 
-	list_data = [] 
-
-	for student in attendance_data: 
-		data_small={"id":student.student_id.admin.id, 
-					"name":student.student_id.admin.first_name+" "+student.student_id.admin.last_name, "status":student.status} 
-		list_data.append(data_small) 
-
-	return JsonResponse(json.dumps(list_data), 
-						content_type="application/json", 
-						safe=False) 
+	# Student Id, Student Name and Status, read in a single query 
+	return stream_json_array(register_statuses(attendance_date)) 
 
 
 @csrf_exempt
 def update_attendance_data(request): 
 	student_ids = request.POST.get("student_ids") 
-
 	attendance_date = request.POST.get("attendance_date") 
-	attendance = Attendance.objects.get(id=attendance_date) 
-
-	json_student = json.loads(student_ids) 
 
 	try: 
-		
-		for stud in json_student: 
-			
-			# Attendance of Individual Student saved on AttendanceReport Model 
-			student = Students.objects.get(admin=stud['id']) 
+		json_student = json.loads(student_ids) 
+		summary = update_register(attendance_date, json_student) 
+	except AttendanceError as error: 
+		return JsonResponse({"status": "Error", "errors": error.errors}, 
+							status=400) 
+	except (TypeError, ValueError, ValidationError): 
+		return JsonResponse({"status": "Error", 
+							"errors": [{"id": None, "error": "malformed request"}]}, 
+							status=400) 
 
-			attendance_report = AttendanceReport.objects.get(student_id=student, 
-															attendance_id=attendance) 
-			attendance_report.status=stud['status'] 
-
-			attendance_report.save() 
-		return HttpResponse("OK") 
-	except Exception: 
-		return HttpResponse("Error") 
+	return JsonResponse({"status": "OK", **summary}) 
 
 
 def staff_profile(request): 
@@ -347,35 +245,48 @@ def staff_add_result(request):
 
 
 def staff_add_result_save(request): 
-	if request.method == "POST":  
-		student_admin_id = request.POST.get('student_list')
-		assignment_marks = request.POST.get('assignment_marks')
-		exam_marks = request.POST.get('exam_marks')
-		subject_id = request.POST.get('subject') 
+	if request.method != "POST": 
+		messages.error(request, "Invalid Method") 
+		return redirect('staff_add_result') 
 
-		student_obj = Students.objects.get(admin=student_admin_id)
-		subject_obj = Subjects.objects.get(id=subject_id) 
+	# a one row mark sheet 
+	entry = { 
+		"id": request.POST.get('student_list'), 
+		"assignment_marks": request.POST.get('assignment_marks'), 
+		"exam_marks": request.POST.get('exam_marks'), 
+	} 
+	try: 
+		summary = save_mark_sheet(request.POST.get('subject'), [entry], 
+								request.user.id) 
+	except (ResultsError, ValidationError): 
+		messages.error(request, "Failed to Add Result!") 
+	else: 
+		if summary["created"]: 
+			messages.success(request, "Result Added Successfully!") 
+		else: 
+			messages.success(request, "Result Updated Successfully!") 
+	return redirect('staff_add_result') 
 
-		try: 
-			result = add_student_result(student_obj, subject_obj)
-			result.save()
-		except Exception: 
-			messages.error(request, "Failed to Add Result!")
-		finally:
-			return redirect('staff_add_result')
-	messages.error(request, "Invalid Method")
-	return redirect('staff_add_result')
-
-def add_student_result(student: Students, subject: Subjects) -> StudentResult:
-	if result := StudentResult.objects.filter(subject_id=subject, student_id=student).first():
-		result.subject_assignment_marks = assignment_marks
-		result.subject_exam_marks = exam_marks
-		messages.success(request, "Result Updated Successfully!")
-	else:
-		result = StudentResult(
-			student_id=student_obj, subject_exam_marks=exam_marks,
-            subject_id=subject_obj,
-            subject_assignment_marks=assignment_marks)
-		messages.success(request, "Result Added Successfully!")
-	return result
 
+@csrf_exempt
+def staff_save_results(request): 
+	# whole mark sheet of a subject, results is a JSON list of 
+	# {"id": <student admin id>, "assignment_marks", "exam_marks"} 
+	if not (request.user.is_authenticated and request.user.user_type == CustomUser.STAFF): 
+		return JsonResponse({"error": "Forbidden"}, status=403) 
+	if request.method != "POST": 
+		return JsonResponse({"error": "Invalid Method"}, status=405) 
+
+	try: 
+		entries = json.loads(request.POST.get("results")) 
+		summary = save_mark_sheet(request.POST.get("subject"), entries, 
+								request.user.id) 
+	except ResultsError as error: 
+		return JsonResponse({"status": "Error", "errors": error.errors}, 
+							status=400) 
+	except (TypeError, ValueError, ValidationError): 
+		return JsonResponse({"status": "Error", 
+							"errors": [{"id": None, "error": "malformed request"}]}, 
+							status=400) 
+
+	return JsonResponse({"status": "OK", **summary}) 
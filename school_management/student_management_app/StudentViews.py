@@ -4,55 +4,87 @@ from rest_framework import status
 from rest_framework import permissions 
 import datetime
 from .models import (
-    CustomUser, Staffs, Courses, Subjects, Students, Attendance,
-    AttendanceReport, LeaveReportStudent, FeedBackStudent,
-    StudentResult
+    CustomUser, Staffs, Courses, Subjects, Students, LeaveReportStudent,
+    FeedBackStudent, StudentResult
 )
+from .dashboard_cache import STUDENT, cached_dashboard
 from .serialiser import (
     StudentSerialiser, CustomUserSerializer,
     SubjectSerializer, StudentResultSerializer)
-from django.db.models import Q
+from django.db.models import FilteredRelation, Q, Sum
+from django.db.models.functions import Coalesce
 from typing import Dict
 from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
 from rest_framework.permissions import IsAuthenticated
+from .permissions import IsStudent
 
 
 def student_home(request: HttpRequest) ->HttpResponse:
-    student_obj = Students.objects.select_related(
-        'course_id'
-        ).get(admin=request.user.id)
+    context = cached_dashboard(STUDENT, request.user.id,
+                               lambda: student_home_context(request.user))
+    return render(request, "student_template/student_home_template.html",
+                  context)
 
-    attendance_data = AttendanceReport.objects.filter(student_id=student_obj).aggregate(
-        total_attendance=Count('id'),
-        attendance_present=Count('id', filter=Q(status=True)),
-        attendance_absent=Count('id', filter=Q(status=False)),
-    )
 
-    total_subjects = Subjects.objects.filter(
-        course_id=student_obj.course_id
-        ).count()
-    
+def student_home_context(user: CustomUser) -> Dict:
+    """
+    Builds the student dashboard: the subjects of the student's course, each
+    annotated with the student's attendance counters summed over every
+    semister, in one grouped query.
+
+    Args:
+        user: the CustomUser of the student.
+
+    Returns:
+        dict with the overall totals and the per subject series.
+    """
+    student_id, course_id = Students.objects.values_list(
+        'id', 'course_id').get(admin=user.id)
+    # the student condition goes in the join, so only their counters are read
+    subjects = Subjects.objects.filter(course_id=course_id).annotate(
+        mine=FilteredRelation(
+            'attendancesummary',
+            condition=Q(attendancesummary__student_id=student_id)),
+    ).annotate(
+        present=Coalesce(Sum('mine__present'), 0),
+        absent=Coalesce(Sum('mine__absent'), 0),
+        total=Coalesce(Sum('mine__total'), 0),
+    ).order_by('subject_name').values_list(
+        'subject_name', 'present', 'absent', 'total')
+
     subject_name = [] 
     data_present = [] 
     data_absent = [] 
-    subject_data = Subjects.objects.filter(course_id=student_obj.course_id) 
-    for subject in subject_data: 
-        attendance = Attendance.objects.filter(subject_id=subject.id) 
-        attendance_present_count = AttendanceReport.objects.filter(
-            attendance_id__in=attendance, 
-            status=True, 
-            student_id=student_obj.id
-            ).count() 
-        attendance_absent_count = AttendanceReport.objects.filter(
-            attendance_id__in=attendance, 
-            status=False, 
-            student_id=student_obj.id
-            ).count() 
-        subject_name.append(subject.subject_name) 
-        data_present.append(attendance_present_count) 
-        data_absent.append(attendance_absent_count)
+    total_attendance = 0
+    for name, present, absent, total in subjects:
+        subject_name.append(name) 
+        data_present.append(present) 
+        data_absent.append(absent)
+        total_attendance += total
+
+    return {
+        'total_attendance': total_attendance,
+        'attendance_present': sum(data_present),
+        'attendance_absent': sum(data_absent),
+        'total_subjects': len(subject_name),
+        'subject_name': subject_name,
+        'data_present': data_present,
+        'data_absent': data_absent,
+    }
+
+
+class StudentHome(APIView):
+    '''
+    The student dashboard as JSON, for the mobile client
+    '''
+    permission_classes = [IsAuthenticated, IsStudent]
+
+    def get(self, request, *args, **kwargs) ->Response:
+        return Response(cached_dashboard(
+            STUDENT, request.user.id,
+            lambda: student_home_context(request.user)))
 
-    return render(request, "student_template/student_home_template.html")
   
 class StudentProfile(APIView):
 
@@ -0,0 +1,289 @@
+'''
+Archive of the attendance of closed semisters.
+
+Once a semister has ended its sessions and reports only serve history, yet
+they keep the hot AttendanceReport table and its indexes growing every
+term. archive_semister() moves them, a batch of sessions per transaction,
+into ArchivedAttendance and the compact ArchivedAttendanceReport (no
+timestamps, integer key); the sessions keep their ids. A SemisterArchive
+row records the progress and the totals, so an interrupted run is resumed
+by running it again, and verify_semister() checks the result.
+
+The AttendanceSummary counters of an archived semister are left as they
+are: the dashboards and the student pages keep reading them, and
+rebuild_summaries() skips archived semisters. The other reads only reach
+the archive tables when an archived semister, or one of its sessions, is
+asked for explicitly; they look the state up in SemisterArchive, and
+writes into a semister with an archive state are refused.
+'''
+import datetime
+import itertools
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from django.db import connections, transaction
+from django.db.models import Count, F, Q, QuerySet
+from django.utils import timezone
+
+from .models import (
+    SemisterModel, Attendance, AttendanceReport, AttendanceSummary,
+    SemisterArchive, ArchivedAttendance, ArchivedAttendanceReport
+)
+
+
+RUNNING = SemisterArchive.RUNNING
+DONE = SemisterArchive.DONE
+
+
+class ArchiveError(Exception):
+    '''
+    raised when a semister cannot be archived, nothing has been moved
+    '''
+
+
+def archive_state(semister_year_id: Any) -> Optional[str]:
+    """
+    Read from SemisterArchive with one query on its unique semister index,
+    so every process routes its reads by the same state the moment a run
+    starts or finishes.
+
+    Returns:
+        RUNNING or DONE, or None when the semister is not archived.
+    """
+    try:
+        semister_year_id = str(uuid.UUID(str(semister_year_id)))
+    except ValueError:
+        return None
+    return SemisterArchive.objects.filter(
+        semister_year_id=semister_year_id,
+    ).values_list('status', flat=True).first()
+
+
+def closed_semisters(today: Optional[datetime.date] = None) -> QuerySet:
+    """
+    Semisters that ended before today, oldest first.
+    """
+    return SemisterModel.objects.filter(
+        semister_ends__lt=today or datetime.date.today(),
+    ).order_by('semister_starts')
+
+
+def fast_delete(queryset: QuerySet) -> int:
+    """
+    Deletes the rows of a queryset with one DELETE statement.
+
+    QuerySet.delete() loads every row to send post_delete, which the
+    dashboard receivers listen to; archiving moves rows without changing
+    any number, so nothing needs to be told.
+
+    Returns:
+        number of rows deleted.
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    sql, params = queryset.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(model._meta.db_table)} '
+            f'WHERE {quote(model._meta.pk.column)} IN ({sql})', params)
+        return cursor.rowcount
+
+
+def archive_batch(state: SemisterArchive, batch_size: int) -> int:
+    """
+    Moves up to batch_size sessions of a semister, with their reports, into
+    the archive tables in one transaction.
+
+    Returns:
+        number of sessions moved, 0 once none are left.
+    """
+    with transaction.atomic():
+        sessions = list(
+            Attendance.objects.filter(
+                semister_year_id=state.semister_year_id_id,
+            ).order_by('id').values_list(
+                'id', 'subject_id', 'attendance_date')[:batch_size])
+        if not sessions:
+            return 0
+        session_ids = [session_id for session_id, _, _ in sessions]
+
+        ArchivedAttendance.objects.bulk_create([
+            ArchivedAttendance(
+                id=session_id, subject_id_id=subject_id,
+                semister_year_id_id=state.semister_year_id_id,
+                attendance_date=attendance_date)
+            for session_id, subject_id, attendance_date in sessions
+        ])
+        reports = AttendanceReport.objects.filter(
+            attendance_id__in=session_ids)
+        archived = [
+            ArchivedAttendanceReport(
+                attendance_id_id=attendance_id, student_id_id=student_id,
+                status=status)
+            for attendance_id, student_id, status in
+            reports.values_list('attendance_id', 'student_id', 'status')
+        ]
+        ArchivedAttendanceReport.objects.bulk_create(archived,
+                                                     batch_size=2000)
+
+        fast_delete(reports)
+        fast_delete(Attendance.objects.filter(id__in=session_ids))
+        SemisterArchive.objects.filter(pk=state.pk).update(
+            sessions=F('sessions') + len(sessions),
+            reports=F('reports') + len(archived),
+            present=F('present') + sum(report.status for report in archived))
+    return len(sessions)
+
+
+def archive_semister(semister_year_id: Any, batch_size: int = 200,
+                     progress: Optional[Callable[[SemisterArchive], None]]
+                     = None) -> SemisterArchive:
+    """
+    Moves the attendance of a closed semister into the archive tables.
+
+    Every batch commits on its own, so the run can be interrupted at any
+    point and resumed by calling it again.
+
+    Args:
+        semister_year_id: id of the SemisterModel.
+        batch_size: sessions moved per transaction.
+        progress: called with the SemisterArchive after every batch.
+
+    Returns:
+        the finished SemisterArchive.
+
+    Raises:
+        ArchiveError: when the semister does not exist or has not ended.
+    """
+    semister = SemisterModel.objects.filter(id=semister_year_id).first()
+    if semister is None:
+        raise ArchiveError('unknown semister')
+    if semister.semister_ends >= datetime.date.today():
+        raise ArchiveError(f'semister {semister} has not ended')
+
+    # from here on the reads also look into the archive tables
+    state, _ = SemisterArchive.objects.get_or_create(
+        semister_year_id=semister)
+    if state.status != RUNNING:
+        # sessions saved after a previous run are picked up as well
+        state.status = RUNNING
+        state.finished_at = None
+        state.save(update_fields=['status', 'finished_at'])
+
+    while archive_batch(state, batch_size):
+        if progress is not None:
+            state.refresh_from_db()
+            progress(state)
+
+    state.status = DONE
+    state.finished_at = timezone.now()
+    state.save(update_fields=['status', 'finished_at'])
+    # a register whose save began before the run and committed after the
+    # last batch would no longer be read once DONE; move it as well
+    while archive_batch(state, batch_size):
+        pass
+    state.refresh_from_db()
+    return state
+
+
+def verify_semister(semister_year_id: Any) -> List[Dict[str, Any]]:
+    """
+    Checks an archived semister: no session left behind, the archive
+    tables match the totals recorded while moving, and the stored
+    AttendanceSummary counters match the archived reports.
+
+    Returns:
+        list of the failed checks with the expected and found values; an
+        empty list means the archive is sound.
+    """
+    state = SemisterArchive.objects.filter(
+        semister_year_id=semister_year_id).first()
+    if state is None:
+        return [{"check": "archived", "expected": True, "found": False}]
+
+    problems = []
+
+    def check(name: str, expected: Any, found: Any, **key) -> None:
+        if expected != found:
+            problems.append({"check": name, **key,
+                             "expected": expected, "found": found})
+
+    check('status', DONE, state.status)
+    check('live sessions', 0, Attendance.objects.filter(
+        semister_year_id=semister_year_id).count())
+    check('sessions', state.sessions, ArchivedAttendance.objects.filter(
+        semister_year_id=semister_year_id).count())
+    reports = ArchivedAttendanceReport.objects.filter(
+        attendance_id__semister_year_id=semister_year_id)
+    totals = reports.aggregate(
+        reports=Count('id'), present=Count('id', filter=Q(status=True)))
+    check('reports', state.reports, totals['reports'])
+    check('present', state.present, totals['present'])
+
+    counters = ('present', 'absent', 'total')
+    stored = {
+        (row['student_id'], row['subject_id']):
+            tuple(row[counter] for counter in counters)
+        for row in AttendanceSummary.objects.filter(
+            semister_year_id=semister_year_id,
+        ).values('student_id', 'subject_id', *counters)
+    }
+    for row in reports.values(
+        'student_id', subject_id=F('attendance_id__subject_id'),
+    ).annotate(
+        present=Count('id', filter=Q(status=True)),
+        absent=Count('id', filter=Q(status=False)),
+        total=Count('id'),
+    ).order_by().iterator(chunk_size=2000):
+        key = (row['student_id'], row['subject_id'])
+        check('summary', tuple(row[counter] for counter in counters),
+              stored.pop(key, (0, 0, 0)),
+              student_id=key[0], subject_id=key[1])
+    for (student_id, subject_id), found in stored.items():
+        check('summary', (0, 0, 0), found,
+              student_id=student_id, subject_id=subject_id)
+    return problems
+
+
+# Read-through queries, used by attendance.py and exports.py once the
+# semister or the session asked for is known to be archived.
+
+def archived_sessions(subject_id: Any, semister_year_id: Any) -> QuerySet:
+    """
+    Archived counterpart of attendance.attendance_sessions().
+    """
+    return ArchivedAttendance.objects.filter(
+        subject_id=subject_id,
+        semister_year_id=semister_year_id,
+    ).order_by('attendance_date').values(
+        'id', 'attendance_date', 'semister_year_id')
+
+
+def archived_statuses(attendance_id: Any) -> QuerySet:
+    """
+    Archived counterpart of the reports read by
+    attendance.register_statuses().
+    """
+    return ArchivedAttendanceReport.objects.filter(
+        attendance_id=attendance_id,
+    ).values_list('student_id__admin_id', 'student_id__admin__first_name',
+                  'student_id__admin__last_name', 'status')
+
+
+def report_sources(semister_year_id: Any) -> List[Any]:
+    """
+    The report models holding the attendance of a semister: the live
+    table, the archive, or both while the semister is being archived.
+    """
+    state = archive_state(semister_year_id)
+    if state is None:
+        return [AttendanceReport]
+    if state == DONE:
+        return [ArchivedAttendanceReport]
+    return [AttendanceReport, ArchivedAttendanceReport]
+
+
+def chained(querysets: List[QuerySet], chunk_size: int) -> Iterator[Any]:
+    return itertools.chain.from_iterable(
+        queryset.iterator(chunk_size=chunk_size) for queryset in querysets)
@@ -0,0 +1,601 @@
+'''
+Set based write paths for attendance registers.
+
+The staff endpoints post a whole register at once, so every student of the
+register is resolved with a single query and all rows are written inside
+one transaction.
+'''
+import datetime
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, Q, QuerySet
+
+from .archive import archive_state, archived_sessions, archived_statuses
+from .dashboard_cache import invalidate_students
+from .models import (
+    Subjects, SemisterModel, Students, Attendance, AttendanceReport,
+    AttendanceSummary, SemisterArchive
+)
+
+
+class AttendanceError(Exception):
+    '''
+    raised when a register is rejected, nothing has been written
+    '''
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(f'{len(errors)} invalid attendance entries')
+        self.errors = errors
+
+
+def parse_register(entries: Any) -> Tuple[Dict[str, bool],
+                                          List[Dict[str, Any]]]:
+    """
+    Validates the posted register, a list of {"id": <admin id>,
+    "status": <bool>} objects.
+
+    Args:
+        entries: the decoded student_ids payload.
+
+    Returns:
+        tuple of the statuses keyed by student admin id and the list of
+        per-student errors found.
+    """
+    if not isinstance(entries, list):
+        return {}, [{"id": None, "error": "student_ids must be a list"}]
+
+    status_field = AttendanceReport._meta.get_field('status')
+    statuses = {}
+    errors = []
+    for entry in entries:
+        admin_id = entry.get('id') if isinstance(entry, dict) else None
+        if admin_id is None:
+            errors.append({"id": None, "error": "missing student id"})
+            continue
+        try:
+            admin_id = str(uuid.UUID(str(admin_id)))
+        except ValueError:
+            errors.append({"id": admin_id, "error": "invalid student id"})
+            continue
+        if admin_id in statuses:
+            errors.append({"id": admin_id, "error": "duplicate student"})
+            continue
+        try:
+            statuses[admin_id] = status_field.to_python(entry.get('status'))
+        except ValidationError:
+            errors.append({"id": admin_id, "error": "invalid status"})
+    return statuses, errors
+
+
+def resolve_students(admin_ids, course_id: Any
+                     ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Resolves student admin ids to Students primary keys in one query.
+
+    Args:
+        admin_ids: iterable of CustomUser ids of students.
+        course_id: id of the Courses of the register, only its students
+            may be marked.
+
+    Returns:
+        tuple of the Students id keyed by admin id (as str) and the errors
+        of the ids that are unknown or of another course.
+    """
+    found = {
+        str(admin_id): (student_id, student_course_id)
+        for admin_id, student_id, student_course_id in
+        Students.objects.filter(admin__in=list(admin_ids))
+        .values_list('admin_id', 'id', 'course_id')
+    }
+    students = {}
+    errors = []
+    for admin_id in admin_ids:
+        if admin_id not in found:
+            errors.append({"id": admin_id, "error": "unknown student"})
+        elif found[admin_id][1] != course_id:
+            errors.append({"id": admin_id, "error": "student not in course"})
+        else:
+            students[admin_id] = found[admin_id][0]
+    return students, errors
+
+
+def course_roster(subject_id: str, semister_year_id: str):
+    """
+    Lists the students taking a subject in a semister with one query.
+
+    Returns:
+        iterator of {"id": <admin id>, "name": <full name>} dicts.
+    """
+    rows = Students.objects.filter(
+        course_id__subjects=subject_id,
+        semister_year_id=semister_year_id,
+    ).values_list('admin_id', 'admin__first_name', 'admin__last_name')
+    for admin_id, first_name, last_name in rows.iterator():
+        yield {"id": admin_id, "name": f"{first_name} {last_name}"}
+
+
+def register_statuses(attendance_id: str):
+    """
+    Lists the reports of an attendance session with one query; a second
+    one reads the archive when the session has no live reports.
+
+    Returns:
+        iterator of {"id": <admin id>, "name": <full name>,
+        "status": <bool>} dicts.
+    """
+    rows = AttendanceReport.objects.filter(
+        attendance_id=attendance_id,
+    ).values_list('student_id__admin_id', 'student_id__admin__first_name',
+                  'student_id__admin__last_name', 'status')
+    found = False
+    for admin_id, first_name, last_name, status in rows.iterator():
+        found = True
+        yield {"id": admin_id, "name": f"{first_name} {last_name}",
+               "status": status}
+    if found:
+        return
+    # sessions keep their id when their semister is archived
+    rows = archived_statuses(attendance_id)
+    for admin_id, first_name, last_name, status in rows.iterator():
+        yield {"id": admin_id, "name": f"{first_name} {last_name}",
+               "status": status}
+
+
+def attendance_dates(subject_id: str, semister_year_id: str):
+    """
+    Lists the attendance sessions of a subject in a semister with one query.
+
+    Returns:
+        iterator of {"id", "attendance_date", "semister_year_id"} dicts.
+    """
+    return attendance_sessions(subject_id, semister_year_id).iterator()
+
+
+def attendance_sessions(subject_id: str, semister_year_id: str) -> QuerySet:
+    return semister_sessions(subject_id, semister_year_id,
+                             archive_state(semister_year_id))
+
+
+def semister_sessions(subject_id: str, semister_year_id: str,
+                      state: Optional[str]) -> QuerySet:
+    """
+    The sessions query of attendance_sessions(), against the live table,
+    the archive or, while the semister is being archived, both.
+
+    Args:
+        state: archive_state() of the semister.
+    """
+    live = Attendance.objects.filter(
+        subject_id=subject_id,
+        semister_year_id=semister_year_id,
+    ).order_by('attendance_date').values(
+        'id', 'attendance_date', 'semister_year_id')
+    if state is None:
+        return live
+    archived = archived_sessions(subject_id, semister_year_id)
+    if state == SemisterArchive.DONE:
+        return archived
+    return live.order_by().union(
+        archived.order_by(), all=True).order_by('attendance_date')
+
+
+def save_register(subject_id: str, semister_year_id: str,
+                  attendance_date: str, entries: Any) -> Attendance:
+    """
+    Records a new attendance session and one report per student.
+
+    The whole register is validated before anything is written; unknown
+    or malformed entries and students of another course reject the
+    register.
+
+    Args:
+        subject_id: id of the Subjects the attendance was taken for.
+        semister_year_id: id of the SemisterModel.
+        attendance_date: date of the session.
+        entries: the decoded student_ids payload.
+
+    Returns:
+        the saved Attendance.
+
+    Raises:
+        AttendanceError: with the per-student errors.
+    """
+    return write_register(
+        *validate_register(subject_id, semister_year_id, entries),
+        attendance_date=attendance_date)
+
+
+def validate_register(subject_id: str, semister_year_id: str,
+                      entries: Any) -> Tuple[Subjects, SemisterModel,
+                                             Dict[str, bool], Dict[str, Any]]:
+    """
+    Checks a register against the database, reading nothing but the
+    subject, the semister and the students.
+
+    Returns:
+        tuple of the Subjects, the SemisterModel, the statuses keyed by
+        student admin id and the Students ids keyed by admin id.
+
+    Raises:
+        AttendanceError: with the per-student errors.
+    """
+    statuses, errors = parse_register(entries)
+
+    subject = Subjects.objects.filter(id=subject_id).first()
+    if subject is None:
+        errors.append({"id": None, "error": "unknown subject"})
+    semister = SemisterModel.objects.filter(id=semister_year_id).first()
+    if semister is None:
+        errors.append({"id": None, "error": "unknown semister"})
+    elif archive_state(semister.id) is not None:
+        errors.append({"id": None, "error": "semister is archived"})
+
+    students, student_errors = resolve_students(
+        statuses, subject.course_id_id if subject else None)
+    errors.extend(student_errors)
+    if errors:
+        raise AttendanceError(errors)
+    return subject, semister, statuses, students
+
+
+def write_register(subject: Subjects, semister: SemisterModel,
+                   statuses: Dict[str, bool], students: Dict[str, Any],
+                   attendance_date: str) -> Attendance:
+    """
+    Writes a validated register: the session, its reports and the summary
+    counters, in one transaction.
+
+    Args:
+        subject: the Subjects the attendance was taken for.
+        semister: the SemisterModel of the session.
+        statuses: status keyed by student admin id, from parse_register.
+        students: Students id keyed by admin id, from resolve_students.
+        attendance_date: date of the session.
+
+    Returns:
+        the saved Attendance.
+    """
+    with transaction.atomic():
+        attendance = Attendance.objects.create(
+            subject_id=subject,
+            attendance_date=attendance_date,
+            semister_year_id=semister)
+        AttendanceReport.objects.bulk_create([
+            AttendanceReport(student_id_id=students[admin_id],
+                             attendance_id=attendance,
+                             status=status)
+            for admin_id, status in statuses.items()
+        ])
+        record_statuses(subject.id, semister.id, {
+            students[admin_id]: status
+            for admin_id, status in statuses.items()
+        })
+        student_ids = list(students.values())
+        transaction.on_commit(lambda: invalidate_students(student_ids))
+    return attendance
+
+
+def update_register(attendance_id: str, entries: Any) -> Dict[str, Any]:
+    """
+    Applies corrected statuses to an existing attendance session.
+
+    Every report of the session is loaded in one query, the statuses are
+    compared in memory and only the rows that changed are written back
+    with bulk_update in a single transaction.
+
+    Args:
+        attendance_id: id of the Attendance being corrected.
+        entries: the decoded student_ids payload.
+
+    Returns:
+        dict with the number of changed and unchanged rows and the admin
+        ids that have no report in this session.
+
+    Raises:
+        AttendanceError: when the payload or the session is invalid.
+    """
+    return write_corrections(*validate_corrections(attendance_id, entries))
+
+
+def validate_corrections(attendance_id: str, entries: Any
+                         ) -> Tuple[Dict[str, Any], Dict[str, bool],
+                                    Dict[str, AttendanceReport]]:
+    """
+    Checks corrections to a session and loads its reports in one query.
+
+    Returns:
+        tuple of the subject_id and semister_year_id of the session, the
+        statuses keyed by student admin id and the reports keyed by
+        student admin id.
+
+    Raises:
+        AttendanceError: when the payload or the session is invalid.
+    """
+    statuses, errors = parse_register(entries)
+    attendance = Attendance.objects.filter(id=attendance_id).values(
+        'subject_id', 'semister_year_id').first()
+    if attendance is None:
+        errors.append({"id": None, "error": "unknown attendance"})
+    if errors:
+        raise AttendanceError(errors)
+
+    reports = {
+        str(report.student_admin_id): report for report in
+        AttendanceReport.objects.filter(attendance_id=attendance_id)
+        .annotate(student_admin_id=F('student_id__admin_id'))
+    }
+    return attendance, statuses, reports
+
+
+def write_corrections(attendance: Dict[str, Any], statuses: Dict[str, bool],
+                      reports: Dict[str, AttendanceReport]) -> Dict[str, Any]:
+    """
+    Compares the posted statuses with the stored reports and writes back
+    the ones that changed, in one transaction.
+
+    Args:
+        attendance: subject_id and semister_year_id of the session.
+        statuses: status keyed by student admin id, from parse_register.
+        reports: the reports of the session keyed by student admin id.
+
+    Returns:
+        the summary returned by update_register.
+    """
+    today = datetime.date.today()
+    changed = []
+    missing = []
+    for admin_id, status in statuses.items():
+        report = reports.get(admin_id)
+        if report is None:
+            missing.append(admin_id)
+        elif report.status != status:
+            report.status = status
+            report.updated_at = today
+            changed.append(report)
+
+    with transaction.atomic():
+        AttendanceReport.objects.bulk_update(
+            changed, ['status', 'updated_at'])
+        record_corrections(
+            attendance['subject_id'], attendance['semister_year_id'],
+            {report.student_id_id: report.status for report in changed})
+        student_ids = [report.student_id_id for report in changed]
+        if student_ids:
+            transaction.on_commit(lambda: invalidate_students(student_ids))
+
+    return {
+        "changed": len(changed),
+        "unchanged": len(statuses) - len(changed) - len(missing),
+        "missing": missing,
+    }
+
+
+# Async variants for the ASGI endpoints of StaffAsyncViews. The rosters
+# stream through the async ORM; the registers share the validation and the
+# transactional writes of the sync paths, which have no async API yet and
+# run in a worker thread through sync_to_async.
+
+async def acourse_roster(subject_id: str, semister_year_id: str):
+    """
+    Async course_roster().
+    """
+    rows = Students.objects.filter(
+        course_id__subjects=subject_id,
+        semister_year_id=semister_year_id,
+    ).values_list('admin_id', 'admin__first_name', 'admin__last_name')
+    async for admin_id, first_name, last_name in rows.aiterator():
+        yield {"id": admin_id, "name": f"{first_name} {last_name}"}
+
+
+async def aattendance_dates(subject_id: str, semister_year_id: str):
+    """
+    Async attendance_dates().
+    """
+    state = await sync_to_async(archive_state)(semister_year_id)
+    async for row in semister_sessions(
+            subject_id, semister_year_id, state).aiterator():
+        yield row
+
+
+async def asave_register(subject_id: str, semister_year_id: str,
+                         attendance_date: str, entries: Any) -> Attendance:
+    """
+    Async save_register().
+    """
+    validated = await sync_to_async(validate_register)(
+        subject_id, semister_year_id, entries)
+    return await sync_to_async(write_register)(
+        *validated, attendance_date=attendance_date)
+
+
+async def aupdate_register(attendance_id: str,
+                           entries: Any) -> Dict[str, Any]:
+    """
+    Async update_register().
+    """
+    validated = await sync_to_async(validate_corrections)(
+        attendance_id, entries)
+    return await sync_to_async(write_corrections)(*validated)
+
+
+def bump_summaries(subject_id: Any, semister_year_id: Any, student_ids,
+                   present: int = 0, absent: int = 0, total: int = 0) -> None:
+    """
+    Adds the same deltas to the summaries of several students with one
+    UPDATE, so concurrent registers never lose an increment.
+    """
+    if not student_ids:
+        return
+    AttendanceSummary.objects.filter(
+        subject_id=subject_id,
+        semister_year_id=semister_year_id,
+        student_id__in=student_ids,
+    ).update(
+        present=F('present') + present,
+        absent=F('absent') + absent,
+        total=F('total') + total,
+        updated_at=datetime.date.today(),
+    )
+
+
+def record_statuses(subject_id: Any, semister_year_id: Any,
+                    statuses: Dict[Any, bool]) -> None:
+    """
+    Counts newly written reports in the attendance summaries.
+
+    Args:
+        subject_id: id of the Subjects of the session.
+        semister_year_id: id of the SemisterModel of the session.
+        statuses: status of the new report keyed by Students id.
+    """
+    AttendanceSummary.objects.bulk_create([
+        AttendanceSummary(student_id_id=student_id,
+                          subject_id_id=subject_id,
+                          semister_year_id_id=semister_year_id)
+        for student_id in statuses
+    ], ignore_conflicts=True)
+
+    present = [student for student, status in statuses.items() if status]
+    absent = [student for student, status in statuses.items() if not status]
+    bump_summaries(subject_id, semister_year_id, present, present=1, total=1)
+    bump_summaries(subject_id, semister_year_id, absent, absent=1, total=1)
+
+
+def record_corrections(subject_id: Any, semister_year_id: Any,
+                       statuses: Dict[Any, bool]) -> None:
+    """
+    Moves corrected reports between the present and absent counters.
+
+    Args:
+        subject_id: id of the Subjects of the session.
+        semister_year_id: id of the SemisterModel of the session.
+        statuses: new status of each flipped report keyed by Students id.
+    """
+    now_present = [student for student, status in statuses.items() if status]
+    now_absent = [student for student, status in statuses.items()
+                  if not status]
+    bump_summaries(subject_id, semister_year_id, now_present,
+                   present=1, absent=-1)
+    bump_summaries(subject_id, semister_year_id, now_absent,
+                   present=-1, absent=1)
+
+
+def count_report(attendance_id: Any, student_id: Any, status: bool,
+                 removed: bool = False) -> None:
+    """
+    Counts one report saved or deleted on its own, by the admin or a
+    cascade, in the attendance summaries; the registers above count theirs
+    in bulk.
+
+    Args:
+        attendance_id: id of the Attendance of the report.
+        student_id: id of the Students of the report.
+        status: status of the report.
+        removed: True to take the report out of the counters.
+    """
+    session = Attendance.objects.filter(id=attendance_id).values(
+        'subject_id', 'semister_year_id').first()
+    if session is None:
+        return
+    if not removed:
+        record_statuses(session['subject_id'], session['semister_year_id'],
+                        {student_id: status})
+        return
+    bump_summaries(session['subject_id'], session['semister_year_id'],
+                   [student_id], present=-int(status),
+                   absent=-int(not status), total=-1)
+
+
+def archived_semisters() -> QuerySet:
+    # their summaries stay as they were when the semister was archived,
+    # archive.verify_semister() checks them against the archived reports
+    return SemisterArchive.objects.values('semister_year_id')
+
+
+def computed_summaries():
+    """
+    Recomputes the summary counters from AttendanceReport, for the
+    semisters that are not archived.
+
+    Returns:
+        iterator of dicts with student_id, subject_id, semister_year_id,
+        present, absent and total.
+    """
+    return AttendanceReport.objects.exclude(
+        attendance_id__semister_year_id__in=archived_semisters(),
+    ).values(
+        'student_id',
+        subject_id=F('attendance_id__subject_id'),
+        semister_year_id=F('attendance_id__semister_year_id'),
+    ).annotate(
+        present=Count('id', filter=Q(status=True)),
+        absent=Count('id', filter=Q(status=False)),
+        total=Count('id'),
+    ).order_by().iterator(chunk_size=2000)
+
+
+def rebuild_summaries(batch_size: int = 2000) -> int:
+    """
+    Replaces the AttendanceSummary of every semister that is not archived
+    with counters recomputed from the reports, in one transaction.
+
+    Returns:
+        number of summary rows written.
+    """
+    written = 0
+    with transaction.atomic():
+        AttendanceSummary.objects.exclude(
+            semister_year_id__in=archived_semisters()).delete()
+        batch = []
+        for row in computed_summaries():
+            batch.append(AttendanceSummary(
+                student_id_id=row['student_id'],
+                subject_id_id=row['subject_id'],
+                semister_year_id_id=row['semister_year_id'],
+                present=row['present'],
+                absent=row['absent'],
+                total=row['total']))
+            if len(batch) >= batch_size:
+                AttendanceSummary.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        AttendanceSummary.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def summary_drift() -> List[Dict[str, Any]]:
+    """
+    Compares the stored summaries of the semisters that are not archived
+    with counters recomputed from the reports.
+
+    Returns:
+        list of the keys whose stored counters differ, with both values;
+        an empty list means the summary table is in sync.
+    """
+    counters = ('present', 'absent', 'total')
+    key_fields = ('student_id', 'subject_id', 'semister_year_id')
+    stored = {
+        tuple(row[field] for field in key_fields):
+            tuple(row[counter] for counter in counters)
+        for row in AttendanceSummary.objects.exclude(
+            semister_year_id__in=archived_semisters(),
+        ).values(*key_fields, *counters).iterator(chunk_size=2000)
+    }
+
+    drift = []
+    for row in computed_summaries():
+        key = tuple(row[field] for field in key_fields)
+        expected = tuple(row[counter] for counter in counters)
+        found = stored.pop(key, (0, 0, 0))
+        if found != expected:
+            drift.append({**dict(zip(key_fields, key)),
+                          "expected": expected, "stored": found})
+    drift.extend(
+        {**dict(zip(key_fields, key)), "expected": (0, 0, 0), "stored": found}
+        for key, found in stored.items() if found != (0, 0, 0)
+    )
+    return drift
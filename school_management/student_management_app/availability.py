@@ -0,0 +1,253 @@
+'''
+Whether usernames and emails are still free, for the registration forms
+and the bulk enrolment checks.
+
+Every process keeps a bloom filter of the usernames and lower case emails
+of all users. A value the filter has never seen is certainly free and is
+answered without a query; the others, taken values and the rare false
+positive, are confirmed with one query for the whole batch. Deleted users
+and old names stay in the filter, which only costs that query.
+
+The filter is built on the first check of a process, streaming the two
+columns once, and the post_save receiver in signals.py adds the names of
+saved users; the student import and the school generator record the users
+they bulk create. Users saved by another process show up through a stamp
+in the cache named by settings.AVAILABILITY_CACHE, replaced on every
+commit that adds names: a process finding a stamp it did not write
+rebuilds its filter, and every filter is rebuilt after
+AVAILABILITY_FILTER_TIMEOUT seconds in any case.
+
+A stamp kept in a per process cache (locmem, dummy) cannot tell a worker
+about the users other processes created, so the filter is only trusted
+when that cache is shared among processes (Redis, Memcached, database or
+file, the settings default); otherwise every value is looked up, still
+one query per batch. Emails are looked up through the functional index
+on LOWER(email) of CustomUser.
+'''
+import hashlib
+import math
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import CustomUser
+
+
+STAMP_KEY = 'availability:stamp'
+
+# values per check, a registration form sends one of each
+MAX_VALUES = 1000
+FALSE_POSITIVE_RATE = 0.01
+# room left for the users saved after a build
+SPARE_CAPACITY = 10000
+
+
+class AvailabilityError(Exception):
+    '''
+    raised when a check is rejected, nothing has been queried
+    '''
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(f'{len(errors)} invalid availability fields')
+        self.errors = errors
+
+
+class BloomFilter:
+    '''
+    fixed size bloom filter of strings, sized for a capacity and a false
+    positive rate
+    '''
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = max(capacity, 1)
+        self.bits = max(8, int(-self.capacity * math.log(error_rate)
+                               / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def positions(self, value: str) -> Iterable[int]:
+        # double hashing over the two halves of one 128 bit digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.bits
+                for index in range(self.hashes))
+
+    def add(self, value: str) -> None:
+        for position in self.positions(value):
+            self.array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.array[position >> 3] & (1 << (position & 7))
+                   for position in self.positions(value))
+
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+
+def username_key(username: str) -> str:
+    return f'u:{username}'
+
+
+def email_key(email: str) -> str:
+    # emails are compared case insensitively, as by the student import
+    return f'e:{email.lower()}'
+
+
+def availability_cache():
+    return caches[getattr(settings, 'AVAILABILITY_CACHE', 'default')]
+
+
+def shared_stamp() -> bool:
+    """
+    Whether every process reads the same stamp, which the filter needs to
+    hear about users created elsewhere.
+    """
+    return not isinstance(availability_cache(), (LocMemCache, DummyCache))
+
+
+class KnownNames:
+    '''
+    the bloom filter of one process and the cache stamp it was built at
+    '''
+
+    def __init__(self) -> None:
+        self.filter: Optional[BloomFilter] = None
+        self.stamp: Optional[str] = None
+        self.built_at = 0.0
+        self.lock = threading.Lock()
+
+    def current(self) -> Optional[BloomFilter]:
+        """
+        The filter, rebuilt when another process added names since it was
+        built, when it is older than AVAILABILITY_FILTER_TIMEOUT or when it
+        holds more names than it was sized for. None when the stamp is not
+        shared, see shared_stamp().
+        """
+        if not shared_stamp():
+            return None
+        stamp = availability_cache().get(STAMP_KEY)
+        timeout = getattr(settings, 'AVAILABILITY_FILTER_TIMEOUT', 300)
+        with self.lock:
+            known = self.filter
+            if known is None or known.full() or stamp != self.stamp or \
+                    time.monotonic() - self.built_at > timeout:
+                known = self.filter = self.build()
+                self.stamp = stamp
+                self.built_at = time.monotonic()
+        return known
+
+    def build(self) -> BloomFilter:
+        users = CustomUser.objects.values_list('username', 'email')
+        known = BloomFilter(2 * users.count() + SPARE_CAPACITY,
+                            FALSE_POSITIVE_RATE)
+        for username, email in users.iterator(chunk_size=5000):
+            known.add(username_key(username))
+            if email:
+                known.add(email_key(email))
+        return known
+
+    def add(self, users: Iterable[Any]) -> None:
+        """
+        Adds the names of saved users; the stamp is replaced once the
+        transaction commits, so other processes do not rebuild before the
+        rows are visible to them.
+        """
+        with self.lock:
+            if self.filter is not None:
+                for user in users:
+                    self.filter.add(username_key(user.username))
+                    if user.email:
+                        self.filter.add(email_key(user.email))
+        transaction.on_commit(self.publish)
+
+    def publish(self) -> None:
+        stamp = uuid.uuid4().hex
+        availability_cache().set(STAMP_KEY, stamp, timeout=None)
+        with self.lock:
+            # names this process added are in its filter already
+            self.stamp = stamp
+
+    def reset(self) -> None:
+        with self.lock:
+            self.filter = None
+
+
+known_names = KnownNames()
+
+
+def taken_values(usernames: Iterable[str], emails: Iterable[str]
+                 ) -> Tuple[Set[str], Set[str]]:
+    """
+    The usernames and lower case emails already in use, with at most one
+    query: values a trusted filter has never seen are not looked up.
+
+    Returns:
+        (taken usernames, taken lower case emails).
+    """
+    known = known_names.current()
+    usernames = {username for username in usernames if username and (
+        known is None or username_key(username) in known)}
+    emails = {email.lower() for email in emails if email and (
+        known is None or email_key(email) in known)}
+    taken_usernames = set()
+    taken_emails = set()
+    if not usernames and not emails:
+        return taken_usernames, taken_emails
+    for username, email in CustomUser.objects.annotate(
+            email_lower=Lower('email')).filter(
+            Q(username__in=usernames) | Q(email_lower__in=emails)
+    ).values_list('username', 'email'):
+        if username in usernames:
+            taken_usernames.add(username)
+        if email and email.lower() in emails:
+            taken_emails.add(email.lower())
+    return taken_usernames, taken_emails
+
+
+def check_availability(usernames: Any = (), emails: Any = ()
+                       ) -> Dict[str, Dict[str, bool]]:
+    """
+    Checks many usernames and emails at once.
+
+    Args:
+        usernames: list of usernames.
+        emails: list of emails.
+
+    Returns:
+        {"usernames": {username: available}, "emails": {email: available}},
+        keyed by the values as given.
+
+    Raises:
+        AvailabilityError: when a field is not a list of strings or the
+            check holds more than MAX_VALUES values.
+    """
+    errors = []
+    for field, values in (('usernames', usernames), ('emails', emails)):
+        if not isinstance(values, (list, tuple)) or \
+                not all(isinstance(value, str) for value in values):
+            errors.append({"field": field,
+                           "error": f"{field} must be a list of strings"})
+    if not errors and len(usernames) + len(emails) > MAX_VALUES:
+        errors.append({"field": None,
+                       "error": f"at most {MAX_VALUES} values per check"})
+    if errors:
+        raise AvailabilityError(errors)
+
+    taken_usernames, taken_emails = taken_values(usernames, emails)
+    return {
+        "usernames": {username: username not in taken_usernames
+                      for username in usernames},
+        "emails": {email: email.lower() not in taken_emails
+                   for email in emails},
+    }
@@ -0,0 +1,346 @@
+'''
+Load benchmarks for the routes of student_management_app/urls.py.
+
+Every route is requested through the Django test client as the role that
+owns it, against whatever school is in the database (see the
+generate_school command). Each request runs inside a transaction that is
+rolled back, so write endpoints can be timed repeatedly without changing
+the dataset.
+'''
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+
+from . import urls
+from .dataset import DEFAULT_PASSWORD
+from .utils import percentile
+from .models import (
+    CustomUser, Staffs, Subjects, Students, SemisterModel,
+    Attendance, AttendanceReport, LeaveReportStudent, LeaveReportStaff,
+    FeedBackStudent, FeedBackStaffs
+)
+
+
+# routes of StaffViews that StaffAsyncViews serves under async_<name>
+ASYNC_ROUTES = ('get_students', 'get_attendance_dates',
+                'save_attendance_data', 'update_attendance_data')
+
+ROLE_BY_MODULE = {
+    'HodViews': 'hod',
+    'HodApiViews': 'hod',
+    'StaffViews': 'staff',
+    'StaffAsyncViews': 'staff',
+    'StudentViews': 'student',
+}
+
+
+class BenchmarkError(Exception):
+    '''
+    raised when the database holds no school to benchmark
+    '''
+
+
+class Sample:
+    '''
+    picks the rows the benchmarked requests refer to
+    '''
+
+    def __init__(self) -> None:
+        """
+        Raises:
+            BenchmarkError: when there is no subject with a staff member
+                and a student to request the routes as.
+        """
+        attendance = Attendance.objects.select_related(
+            'subject_id').order_by('-attendance_date').first()
+        self.subject = attendance.subject_id if attendance else \
+            Subjects.objects.first()
+        if self.subject is None:
+            raise BenchmarkError('the database has no subject, create a '
+                                 'school with manage.py generate_school')
+        self.semister = attendance.semister_year_id if attendance else \
+            SemisterModel.objects.first()
+        self.attendance = attendance
+        self.course = self.subject.course_id
+        self.staff = Staffs.objects.select_related('admin').filter(
+            admin=self.subject.staff_id).first()
+        self.student = Students.objects.select_related('admin').filter(
+            course_id=self.course).first()
+        if self.staff is None or self.student is None:
+            raise BenchmarkError(f'subject {self.subject.id} has no staff '
+                                 'member or no student to request as')
+        self.hod = CustomUser.objects.filter(user_type=CustomUser.HOD).first()
+        self.student_leave = LeaveReportStudent.objects.first()
+        self.staff_leave = LeaveReportStaff.objects.first()
+        self.student_feedback = FeedBackStudent.objects.first()
+        self.staff_feedback = FeedBackStaffs.objects.first()
+        self.register = [
+            {"id": str(admin_id), "status": True} for admin_id in
+            AttendanceReport.objects.filter(attendance_id=attendance)
+            .values_list('student_id__admin_id', flat=True)
+        ]
+
+    def users(self) -> Dict[str, Optional[CustomUser]]:
+        return {
+            'hod': self.hod,
+            'staff': self.staff.admin,
+            'student': self.student.admin,
+            'anonymous': None,
+        }
+
+    def url_kwargs(self) -> Dict[str, Any]:
+        return {
+            'staff_id': self.staff.admin_id,
+            'course_id': self.course.id,
+            'session_id': self.semister.id,
+            'student_id': self.student.admin_id,
+            'subject_id': self.subject.id,
+        }
+
+    def requests(self) -> Dict[str, Dict[str, Any]]:
+        '''
+        request overrides by url name, routes that are not listed are
+        fetched with a GET
+        '''
+        student_leave = getattr(self.student_leave, 'id', None)
+        staff_leave = getattr(self.staff_leave, 'id', None)
+        register = json.dumps(self.register)
+        overrides = {
+            'login': {'method': 'post', 'role': 'anonymous', 'data': {
+                'email': self.student.admin.email,
+                'password': DEFAULT_PASSWORD}},
+            'logout_user': {'method': 'post'},
+            'registration': {'method': 'post', 'role': 'anonymous', 'data': {
+                'first_name': 'Bench', 'last_name': 'Mark',
+                'email': 'benchmark.student@school.test',
+                'password': DEFAULT_PASSWORD,
+                'confirm_password': DEFAULT_PASSWORD}},
+            'student_profile_update': {'method': 'put', 'data': {
+                'address': 'Kisumu'}},
+            'get_students': {'method': 'post', 'data': {
+                'subject': self.subject.id,
+                'session_year': self.semister.id}},
+            'save_attendance_data': {'method': 'post', 'data': {
+                'student_ids': register,
+                'subject_id': self.subject.id,
+                'attendance_date': str(self.semister.semister_ends),
+                'session_year_id': self.semister.id}},
+            'get_attendance_dates': {'method': 'post', 'data': {
+                'subject': self.subject.id,
+                'session_year_id': self.semister.id}},
+            'get_attendance_student': {'method': 'post', 'data': {
+                'attendance_date': getattr(self.attendance, 'id', None)}},
+            'update_attendance_data': {'method': 'post', 'data': {
+                'student_ids': register,
+                'attendance_date': getattr(self.attendance, 'id', None)}},
+            'staff_apply_leave_save': {'method': 'post', 'data': {
+                'leave_start': str(self.semister.semister_ends),
+                'leave_message': 'Benchmark'}},
+            'staff_feedback_save': {'method': 'post', 'data': {
+                'feedback_message': 'Benchmark'}},
+            'staff_profile_update': {'method': 'post', 'data': {
+                'first_name': 'Bench', 'last_name': 'Mark',
+                'address': 'Kisumu'}},
+            'staff_add_result_save': {'method': 'post', 'data': {
+                'student_list': self.student.admin_id,
+                'assignment_marks': 20, 'exam_marks': 50,
+                'subject': self.subject.id}},
+            'staff_save_results': {'method': 'post', 'data': {
+                'subject': self.subject.id,
+                'results': json.dumps([
+                    {'id': entry['id'], 'assignment_marks': 20,
+                     'exam_marks': 50} for entry in self.register])}},
+            'add_staff_save': {'method': 'post', 'data': {
+                'first_name': 'Bench', 'last_name': 'Mark',
+                'username': 'benchstaff', 'email': 'bench.staff@school.test',
+                'password': DEFAULT_PASSWORD, 'address': 'Kisumu'}},
+            'edit_staff_save': {'method': 'post', 'data': {
+                'staff_id': self.staff.admin_id,
+                'username': self.staff.admin.username,
+                'email': self.staff.admin.email,
+                'first_name': 'Bench', 'last_name': 'Mark',
+                'address': 'Kisumu'}},
+            'add_course_save': {'method': 'post', 'data': {
+                'course': 'Benchmark'}},
+            'edit_course_save': {'method': 'post', 'data': {
+                'course_id': self.course.id, 'course': 'Benchmark'}},
+            'add_session_save': {'method': 'post', 'data': {
+                'session_start_year': str(self.semister.semister_starts),
+                'session_end_year': str(self.semister.semister_ends)}},
+            'edit_session_save': {'method': 'post', 'data': {
+                'session_id': self.semister.id,
+                'session_start_year': str(self.semister.semister_starts),
+                'session_end_year': str(self.semister.semister_ends)}},
+            'add_student_save': {'method': 'post', 'data': {
+                'email': 'bench.student@school.test',
+                'password': DEFAULT_PASSWORD,
+                'first_name': 'Bench', 'last_name': 'Mark',
+                'username': 'benchstudent', 'address': 'Kisumu',
+                'course_id': self.course.id, 'gender': 'Male',
+                'session_year_id': self.semister.id}},
+            'edit_student_save': {'method': 'post', 'data': {
+                'email': self.student.admin.email,
+                'username': self.student.admin.username,
+                'first_name': 'Bench', 'last_name': 'Mark',
+                'address': 'Kisumu', 'course_id': self.course.id,
+                'gender': 'Male', 'session_year_id': self.semister.id}},
+            'add_subject_save': {'method': 'post', 'data': {
+                'subject': 'Benchmark', 'course': self.course.id,
+                'staff': self.staff.admin_id}},
+            'edit_subject_save': {'method': 'post', 'data': {
+                'subject_id': self.subject.id, 'subject': 'Benchmark',
+                'course': self.course.id, 'staff': self.staff.admin_id}},
+            'check_email_exist': {'method': 'post', 'data': {
+                'email': self.student.admin.email}},
+            'check_username_exist': {'method': 'post', 'data': {
+                'username': self.student.admin.username}},
+            'check_availability': {'method': 'post', 'data': {
+                'usernames': json.dumps([self.student.admin.username,
+                                         'benchmark.free']),
+                'emails': json.dumps([self.student.admin.email,
+                                      'benchmark.free@school.test'])}},
+            'student_feedback_message_reply': {'method': 'post', 'data': {
+                'id': getattr(self.student_feedback, 'id', None),
+                'reply': 'Noted'}},
+            'staff_feedback_message_reply': {'method': 'post', 'data': {
+                'id': getattr(self.staff_feedback, 'id', None),
+                'reply': 'Noted'}},
+            'student_leave_approve': {'kwargs': {'leave_id': student_leave}},
+            'student_leave_reject': {'kwargs': {'leave_id': student_leave}},
+            'staff_leave_approve': {'kwargs': {'leave_id': staff_leave}},
+            'staff_leave_reject': {'kwargs': {'leave_id': staff_leave}},
+            'moderate_leaves': {'method': 'post', 'data': {
+                'kind': 'student', 'action': 'approve',
+                'ids': json.dumps([str(student_leave)] if student_leave
+                                  else [])}},
+            'admin_get_attendance_dates': {'method': 'post', 'data': {
+                'subject': self.subject.id,
+                'session_year_id': self.semister.id}},
+            'admin_get_attendance_student': {'method': 'post', 'data': {
+                'attendance_date': getattr(self.attendance, 'id', None)}},
+            'export_attendance': {'data': {'semister': self.semister.id}},
+            'broadcast_notification': {'method': 'post', 'data': {
+                'message': 'Benchmark', 'course': self.course.id}},
+            'notifications': {'role': 'student'},
+            'api_people_search': {'data': {
+                'q': self.student.admin.last_name[:3]}},
+            'admin_profile_update': {'method': 'post', 'data': {
+                'first_name': 'Bench', 'last_name': 'Mark'}},
+        }
+        for name in ASYNC_ROUTES:
+            overrides[f'async_{name}'] = overrides[name]
+        return overrides
+
+
+def run_benchmarks(repeat: int = 5,
+                   only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Times every named route of student_management_app/urls.py.
+
+    Args:
+        repeat: number of timed requests per route.
+        only: optional list of url names to restrict the run to.
+
+    Returns:
+        dict of url name to its method, role, status code, query count
+        and latency statistics in milliseconds; routes that could not be
+        requested carry a "skipped" reason instead.
+
+    Raises:
+        BenchmarkError: when the database holds no school.
+    """
+    sample = Sample()
+    users = sample.users()
+    overrides = sample.requests()
+    url_kwargs = sample.url_kwargs()
+
+    results = {}
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name:
+            continue
+        name = pattern.name
+        if only and name not in only:
+            continue
+
+        module = pattern.callback.__module__.rsplit('.', 1)[-1]
+        spec = {'method': 'get',
+                'role': ROLE_BY_MODULE.get(module, 'anonymous'),
+                'data': {}, 'kwargs': {}}
+        spec.update(overrides.get(name, {}))
+        if not spec['kwargs']:
+            spec['kwargs'] = {
+                key: url_kwargs[key] for key in pattern.pattern.converters
+                if key in url_kwargs
+            }
+        if None in spec['kwargs'].values():
+            results[name] = {'skipped': 'no row to request'}
+            continue
+
+        results[name] = time_route(name, spec, users, repeat)
+    return results
+
+
+def time_route(name: str, spec: Dict[str, Any],
+               users: Dict[str, Optional[CustomUser]],
+               repeat: int) -> Dict[str, Any]:
+    client = Client(HTTP_HOST='localhost', raise_request_exception=False)
+    if users.get(spec['role']) is not None:
+        client.force_login(users[spec['role']])
+    url = reverse(name, kwargs=spec['kwargs'])
+    send = getattr(client, spec['method'])
+    if spec['method'] == 'put':
+        request = lambda: send(url, json.dumps(spec['data']),
+                               content_type='application/json')
+    else:
+        request = lambda: send(url, spec['data'])
+
+    timings = []
+    queries = status = None
+    for _ in range(repeat):
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request()
+                timings.append((time.perf_counter() - started) * 1000)
+            transaction.set_rollback(True)
+        queries = len(captured)
+        status = response.status_code
+
+    return {
+        'method': spec['method'].upper(),
+        'role': spec['role'],
+        'status': status,
+        'queries': queries,
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'max_ms': round(max(timings), 3),
+    }
+
+
+def compare_reports(baseline: Dict[str, Any],
+                    current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Lines up two benchmark reports route by route.
+
+    Returns:
+        list of dicts with the url name and the query count and mean
+        latency of both runs.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name, {})
+        if 'skipped' in result or 'skipped' in before or not before:
+            continue
+        rows.append({
+            'name': name,
+            'queries': (before['queries'], result['queries']),
+            'mean_ms': (before['mean_ms'], result['mean_ms']),
+        })
+    return rows
@@ -0,0 +1,70 @@
+'''
+Choice lists of the course and semister select boxes.
+
+The forms pass these providers as callables, so the lists are read when a
+form is rendered or validated rather than when forms.py is imported. Each
+list is cached under a key carrying a version stamp. The signal receivers
+in signals.py replace the stamp whenever a Courses or SemisterModel row
+changes, so the next read misses and rebuilds the list.
+'''
+import uuid
+from typing import Callable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Courses, SemisterModel
+
+
+COURSES = 'courses'
+SEMISTERS = 'semisters'
+
+Choices = List[Tuple[str, str]]
+
+
+def choices_cache():
+    return caches[getattr(settings, 'CHOICES_CACHE', 'default')]
+
+
+def version_key(name: str) -> str:
+    return f'choices:{name}:version'
+
+
+def bump_choices_version(name: str) -> None:
+    """
+    Makes the cached list of a provider stale.
+    """
+    choices_cache().set(version_key(name), uuid.uuid4().hex, timeout=None)
+
+
+def cached_choices(name: str, build: Callable[[], Choices]) -> Choices:
+    cache = choices_cache()
+    version = cache.get(version_key(name))
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(version_key(name), version, timeout=None)
+        version = cache.get(version_key(name), version)
+
+    key = f'choices:{name}:{version}'
+    choices = cache.get(key)
+    if choices is None:
+        choices = build()
+        cache.set(key, choices,
+                  timeout=getattr(settings, 'CHOICES_CACHE_TIMEOUT', 3600))
+    return choices
+
+
+def course_choices() -> Choices:
+    return cached_choices(COURSES, lambda: [
+        (str(pk), name) for pk, name in
+        Courses.objects.order_by('course_name').values_list(
+            'id', 'course_name')
+    ])
+
+
+def semister_choices() -> Choices:
+    return cached_choices(SEMISTERS, lambda: [
+        (str(pk), f'{starts} to {ends}') for pk, starts, ends in
+        SemisterModel.objects.order_by('-semister_starts').values_list(
+            'id', 'semister_starts', 'semister_ends')
+    ])
@@ -0,0 +1,202 @@
+'''
+Aggregate queries behind the role dashboards.
+
+Each chart series is built from a fixed number of grouped queries, so the
+cost of rendering a dashboard does not grow with the number of courses,
+subjects, staff or students in the school.
+'''
+from typing import Any, Dict, Iterable
+
+from django.db.models import Count, Sum
+
+from .dashboard_cache import STAFF, cached_dashboard
+from .leaves import LEAVE_APPROVED, on_leave, week_bounds
+from .models import (
+    Courses, Subjects, Staffs, Students, Attendance, AttendanceSummary,
+    ArchivedAttendance, LeaveReportStaff, LeaveReportStudent
+)
+
+
+def grouped_counts(rows: Iterable[Dict[str, Any]], key: str,
+                   field: str = 'count') -> Dict[Any, int]:
+    """
+    Maps the grouping key of each row returned by values().annotate()
+    to one of its annotated counts.
+
+    Args:
+        rows: the grouped rows.
+        key: name of the column the rows were grouped by.
+        field: name of the annotated count to read.
+
+    Returns:
+        dict of group key to count.
+    """
+    return {row[key]: row[field] for row in rows}
+
+
+def attendance_totals(**filters) -> Dict[Any, Dict[str, int]]:
+    """
+    Reads present and absent totals per student from AttendanceSummary
+    in one grouped query.
+
+    Args:
+        **filters: lookups restricting the summaries, e.g.
+            student_id__course_id__in=[...].
+
+    Returns:
+        dict of Students id to a dict with present and absent.
+    """
+    return {
+        row['student_id']: row for row in
+        AttendanceSummary.objects.filter(**filters).values('student_id')
+        .annotate(present=Sum('present'), absent=Sum('absent')).order_by()
+    }
+
+
+def admin_home_context() -> Dict[str, Any]:
+    """
+    Builds the template context of HodViews.admin_home.
+
+    Thirteen queries are issued whatever the size of the school: one listing
+    query per entity and one grouped count per series.
+
+    Returns:
+        dict with the totals and every chart series of the HOD dashboard.
+    """
+    courses = list(Courses.objects.values_list('id', 'course_name'))
+    subjects = list(Subjects.objects.values_list('subject_name', 'course_id'))
+    staffs = list(Staffs.objects.values_list(
+        'id', 'admin_id', 'admin__first_name'))
+    students = list(Students.objects.values_list('id', 'admin__first_name'))
+
+    subjects_per_course = grouped_counts(
+        Subjects.objects.values('course_id')
+        .annotate(count=Count('id')).order_by(), 'course_id')
+    students_per_course = grouped_counts(
+        Students.objects.values('course_id')
+        .annotate(count=Count('id')).order_by(), 'course_id')
+
+    # Subjects are linked to the CustomUser of the staff, not to Staffs
+    attendance_per_staff = grouped_counts(
+        Attendance.objects.values('subject_id__staff_id')
+        .annotate(count=Count('id')).order_by(), 'subject_id__staff_id')
+    archived_per_staff = grouped_counts(
+        ArchivedAttendance.objects.values('subject_id__staff_id')
+        .annotate(count=Count('id')).order_by(), 'subject_id__staff_id')
+    leaves_per_staff = grouped_counts(
+        LeaveReportStaff.objects.filter(leave_status=LEAVE_APPROVED)
+        .values('staff_id').annotate(count=Count('id')).order_by(),
+        'staff_id')
+
+    reports_per_student = attendance_totals()
+    leaves_per_student = grouped_counts(
+        LeaveReportStudent.objects.filter(leave_status=LEAVE_APPROVED)
+        .values('student_id').annotate(count=Count('id')).order_by(),
+        'student_id')
+
+    week = week_bounds()
+    staff_on_leave = on_leave(LeaveReportStaff, *week).values(
+        'staff_id').distinct().count()
+    students_on_leave = on_leave(LeaveReportStudent, *week).values(
+        'student_id').distinct().count()
+
+    no_reports = {'present': 0, 'absent': 0}
+    student_reports = [
+        reports_per_student.get(student_id, no_reports)
+        for student_id, _ in students
+    ]
+
+    return {
+        "all_student_count": len(students),
+        "staff_on_leave_count": staff_on_leave,
+        "students_on_leave_count": students_on_leave,
+        "subject_count": len(subjects),
+        "course_count": len(courses),
+        "staff_count": len(staffs),
+        "course_name_list": [name for _, name in courses],
+        "subject_count_list": [
+            subjects_per_course.get(course_id, 0) for course_id, _ in courses],
+        "student_count_list_in_course": [
+            students_per_course.get(course_id, 0) for course_id, _ in courses],
+        "subject_list": [name for name, _ in subjects],
+        "student_count_list_in_subject": [
+            students_per_course.get(course_id, 0) for _, course_id in subjects],
+        "staff_attendance_present_list": [
+            attendance_per_staff.get(admin_id, 0)
+            + archived_per_staff.get(admin_id, 0)
+            for _, admin_id, _ in staffs],
+        "staff_attendance_leave_list": [
+            leaves_per_staff.get(staff_id, 0) for staff_id, _, _ in staffs],
+        "staff_name_list": [first_name for _, _, first_name in staffs],
+        "student_attendance_present_list": [
+            report['present'] for report in student_reports],
+        "student_attendance_leave_list": [
+            report['absent'] + leaves_per_student.get(student_id, 0)
+            for (student_id, _), report in zip(students, student_reports)],
+        "student_name_list": [first_name for _, first_name in students],
+    }
+
+
+def staff_home_context(staff_user_id: Any) -> Dict[str, Any]:
+    """
+    Builds the template context of StaffViews.staff_home.
+
+    Five queries are issued whatever the number of subjects the staff member
+    teaches or of students in their courses.
+
+    Args:
+        staff_user_id: id of the CustomUser of the staff member.
+
+    Returns:
+        dict with the totals and every chart series of the staff dashboard.
+    """
+    archived_per_subject = grouped_counts(
+        ArchivedAttendance.objects.filter(subject_id__staff_id=staff_user_id)
+        .values('subject_id').annotate(count=Count('id')).order_by(),
+        'subject_id')
+    subjects = [
+        (name, course_id, count + archived_per_subject.get(subject_id, 0))
+        for subject_id, name, course_id, count in
+        Subjects.objects.filter(staff_id=staff_user_id)
+        .annotate(attendance_count=Count('attendance'))
+        .values_list('id', 'subject_name', 'course_id', 'attendance_count')
+    ]
+    course_ids = {course_id for _, course_id, _ in subjects}
+
+    students = list(
+        Students.objects.filter(course_id__in=course_ids)
+        .values_list('id', 'admin__first_name', 'admin__last_name'))
+    reports_per_student = attendance_totals(
+        student_id__course_id__in=course_ids)
+    leave_count = LeaveReportStaff.objects.filter(
+        staff_id__admin_id=staff_user_id,
+        leave_status=LEAVE_APPROVED).count()
+
+    no_reports = {'present': 0, 'absent': 0}
+    student_reports = [
+        reports_per_student.get(student_id, no_reports)
+        for student_id, _, _ in students
+    ]
+
+    return {
+        "students_count": len(students),
+        "attendance_count": sum(count for _, _, count in subjects),
+        "leave_count": leave_count,
+        "subject_count": len(subjects),
+        "subject_list": [name for name, _, _ in subjects],
+        "attendance_list": [count for _, _, count in subjects],
+        "student_list": [f"{first_name} {last_name}"
+                         for _, first_name, last_name in students],
+        "attendance_present_list": [
+            report['present'] for report in student_reports],
+        "attendance_absent_list": [
+            report['absent'] for report in student_reports],
+    }
+
+
+def cached_staff_home_context(staff_user_id: Any) -> Dict[str, Any]:
+    """
+    staff_home_context() served from the dashboard cache.
+    """
+    return cached_dashboard(STAFF, staff_user_id,
+                            lambda: staff_home_context(staff_user_id))
@@ -0,0 +1,134 @@
+'''
+Cache of the computed dashboard contexts.
+
+Contexts are stored in the cache alias named by settings.DASHBOARD_CACHE
+(locmem unless configured otherwise) under one key per role and user; the
+HOD dashboard is the same for every HOD and is stored once. The signal
+receivers in signals.py and the bulk attendance paths delete exactly the
+keys whose numbers a change can affect.
+'''
+from typing import Any, Callable, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Subjects, Students
+
+
+HOD = 'hod'
+STAFF = 'staff'
+STUDENT = 'student'
+
+HIT_KEY = 'dashboard:stats:hits'
+MISS_KEY = 'dashboard:stats:misses'
+
+
+def dashboard_cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE', 'default')]
+
+
+def dashboard_key(role: str, user_id: Any = None) -> str:
+    # the HOD dashboard has no per user numbers
+    return f'dashboard:{role}:*' if role == HOD else f'dashboard:{role}:{user_id}'
+
+
+def count(key: str) -> None:
+    cache = dashboard_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+
+
+def cached_dashboard(role: str, user_id: Any,
+                     build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Returns the cached dashboard context of a user, building and storing
+    it on a miss.
+
+    Args:
+        role: one of HOD, STAFF or STUDENT.
+        user_id: id of the CustomUser viewing the dashboard.
+        build: callable computing the context.
+
+    Returns:
+        the dashboard context.
+    """
+    cache = dashboard_cache()
+    key = dashboard_key(role, user_id)
+    context = cache.get(key)
+    if context is not None:
+        count(HIT_KEY)
+        return context
+
+    count(MISS_KEY)
+    context = build()
+    cache.set(key, context,
+              timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return context
+
+
+def cache_stats() -> Dict[str, Any]:
+    """
+    Returns:
+        dict with the hit and miss counters and the hit ratio.
+    """
+    stats = dashboard_cache().get_many([HIT_KEY, MISS_KEY])
+    hits, misses = stats.get(HIT_KEY, 0), stats.get(MISS_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else None,
+    }
+
+
+def reset_cache_stats() -> None:
+    dashboard_cache().delete_many([HIT_KEY, MISS_KEY])
+
+
+def invalidate(staff_user_ids: Iterable[Any] = (),
+               student_user_ids: Iterable[Any] = ()) -> None:
+    """
+    Drops the HOD dashboard and the dashboards of the given users.
+    """
+    keys = [dashboard_key(HOD)]
+    keys += [dashboard_key(STAFF, user_id) for user_id in set(staff_user_ids)]
+    keys += [dashboard_key(STUDENT, user_id)
+             for user_id in set(student_user_ids)]
+    dashboard_cache().delete_many(keys)
+
+
+def staff_of_courses(course_ids: Iterable[Any]) -> List[Any]:
+    return list(Subjects.objects.filter(course_id__in=list(course_ids))
+                .values_list('staff_id', flat=True).distinct())
+
+
+def students_of_course(course_id: Any) -> List[Any]:
+    return list(Students.objects.filter(course_id=course_id)
+                .values_list('admin_id', flat=True))
+
+
+def invalidate_students(student_ids: Iterable[Any]) -> None:
+    """
+    Drops the dashboards showing attendance of the given students: their
+    own, those of every staff member teaching their courses and the HOD's.
+
+    Args:
+        student_ids: Students ids (not CustomUser ids).
+    """
+    rows = list(Students.objects.filter(id__in=list(student_ids))
+                .values_list('admin_id', 'course_id'))
+    invalidate(
+        staff_user_ids=staff_of_courses({course for _, course in rows}),
+        student_user_ids=[admin_id for admin_id, _ in rows],
+    )
+
+
+def invalidate_subject(subject: Subjects) -> None:
+    """
+    Drops the dashboards listing a subject or its attendance sessions.
+    """
+    invalidate(staff_user_ids=[subject.staff_id_id],
+               student_user_ids=students_of_course(subject.course_id_id))
+
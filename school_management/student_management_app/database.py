@@ -0,0 +1,19 @@
+'''
+Per connection database setup.
+
+Connected in StudentManagementAppConfig.ready(), runs settings.SQLITE_PRAGMAS
+on every new SQLite connection; see the database profiles in settings.py.
+'''
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created, dispatch_uid='sqlite_pragmas')
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,241 @@
+'''
+Synthetic school generator used by the generate_school command and the
+benchmarks.
+
+Rows are produced lazily and written with chunked bulk_create, and every
+random choice comes from a seeded generator so two runs with the same
+arguments build the same school.
+'''
+import datetime
+import itertools
+import random
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .attendance import rebuild_summaries
+from .availability import known_names
+from .search import rebuild_people_search
+from .models import (
+    CustomUser, AdminHOD, Staffs, Courses, Subjects, Students, SemisterModel,
+    Attendance, AttendanceReport, LeaveReportStudent, LeaveReportStaff,
+    FeedBackStudent, FeedBackStaffs, NotificationStudent, NotificationStaffs,
+    StudentResult
+)
+
+
+DEFAULT_PASSWORD = 'password'
+
+FIRST_NAMES = [
+    'amina', 'brian', 'cynthia', 'david', 'esther', 'felix', 'grace',
+    'hassan', 'irene', 'james', 'kevin', 'lydia', 'mercy', 'nelson',
+    'olive', 'peter', 'quincy', 'rose', 'samuel', 'tabitha', 'umar',
+    'violet', 'wanjiru', 'xavier', 'yusuf', 'zawadi',
+]
+LAST_NAMES = [
+    'achieng', 'barasa', 'chebet', 'kamau', 'kiptoo', 'mutua', 'njeri',
+    'odhiambo', 'otieno', 'wafula', 'wambui', 'wekesa',
+]
+
+
+def chunked(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """
+    Splits an iterable into lists of at most size items.
+    """
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class SchoolGenerator:
+    '''
+    builds a school of a configurable size with a fixed random seed
+    '''
+
+    def __init__(self, courses: int = 50, subjects: int = 2000,
+                 staffs: int = 400, students: int = 50000,
+                 reports: int = 5000000, semisters: int = 2,
+                 seed: int = 42, chunk_size: int = 5000,
+                 log: Optional[Callable[[str], None]] = None) -> None:
+        self.sizes = {
+            'courses': max(courses, 1),
+            'subjects': max(subjects, 1),
+            'staffs': max(staffs, 1),
+            'students': max(students, 1),
+            'reports': max(reports, 0),
+            'semisters': max(semisters, 1),
+        }
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.log = log or (lambda message: None)
+        self.password = make_password(DEFAULT_PASSWORD)
+        self.usernames = itertools.count()
+
+    def insert(self, model, rows: Iterable[Any]) -> int:
+        written = 0
+        for chunk in chunked(rows, self.chunk_size):
+            model.objects.bulk_create(chunk)
+            written += len(chunk)
+        self.log(f'{model.__name__}: {written}')
+        return written
+
+    def make_user(self, user_type: str, role: str) -> CustomUser:
+        first = self.random.choice(FIRST_NAMES)
+        last = self.random.choice(LAST_NAMES)
+        username = f'{first}{last}{next(self.usernames)}'
+        return CustomUser(username=username,
+                          email=f'{username}.{role}@school.test',
+                          first_name=first.title(),
+                          last_name=last.title(),
+                          password=self.password,
+                          user_type=user_type)
+
+    def make_people(self, count: int, user_type: str, role: str) -> List[Any]:
+        users = [self.make_user(user_type, role) for _ in range(count)]
+        self.insert(CustomUser, users)
+        return users
+
+    def generate(self) -> Dict[str, int]:
+        """
+        Writes the whole school in one transaction.
+
+        Returns:
+            dict of model name to the number of rows written.
+        """
+        with transaction.atomic():
+            counts = self.generate_rows()
+        counts['AttendanceSummary'] = rebuild_summaries()
+        counts['PeopleSearch'] = rebuild_people_search()
+        # bulk_create sent no post_save, make every worker, this one
+        # included, rebuild its filter
+        known_names.reset()
+        known_names.publish()
+        return counts
+
+    def generate_rows(self) -> Dict[str, int]:
+        sizes = self.sizes
+        pick = self.random.choice
+        counts = {}
+
+        today = datetime.date.today()
+        # the first semister is running, the others are closed
+        starts = [today - datetime.timedelta(days=90 + 183 * index)
+                  for index in range(sizes['semisters'])]
+        semisters = [
+            SemisterModel(semister_starts=start,
+                          semister_ends=start + datetime.timedelta(days=182))
+            for start in starts
+        ]
+        counts['SemisterModel'] = self.insert(SemisterModel, semisters)
+        courses = [Courses(course_name=f'Course {index + 1}')
+                   for index in range(sizes['courses'])]
+        counts['Courses'] = self.insert(Courses, courses)
+
+        hod_user = self.make_people(1, CustomUser.HOD, 'hod')[0]
+        counts['AdminHOD'] = self.insert(AdminHOD, [AdminHOD(admin=hod_user)])
+
+        staff_users = self.make_people(sizes['staffs'], CustomUser.STAFF, 'staff')
+        staffs = [Staffs(admin=user, address='Nairobi') for user in staff_users]
+        counts['Staffs'] = self.insert(Staffs, staffs)
+
+        subjects = [
+            Subjects(subject_name=f'Subject {index + 1}',
+                     course_id=courses[index % len(courses)],
+                     staff_id=staff_users[index % len(staff_users)])
+            for index in range(sizes['subjects'])
+        ]
+        counts['Subjects'] = self.insert(Subjects, subjects)
+
+        student_users = self.make_people(
+            sizes['students'], CustomUser.STUDENT, 'student')
+        students = [
+            Students(admin=user,
+                     gender=pick(('Male', 'Female')),
+                     address='Busia',
+                     course_id=courses[index % len(courses)],
+                     semister_year_id=pick(semisters))
+            for index, user in enumerate(student_users)
+        ]
+        counts['Students'] = self.insert(Students, students)
+
+        students_in_course = {}
+        for student in students:
+            students_in_course.setdefault(student.course_id.id, []).append(student)
+
+        # one session covers every student of the course of its subject;
+        # sessions are added day by day until they hold the requested
+        # number of reports, the last one cut short
+        taught = [subject for subject in subjects
+                  if students_in_course.get(subject.course_id.id)]
+        sessions = []
+        remaining = sizes['reports'] if taught else 0
+        for day in itertools.count():
+            if remaining <= 0:
+                break
+            semister = semisters[day % len(semisters)]
+            for subject in taught:
+                if remaining <= 0:
+                    break
+                sessions.append(Attendance(
+                    subject_id=subject, semister_year_id=semister,
+                    attendance_date=semister.semister_starts
+                    + datetime.timedelta(days=day)))
+                remaining -= len(students_in_course[subject.course_id.id])
+        counts['Attendance'] = self.insert(Attendance, sessions)
+        reports = (
+            AttendanceReport(student_id=student,
+                             attendance_id=session,
+                             status=self.random.random() < 0.85)
+            for session in sessions
+            for student in students_in_course[session.subject_id.course_id.id]
+        )
+        counts['AttendanceReport'] = self.insert(
+            AttendanceReport, itertools.islice(reports, sizes['reports']))
+
+        counts['StudentResult'] = self.insert(StudentResult, (
+            StudentResult(student_id=student,
+                          subject_id=subject,
+                          subject_exam_marks=self.random.randint(20, 70),
+                          subject_assignment_marks=self.random.randint(5, 30))
+            for subject in subjects[:len(courses)]
+            for student in students_in_course.get(subject.course_id.id, ())
+        ))
+
+        counts['LeaveReportStudent'] = self.insert(LeaveReportStudent, (
+            LeaveReportStudent(student_id=student,
+                               leave_start=student.semister_year_id.semister_starts,
+                               leave_end=student.semister_year_id.semister_starts
+                               + datetime.timedelta(days=self.random.randint(0, 4)),
+                               leave_message='Family matters',
+                               leave_status=self.random.randint(0, 2))
+            for student in students if self.random.random() < 0.05
+        ))
+        counts['LeaveReportStaff'] = self.insert(LeaveReportStaff, (
+            LeaveReportStaff(staff_id=staff,
+                             leave_start=today,
+                             leave_end=today + datetime.timedelta(
+                                 days=self.random.randint(0, 2)),
+                             leave_message='Conference',
+                             leave_status=self.random.randint(0, 2))
+            for staff in staffs if self.random.random() < 0.2
+        ))
+        counts['FeedBackStudent'] = self.insert(FeedBackStudent, (
+            FeedBackStudent(student_id=student, feedback='More labs please',
+                            feedback_reply='')
+            for student in students if self.random.random() < 0.02
+        ))
+        counts['FeedBackStaffs'] = self.insert(FeedBackStaffs, (
+            FeedBackStaffs(staff_id=staff, feedback='Projector broken',
+                           feedback_reply='')
+            for staff in staffs if self.random.random() < 0.1
+        ))
+        counts['NotificationStudent'] = self.insert(NotificationStudent, (
+            NotificationStudent(student_id=student, message='Exams start soon')
+            for student in students if self.random.random() < 0.1
+        ))
+        counts['NotificationStaffs'] = self.insert(NotificationStaffs, (
+            NotificationStaffs(staff_id=staff, message='Staff meeting')
+            for staff in staffs
+        ))
+        return counts
@@ -0,0 +1,144 @@
+'''
+In-process publish/subscribe behind the server-sent events stream.
+
+Every open stream (EventViews.event_stream) subscribes a bounded
+asyncio.Queue under the id of its user. The signal receivers in signals.py
+and the bulk paths that send no signals (broadcasts, leave moderation)
+publish once their transaction commits; publishing may happen on any
+thread and hands each event to the subscriber's event loop.
+
+An idle stream costs a queue and a suspended coroutine, no thread and no
+database connection. Events only reach the streams of the process that
+published them, so run a single ASGI worker, or put a shared broker in
+front of several.
+'''
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Iterable, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+
+NOTIFICATION = 'notification'
+FEEDBACK_REPLY = 'feedback_reply'
+LEAVE_STATUS = 'leave_status'
+
+
+class Subscription:
+    '''
+    the queue of one open stream
+    '''
+    __slots__ = ('user_id', 'loop', 'queue')
+
+    def __init__(self, user_id: str, max_events: int) -> None:
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_events)
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        # runs on the subscriber's loop; a client that does not read keeps
+        # its latest events only
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class Broker:
+    '''
+    subscriptions of the open streams, keyed by user id
+    '''
+
+    def __init__(self) -> None:
+        self.subscribers: Dict[str, Set[Subscription]] = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id: Any) -> Subscription:
+        """
+        Must be called from the event loop serving the stream.
+        """
+        subscription = Subscription(
+            str(user_id), getattr(settings, 'EVENT_QUEUE_SIZE', 50))
+        with self.lock:
+            self.subscribers.setdefault(subscription.user_id, set()).add(
+                subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            streams = self.subscribers.get(subscription.user_id)
+            if streams is not None:
+                streams.discard(subscription)
+                if not streams:
+                    del self.subscribers[subscription.user_id]
+
+    def publish(self, user_ids: Iterable[Any], event: Dict[str, Any]) -> int:
+        """
+        Hands an event to every open stream of the given users.
+
+        Returns:
+            number of streams reached.
+        """
+        return self.publish_many((user_id, event) for user_id in user_ids)
+
+    def publish_many(self, events: Iterable[Tuple[Any, Dict[str, Any]]]
+                     ) -> int:
+        """
+        Hands each (user id, event) pair to the open streams of its user,
+        looking the streams up under one lock.
+
+        Returns:
+            number of events handed to a stream.
+        """
+        with self.lock:
+            targets = [
+                (subscription, event) for user_id, event in events
+                for subscription in self.subscribers.get(str(user_id), ())
+            ]
+        reached = 0
+        for subscription, event in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(
+                    subscription.deliver, event)
+                reached += 1
+            except RuntimeError:
+                # the loop of a stream that was never closed has stopped
+                self.unsubscribe(subscription)
+        return reached
+
+    def connections(self) -> int:
+        with self.lock:
+            return sum(len(streams) for streams in self.subscribers.values())
+
+
+broker = Broker()
+
+
+def publish_on_commit(user_ids: Iterable[Any], event: Dict[str, Any]) -> None:
+    """
+    Publishes an event once the current transaction commits, at once
+    outside a transaction.
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: broker.publish(user_ids, event))
+
+
+def publish_many_on_commit(events: Iterable[Tuple[Any, Dict[str, Any]]]
+                           ) -> None:
+    """
+    publish_on_commit() for many (user id, event) pairs, published in one
+    broker pass.
+    """
+    events = list(events)
+    if events:
+        transaction.on_commit(lambda: broker.publish_many(events))
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """
+    Encodes an event in the text/event-stream format, named by its type.
+    """
+    data = json.dumps(event, default=str)
+    return f'event: {event["type"]}\ndata: {data}\n\n'
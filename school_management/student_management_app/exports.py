@@ -0,0 +1,276 @@
+'''
+Streaming exports of the attendance registers.
+
+One row is written per AttendanceReport (date, course, subject, student,
+status), read with a server side cursor in chunks. The encoded bytes are
+handed to StreamingHttpResponse as they are produced, so memory stays
+flat whatever the size of the export and the header goes out before the
+query has returned its first row.
+
+Text cells go through export_text() in both formats: characters XML does
+not allow are dropped, since one of them makes Excel refuse the whole
+workbook, and text a spreadsheet would run as a formula is quoted.
+'''
+import csv
+import datetime
+import re
+import zipfile
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+from .archive import chained, report_sources
+
+
+HEADER = ('Date', 'Course', 'Subject', 'Student Id', 'First Name',
+          'Last Name', 'Status')
+
+CHUNK_SIZE = 2000
+
+# rows per worksheet, the XLSX limit is 1,048,576 including the header
+XLSX_SHEET_ROWS = 1000000
+
+# control characters (and non characters) XML 1.0 does not allow
+XML_ILLEGAL = re.compile(
+    r'[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+# leading characters that make Excel, LibreOffice and Sheets read a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def attendance_export_rows(semister_year_id: Any,
+                           course_id: Optional[Any] = None,
+                           subject_id: Optional[Any] = None,
+                           date_from: Optional[datetime.date] = None,
+                           date_to: Optional[datetime.date] = None
+                           ) -> Iterator[Sequence[Any]]:
+    """
+    Reads the reports of a semister, optionally narrowed to a course, a
+    subject and a date range (both ends included).
+
+    The reports of an archived semister are read from the archive tables.
+
+    Returns:
+        iterator of (date, course, subject, student admin id, first name,
+        last name, status) tuples ordered by date and session.
+    """
+    filters = {'attendance_id__semister_year_id': semister_year_id}
+    if course_id:
+        filters['attendance_id__subject_id__course_id'] = course_id
+    if subject_id:
+        filters['attendance_id__subject_id'] = subject_id
+    if date_from:
+        filters['attendance_id__attendance_date__gte'] = date_from
+    if date_to:
+        filters['attendance_id__attendance_date__lte'] = date_to
+
+    # the archive tables use the same field names
+    rows = [
+        model.objects.filter(**filters).order_by(
+            'attendance_id__attendance_date', 'attendance_id_id',
+        ).values_list(
+            'attendance_id__attendance_date',
+            'attendance_id__subject_id__course_id__course_name',
+            'attendance_id__subject_id__subject_name',
+            'student_id__admin_id',
+            'student_id__admin__first_name',
+            'student_id__admin__last_name',
+            'status',
+        )
+        for model in report_sources(semister_year_id)
+    ]
+    for row in chained(rows, CHUNK_SIZE):
+        yield (*row[:-1], 'Present' if row[-1] else 'Absent')
+
+
+def export_text(value: Any) -> Any:
+    """
+    Makes a cell value safe to open: dates and numbers are kept, text loses
+    the characters XML forbids and gets a leading apostrophe when it would
+    start a formula.
+    """
+    if not isinstance(value, str):
+        return value
+    value = XML_ILLEGAL.sub('', value)
+    if value.startswith(FORMULA_PREFIXES):
+        value = "'" + value
+    return value
+
+
+def export_row(row: Sequence[Any]) -> List[Any]:
+    return [export_text(value) for value in row]
+
+
+class Echo:
+    '''
+    file like object returning what is written, for csv.writer
+    '''
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_chunks(rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADER)
+    batch: List[str] = []
+    for row in rows:
+        batch.append(writer.writerow(export_row(row)))
+        if len(batch) >= CHUNK_SIZE:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+class ZipStream:
+    '''
+    unseekable file object collecting what zipfile writes, drained by
+    the generator streaming the archive
+    '''
+
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def xlsx_cell(value: Any) -> str:
+    if isinstance(value, datetime.date):
+        value = value.isoformat()
+    text = escape(str(export_text(value)))
+    return f'<c t="inlineStr"><is><t>{text}</t></is></c>'
+
+
+def xlsx_row(row: Sequence[Any]) -> str:
+    return '<row>' + ''.join(xlsx_cell(value) for value in row) + '</row>'
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'content-types">'
+    '<Default Extension="rels" ContentType="application/'
+    'vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '{sheets}</Types>')
+XLSX_SHEET_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{index}.xml" '
+    'ContentType="application/'
+    'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships"><Relationship Id="rId1" Type="http://schemas.'
+    'openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>')
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/'
+    'main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/'
+    'relationships"><sheets>{sheets}</sheets></workbook>')
+XLSX_WORKBOOK_SHEET = (
+    '<sheet name="Attendance {index}" sheetId="{index}" r:id="rId{index}"/>')
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships">{sheets}</Relationships>')
+XLSX_WORKBOOK_SHEET_REL = (
+    '<Relationship Id="rId{index}" Type="http://schemas.openxmlformats.org/'
+    'officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{index}.xml"/>')
+XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/'
+    'main"><sheetData>')
+XLSX_SHEET_END = '</sheetData></worksheet>'
+
+
+def xlsx_chunks(rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """
+    Encodes rows as an XLSX workbook while they are read.
+
+    The archive is written to an unseekable stream, so zipfile emits each
+    part as it is compressed. Rows use inline strings, so no shared string
+    table has to be held in memory. A new worksheet starts every
+    XLSX_SHEET_ROWS rows; the workbook parts naming the sheets are written
+    last.
+    """
+    stream = ZipStream()
+    archive = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+    rows = iter(rows)
+    pending = None
+    sheets = 0
+    while True:
+        sheets += 1
+        with archive.open(f'xl/worksheets/sheet{sheets}.xml', 'w') as sheet:
+            sheet.write((XLSX_SHEET_START + xlsx_row(HEADER)).encode())
+            yield stream.drain()
+            if sheets == 1:
+                # only now is the query run
+                pending = next(rows, None)
+            written = 0
+            batch = []
+            while pending is not None and written < XLSX_SHEET_ROWS:
+                batch.append(xlsx_row(pending))
+                written += 1
+                pending = next(rows, None)
+                if len(batch) >= CHUNK_SIZE:
+                    sheet.write(''.join(batch).encode())
+                    batch = []
+                    yield stream.drain()
+            sheet.write((''.join(batch) + XLSX_SHEET_END).encode())
+        yield stream.drain()
+        if pending is None:
+            break
+
+    indexes = range(1, sheets + 1)
+    archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES.format(
+        sheets=''.join(XLSX_SHEET_TYPE.format(index=index)
+                       for index in indexes)))
+    archive.writestr('_rels/.rels', XLSX_ROOT_RELS)
+    archive.writestr('xl/workbook.xml', XLSX_WORKBOOK.format(
+        sheets=''.join(XLSX_WORKBOOK_SHEET.format(index=index)
+                       for index in indexes)))
+    archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS.format(
+        sheets=''.join(XLSX_WORKBOOK_SHEET_REL.format(index=index)
+                       for index in indexes)))
+    archive.close()
+    yield stream.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_chunks, 'text/csv'),
+    'xlsx': (xlsx_chunks, 'application/'
+             'vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def stream_export(rows: Iterable[Sequence[Any]], export_format: str,
+                  filename: str) -> StreamingHttpResponse:
+    """
+    Args:
+        rows: the rows to export, without header.
+        export_format: a key of EXPORT_FORMATS.
+        filename: download name, without extension.
+
+    Returns:
+        StreamingHttpResponse sending the file as an attachment.
+    """
+    encode, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(encode(rows), content_type=content_type)
+    response['Content-Disposition'] = \
+        f'attachment; filename="{filename}.{export_format}"'
+    return response
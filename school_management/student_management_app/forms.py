@@ -1,5 +1,5 @@
 from django import forms
-from .models import Courses, SemisterModel 
+from .choices import course_choices, semister_choices 
 
 
 class DateInput(forms.DateInput): 
@@ -28,44 +28,20 @@ class AddStudentForm(forms.Form):
 							max_length=50, 
 							widget=forms.TextInput(attrs={"class":"form-control"})) 
 
-	#For Displaying Courses 
-	try: 
-		courses = Courses.objects.all() 
-		course_list = [] 
-		for course in courses: 
-			single_course = (course.id, course.course_name) 
-			course_list.append(single_course) 
-	except Exception: 
-		print("here") 
-		course_list = [] 
-
-	#For Displaying Session Years
-	try: 
-		session_years = SemisterModel.objects.all()
-		session_year_list = []
-		for session_year in session_years: 
-			single_session_year = (
-				session_year.id,
-				f"{str(session_year.session_start_year)} to {str(session_year.session_end_year)}",
-			)
-			session_year_list.append(single_session_year) 
-
-	except Exception: 
-		session_year_list = [] 
-
 	gender_list = ( 
 		('Male','Male'), 
 		('Female','Female') 
 	) 
 
+	# Courses and Session Years are read when the form is used, see choices.py 
 	course_id = forms.ChoiceField(label="Course", 
-								choices=course_list, 
+								choices=course_choices, 
 								widget=forms.Select(attrs={"class":"form-control"}))
 	gender = forms.ChoiceField(label="Gender", 
 							choices=gender_list, 
 							widget=forms.Select(attrs={"class":"form-control"}))
 	session_year_id = forms.ChoiceField(label="Session Year", 
-										choices=session_year_list, 
+										choices=semister_choices, 
 										widget=forms.Select(attrs={"class":"form-control"}))
 	profile_pic = forms.FileField(label="Profile Pic", 
 								required=False, 
@@ -93,44 +69,20 @@ class EditStudentForm(forms.Form):
 							max_length=50, 
 							widget=forms.TextInput(attrs={"class":"form-control"})) 
 
-	# For Displaying Courses 
-	try: 
-		courses = Courses.objects.all() 
-		course_list = [] 
-		for course in courses: 
-			single_course = (course.id, course.course_name) 
-			course_list.append(single_course) 
-	except Exception: 
-		course_list = [] 
-
-	# For Displaying Session Years
-	try: 
-		session_years = SemisterModel.objects.all()
-		session_year_list = []
-		for session_year in session_years: 
-			single_session_year = (
-				session_year.id,
-				f"{str(session_year.session_start_year)} to {str(session_year.session_end_year)}",
-			)
-			session_year_list.append(single_session_year) 
-
-	except Exception: 
-		session_year_list = [] 
-
-
 	gender_list = ( 
 		('Male','Male'), 
 		('Female','Female') 
 	) 
 
+	# Courses and Session Years are read when the form is used, see choices.py 
 	course_id = forms.ChoiceField(label="Course", 
-								choices=course_list, 
+								choices=course_choices, 
 								widget=forms.Select(attrs={"class":"form-control"}))
 	gender = forms.ChoiceField(label="Gender", 
 							choices=gender_list, 
 							widget=forms.Select(attrs={"class":"form-control"}))
 	session_year_id = forms.ChoiceField(label="Session Year", 
-										choices=session_year_list, 
+										choices=semister_choices, 
 										widget=forms.Select(attrs={"class":"form-control"}))
 	profile_pic = forms.FileField(label="Profile Pic", 
 								required=False, 
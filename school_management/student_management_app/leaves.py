@@ -0,0 +1,142 @@
+'''
+Leave applications of students and staff.
+
+A leave covers leave_start to leave_end, both included. Moderation sets
+the status of any number of leaves with one UPDATE; since update() sends
+no signals, the dashboards the leaves appear on are invalidated, and the
+decisions published to the event streams, here.
+'''
+import datetime
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from .dashboard_cache import invalidate
+from .events import LEAVE_STATUS, publish_on_commit
+from .models import LeaveReportStudent, LeaveReportStaff
+
+
+LEAVE_PENDING = 0
+LEAVE_APPROVED = 1
+LEAVE_REJECTED = 2
+
+MODERATION_ACTIONS = {
+    'approve': LEAVE_APPROVED,
+    'reject': LEAVE_REJECTED,
+}
+
+# leave model and the lookup of the CustomUser whose dashboard shows it
+LEAVE_KINDS = {
+    'student': (LeaveReportStudent, 'student_id__admin_id'),
+    'staff': (LeaveReportStaff, 'staff_id__admin_id'),
+}
+
+
+class LeaveError(Exception):
+    '''
+    raised when a leave request or a moderation is rejected, nothing has
+    been written
+    '''
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(f'{len(errors)} invalid leave entries')
+        self.errors = errors
+
+
+def leave_dates(start: Any, end: Optional[Any] = None
+                ) -> Tuple[datetime.date, datetime.date]:
+    """
+    Parses the first and last day of a leave; a missing end makes a one
+    day leave.
+
+    Raises:
+        LeaveError: when a date is malformed or the leave ends before it
+            starts.
+    """
+    try:
+        start = datetime.date.fromisoformat(str(start))
+        end = datetime.date.fromisoformat(str(end)) if end else start
+    except ValueError:
+        raise LeaveError([{"id": None, "error": "invalid leave dates"}])
+    if end < start:
+        raise LeaveError([{"id": None, "error": "leave ends before it starts"}])
+    return start, end
+
+
+def on_leave(model: Any, start: datetime.date, end: datetime.date
+             ) -> QuerySet:
+    """
+    Approved leaves overlapping start to end (both included), served by
+    the (leave_status, leave_start, leave_end) index.
+    """
+    return model.objects.filter(leave_status=LEAVE_APPROVED,
+                                leave_start__lte=end, leave_end__gte=start)
+
+
+def week_bounds(day: Optional[datetime.date] = None
+                ) -> Tuple[datetime.date, datetime.date]:
+    """
+    Monday and Sunday of the week of a day, today by default.
+    """
+    day = day or datetime.date.today()
+    monday = day - datetime.timedelta(days=day.weekday())
+    return monday, monday + datetime.timedelta(days=6)
+
+
+def moderate_leaves(kind: str, leave_ids: Any, action: str) -> Dict[str, Any]:
+    """
+    Approves or rejects a set of leaves with a single UPDATE.
+
+    Args:
+        kind: 'student' or 'staff'.
+        leave_ids: ids of the leaves.
+        action: 'approve' or 'reject'.
+
+    Returns:
+        dict with the number of updated leaves and the ids that matched no
+        leave.
+
+    Raises:
+        LeaveError: when the kind, the action or an id is invalid.
+    """
+    errors = []
+    if kind not in LEAVE_KINDS:
+        errors.append({"id": None, "error": "kind must be student or staff"})
+    if action not in MODERATION_ACTIONS:
+        errors.append({"id": None,
+                       "error": "action must be approve or reject"})
+    if not isinstance(leave_ids, list):
+        errors.append({"id": None, "error": "ids must be a list"})
+        leave_ids = []
+    ids = []
+    for leave_id in leave_ids:
+        try:
+            ids.append(str(uuid.UUID(str(leave_id))))
+        except ValueError:
+            errors.append({"id": leave_id, "error": "invalid leave id"})
+    if errors:
+        raise LeaveError(errors)
+
+    model, user_lookup = LEAVE_KINDS[kind]
+    leaves = model.objects.filter(id__in=ids)
+    with transaction.atomic():
+        found = {
+            str(leave_id): user_id for leave_id, user_id in
+            leaves.values_list('id', user_lookup)
+        }
+        updated = leaves.update(leave_status=MODERATION_ACTIONS[action],
+                                updated_at=datetime.date.today())
+        user_ids = set(found.values())
+        transaction.on_commit(lambda: invalidate(
+            staff_user_ids=user_ids if kind == 'staff' else (),
+            student_user_ids=user_ids if kind == 'student' else ()))
+        for leave_id, user_id in found.items():
+            publish_on_commit([user_id], {
+                "type": LEAVE_STATUS, "id": leave_id,
+                "status": MODERATION_ACTIONS[action]})
+
+    return {
+        "updated": updated,
+        "missing": [leave_id for leave_id in ids if leave_id not in found],
+    }
@@ -0,0 +1,242 @@
+'''
+Concurrent HTTP load against a locally started application server.
+
+start_server() launches gunicorn (WSGI), uvicorn or daphne (ASGI) on the
+project in a subprocess, and run_load() fires many simulated clients at
+it, each posting its requests back to back as soon as the previous one is
+answered. open_stream() holds a server-sent events stream open for the
+event stream benchmark.
+'''
+import asyncio
+import contextlib
+import importlib.util
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from .utils import percentile
+
+
+SERVERS = {
+    'gunicorn': lambda port, workers, threads: [
+        '-m', 'gunicorn', 'school_management.wsgi:application',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+        '--threads', str(threads)],
+    'uvicorn': lambda port, workers, threads: [
+        '-m', 'uvicorn', 'school_management.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+        '--no-access-log'],
+    'daphne': lambda port, workers, threads: [
+        '-m', 'daphne', '-b', '127.0.0.1', '-p', str(port),
+        'school_management.asgi:application'],
+}
+
+ASGI_SERVERS = ('uvicorn', 'daphne')
+
+# (method, url, form data) of one request
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+def free_port() -> int:
+    with contextlib.closing(socket.socket()) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, process: subprocess.Popen,
+                  timeout: float = 30.0) -> None:
+    """
+    Raises:
+        RuntimeError: when the server exits or does not listen in time.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with code {process.returncode}')
+        with contextlib.closing(socket.socket()) as sock:
+            if sock.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f'server did not listen on port {port} in {timeout}s')
+
+
+@contextlib.contextmanager
+def run_server(server: str, workers: int = 1, threads: int = 8
+               ) -> Iterator[Tuple[subprocess.Popen, str]]:
+    """
+    Runs the project under an application server for the duration of the
+    block.
+
+    Args:
+        server: one of SERVERS.
+        workers: worker processes (daphne always runs one).
+        threads: threads per gunicorn worker.
+
+    Yields:
+        the server process and its base url.
+
+    Raises:
+        RuntimeError: when the server package is not installed or the
+            server does not start.
+    """
+    if importlib.util.find_spec(server) is None:
+        raise RuntimeError(f'{server} is not installed')
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, *SERVERS[server](port, workers, threads)],
+        cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port, process)
+        yield process, f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+@contextlib.contextmanager
+def start_server(server: str, workers: int = 1,
+                 threads: int = 8) -> Iterator[str]:
+    """
+    run_server() yielding the base url only.
+    """
+    with run_server(server, workers, threads) as (_, base_url):
+        yield base_url
+
+
+def resident_memory(pid: int) -> int:
+    """
+    Resident set size of a process in bytes, read from /proc (Linux) or
+    with psutil when it is installed.
+
+    Raises:
+        RuntimeError: when neither is available.
+    """
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+    except ImportError:
+        raise RuntimeError('reading process memory needs /proc or psutil')
+    return psutil.Process(pid).memory_info().rss
+
+
+async def open_stream(base_url: str, path: str, cookie: str,
+                      received: 'asyncio.Queue') -> None:
+    """
+    Holds one server-sent events stream open, putting the name of every
+    event received on the queue, until cancelled.
+
+    Raises:
+        RuntimeError: when the server does not answer 200.
+    """
+    url = urllib.parse.urlsplit(base_url)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port)
+    try:
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\n'
+            f'Accept: text/event-stream\r\nCookie: {cookie}\r\n\r\n'
+            .encode())
+        await writer.drain()
+        status = await reader.readline()
+        if b' 200 ' not in status:
+            raise RuntimeError(f'stream refused: {status.decode().strip()}')
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b'event: '):
+                received.put_nowait(line[7:].decode().strip())
+    finally:
+        writer.close()
+
+
+def send(base_url: str, request: Request,
+         headers: Optional[Dict[str, str]] = None) -> int:
+    method, url, data = request
+    body = urllib.parse.urlencode(data).encode() if method == 'post' else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(
+                base_url + url, data=body, headers=headers or {},
+                method=method.upper()), timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except OSError:
+        return 0
+
+
+def run_load(base_url: str, requests: Sequence[Request], clients: int,
+             per_client: int) -> Dict[str, Any]:
+    """
+    Sends requests from many concurrent clients.
+
+    Args:
+        base_url: url of the running server.
+        requests: the requests to cycle through, each client starting at
+            a different one.
+        clients: number of simultaneous clients.
+        per_client: requests sent by each client.
+
+    Returns:
+        dict with the overall throughput and, for every url, the number of
+        requests, failures (status 0 or >= 400) and latency percentiles in
+        milliseconds.
+    """
+    lock = threading.Lock()
+    samples: Dict[str, List[Tuple[float, int]]] = {}
+
+    def client(index: int) -> None:
+        for step in range(per_client):
+            request = requests[(index + step) % len(requests)]
+            started = time.perf_counter()
+            status = send(base_url, request)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                samples.setdefault(request[1], []).append((elapsed, status))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    wall = time.perf_counter() - started
+
+    routes = {}
+    for url, rows in samples.items():
+        timings = [elapsed for elapsed, _ in rows]
+        routes[url] = {
+            'requests': len(rows),
+            'failures': sum(1 for _, status in rows
+                            if status == 0 or status >= 400),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+        }
+    timings = [elapsed for rows in samples.values() for elapsed, _ in rows]
+    return {
+        'requests': len(timings),
+        'seconds': round(wall, 3),
+        'throughput': round(len(timings) / wall, 2),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'failures': sum(route['failures'] for route in routes.values()),
+        'routes': routes,
+    }
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student_management_app.archive import (
+    ArchiveError, archive_semister, closed_semisters, verify_semister
+)
+from student_management_app.models import SemisterArchive
+
+
+class Command(BaseCommand):
+    help = 'Moves the attendance of closed semisters into the archive ' \
+           'tables, a batch of sessions per transaction; run it again to ' \
+           'resume an interrupted run. --verify only checks the archived ' \
+           'semisters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semister', nargs='+', dest='semisters',
+                            help='semister ids, defaults to every semister '
+                                 'that has ended')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='sessions moved per transaction')
+        parser.add_argument('--verify', action='store_true',
+                            help='only check the archived semisters')
+
+    def handle(self, *args, **options):
+        semisters = options['semisters']
+        if options['verify']:
+            self.verify(semisters or list(
+                SemisterArchive.objects.values_list(
+                    'semister_year_id', flat=True)))
+            return
+
+        if not semisters:
+            semisters = list(closed_semisters().values_list('id', flat=True))
+        for semister_id in semisters:
+            try:
+                state = archive_semister(
+                    semister_id, batch_size=options['batch_size'],
+                    progress=lambda state: self.stdout.write(
+                        f'{state.semister_year_id_id}: {state.sessions} '
+                        f'sessions, {state.reports} reports'))
+            except ArchiveError as error:
+                raise CommandError(f'{semister_id}: {error}')
+            self.stdout.write(self.style.SUCCESS(
+                f'Archived semister {semister_id}: {state.sessions} '
+                f'sessions, {state.reports} reports'))
+
+    def verify(self, semisters):
+        failed = 0
+        for semister_id in semisters:
+            problems = verify_semister(semister_id)
+            for problem in problems[:50]:
+                key = ''.join(
+                    f' {name} {problem[name]}'
+                    for name in ('student_id', 'subject_id') if name in problem)
+                self.stdout.write(
+                    f"{semister_id} {problem['check']}{key}: expected "
+                    f"{problem['expected']} found {problem['found']}")
+            if problems:
+                failed += 1
+            else:
+                self.stdout.write(f'{semister_id}: archive verified')
+        if failed:
+            raise CommandError(f'{failed} archived semisters failed '
+                               'verification')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(semisters)} archived semisters verified'))
@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from student_management_app.benchmarks import (
+    ASYNC_ROUTES, BenchmarkError, Sample
+)
+from student_management_app.loadtest import (
+    ASGI_SERVERS, SERVERS, run_load, start_server
+)
+
+
+class Command(BaseCommand):
+    help = 'Starts the project under each application server in turn and ' \
+           'fires many concurrent clients at the attendance AJAX endpoints: ' \
+           'the synchronous views under gunicorn, their async versions ' \
+           'under uvicorn or daphne. Registers are really saved, so run it ' \
+           'against a generated school (see generate_school).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS),
+                            default=['gunicorn', 'uvicorn'])
+        parser.add_argument('--clients', type=int, default=100,
+                            help='simultaneous clients')
+        parser.add_argument('--requests', type=int, default=20,
+                            help='requests sent by each client')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='server worker processes')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='threads per gunicorn worker')
+        parser.add_argument('--routes', nargs='+', choices=ASYNC_ROUTES,
+                            default=list(ASYNC_ROUTES))
+        parser.add_argument('--output', help='write the report as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            specs = Sample().requests()
+        except BenchmarkError as error:
+            raise CommandError(str(error))
+        report = {}
+        for server in options['servers']:
+            # the ASGI servers are given the async views
+            prefix = 'async_' if server in ASGI_SERVERS else ''
+            requests = [
+                ('post', reverse(prefix + name), specs[name]['data'])
+                for name in options['routes']
+            ]
+            try:
+                with start_server(server, options['workers'],
+                                  options['threads']) as base_url:
+                    report[server] = run_load(
+                        base_url, requests, options['clients'],
+                        options['requests'])
+            except RuntimeError as error:
+                raise CommandError(f'{server}: {error}')
+            self.write_result(server, report[server])
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    def write_result(self, server, result):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{server}: {result['requests']} requests in "
+            f"{result['seconds']} s, {result['throughput']} req/s, "
+            f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+            f"{result['failures']} failed"))
+        for url, route in result['routes'].items():
+            self.stdout.write(
+                f"  {url:40} {route['requests']:6} p50 {route['p50_ms']:10.2f}"
+                f" ms  p99 {route['p99_ms']:10.2f} ms  "
+                f"{route['failures']} failed")
@@ -0,0 +1,165 @@
+import datetime
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection, \
+    connections
+
+from student_management_app.attendance import AttendanceError, save_register
+from student_management_app.dataset import SchoolGenerator
+from student_management_app.models import SemisterModel, Students, Subjects
+from student_management_app.utils import percentile
+
+
+class Command(BaseCommand):
+    help = 'Compares concurrent attendance write throughput across the ' \
+           'DATABASE_PROFILE settings. Each profile runs in its own ' \
+           'process against a throwaway test database, with threads ' \
+           'saving registers as if each save were a separate request.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+',
+                            default=['development', 'sqlite'],
+                            choices=sorted(settings.DATABASE_PROFILES))
+        parser.add_argument('--threads', type=int, default=16,
+                            help='concurrent writers')
+        parser.add_argument('--registers', type=int, default=25,
+                            help='registers saved by each writer')
+        parser.add_argument('--students', type=int, default=40,
+                            help='students per register')
+        parser.add_argument('--output', help='write the report as JSON')
+        # internal, set on the per profile child process
+        parser.add_argument('--run-profile', action='store_true',
+                            help='measure the current profile and print '
+                                 'the result as JSON')
+
+    def handle(self, *args, **options):
+        if options['run_profile']:
+            self.stdout.write(json.dumps(self.measure(options)))
+            return
+
+        report = {}
+        for profile in options['profiles']:
+            report[profile] = self.run_profile(profile, options)
+            self.write_result(profile, report[profile])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    def run_profile(self, profile, options):
+        command = [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'),
+            'benchmark_database_profiles', '--run-profile',
+            '--threads', str(options['threads']),
+            '--registers', str(options['registers']),
+            '--students', str(options['students']),
+        ]
+        result = subprocess.run(
+            command, capture_output=True, text=True,
+            env={**os.environ, 'DATABASE_PROFILE': profile})
+        if result.returncode != 0:
+            return {'skipped': result.stderr.strip().splitlines()[-1:]}
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def measure(self, options):
+        scratch = tempfile.mkdtemp()
+        if connection.vendor == 'sqlite':
+            # an in memory test database would hide the journal settings
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                scratch, 'benchmark.sqlite3')
+        database_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            registers = self.generate(options)
+            connections.close_all()
+            return self.write_registers(registers, options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def generate(self, options):
+        SchoolGenerator(
+            courses=options['threads'], subjects=options['threads'],
+            staffs=1, students=options['students'] * options['threads'],
+            semisters=1, reports=0,
+        ).generate_rows()
+        semister = SemisterModel.objects.get()
+        registers = []
+        for subject in Subjects.objects.order_by('subject_name'):
+            entries = [
+                {'id': str(admin_id), 'status': True} for admin_id in
+                Students.objects.filter(course_id=subject.course_id_id)
+                .values_list('admin_id', flat=True)
+            ]
+            registers.append((subject.id, semister.id,
+                              semister.semister_starts, entries))
+        return registers
+
+    def write_registers(self, registers, options):
+        lock = threading.Lock()
+        timings = []
+        failures = []
+
+        def writer(index):
+            subject_id, semister_id, starts, entries = \
+                registers[index % len(registers)]
+            for day in range(options['registers']):
+                attendance_date = starts + datetime.timedelta(days=day)
+                started = time.perf_counter()
+                try:
+                    save_register(subject_id, semister_id, attendance_date,
+                                  entries)
+                except (AttendanceError, OperationalError) as error:
+                    with lock:
+                        failures.append(str(error))
+                else:
+                    with lock:
+                        timings.append(
+                            (time.perf_counter() - started) * 1000)
+                finally:
+                    # end of a request: closes it unless CONN_MAX_AGE allows
+                    # reuse
+                    close_old_connections()
+            connections.close_all()
+
+        threads = [threading.Thread(target=writer, args=(index,))
+                   for index in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        return {
+            'vendor': connection.vendor,
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'pragmas': getattr(settings, 'SQLITE_PRAGMAS', {}),
+            'registers': len(timings),
+            'failures': len(failures),
+            'seconds': round(wall, 3),
+            'throughput': round(len(timings) / wall, 2),
+            'mean_ms': round(statistics.mean(timings), 3) if timings else None,
+            'p50_ms': round(percentile(timings, 50), 3) if timings else None,
+            'p99_ms': round(percentile(timings, 99), 3) if timings else None,
+        }
+
+    def write_result(self, profile, result):
+        if 'skipped' in result:
+            self.stdout.write(f'{profile:12} skipped: {result["skipped"]}')
+            return
+        self.stdout.write(
+            f'{profile:12} {result["registers"]:6} registers in '
+            f'{result["seconds"]} s, {result["throughput"]} registers/s, '
+            f'p50 {result["p50_ms"]} ms, p99 {result["p99_ms"]} ms, '
+            f'{result["failures"]} failed')
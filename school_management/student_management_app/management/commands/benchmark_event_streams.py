@@ -0,0 +1,138 @@
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, \
+    SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from student_management_app.benchmarks import BenchmarkError, Sample
+from student_management_app.loadtest import (
+    ASGI_SERVERS, open_stream, resident_memory, run_server, send
+)
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+
+def session_cookie(user) -> str:
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+class Command(BaseCommand):
+    help = 'Starts the project under an ASGI server, opens more and more ' \
+           'idle event streams for one student and reports the server ' \
+           'memory per open stream, then times one broadcast reaching ' \
+           'every stream. Run it against a generated school (see ' \
+           'generate_school); the broadcast is really saved.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=ASGI_SERVERS,
+                            default='uvicorn')
+        parser.add_argument('--connections', nargs='+', type=int,
+                            default=[250, 500, 1000, 2000],
+                            help='open stream counts to measure at')
+        parser.add_argument('--settle', type=float, default=2.0,
+                            help='seconds to wait before reading memory')
+        parser.add_argument('--output', help='write the report as JSON')
+
+    def handle(self, *args, **options):
+        if resource is not None:
+            # one socket per stream on the client side
+            _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+        try:
+            sample = Sample()
+        except BenchmarkError as error:
+            raise CommandError(str(error))
+        if sample.hod is None:
+            raise CommandError('the database has no HOD to broadcast with')
+        cookies = {'student': session_cookie(sample.student.admin),
+                   'hod': session_cookie(sample.hod)}
+        try:
+            with run_server(options['server']) as (process, base_url):
+                report = asyncio.run(self.measure(
+                    process.pid, base_url, cookies, sample, options))
+        except (RuntimeError, OSError) as error:
+            raise CommandError(f"{options['server']}: {error}")
+
+        for row in report['steps']:
+            self.stdout.write(
+                f"{row['connections']:6} streams  rss "
+                f"{row['rss_bytes'] / 2 ** 20:8.1f} MiB  "
+                f"{row['bytes_per_stream']:8.0f} bytes/stream")
+        fan_out = report['broadcast']
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"broadcast reached {fan_out['reached']}/"
+            f"{fan_out['connections']} streams in {fan_out['seconds']} s"))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    async def measure(self, pid, base_url, cookies, sample, options):
+        received = asyncio.Queue()
+        streams = []
+
+        async def open_streams(count):
+            while len(streams) < count:
+                streams.append(asyncio.create_task(open_stream(
+                    base_url, reverse('events'), cookies['student'],
+                    received)))
+            # every stream starts with its unread count
+            opened = 0
+            while opened < count:
+                event = await asyncio.wait_for(received.get(), 60)
+                opened += event == 'unread'
+            await asyncio.sleep(options['settle'])
+
+        try:
+            await open_streams(1)
+            baseline = resident_memory(pid)
+            steps = []
+            for count in sorted(options['connections']):
+                await open_streams(count)
+                rss = resident_memory(pid)
+                steps.append({
+                    'connections': count,
+                    'rss_bytes': rss,
+                    'bytes_per_stream': (rss - baseline) / max(count - 1, 1),
+                })
+            # the unread events of the last step have all been read
+            broadcast = await self.broadcast(base_url, cookies['hod'],
+                                             sample, received, len(streams))
+        finally:
+            for stream in streams:
+                stream.cancel()
+            await asyncio.gather(*streams, return_exceptions=True)
+        return {'server': options['server'], 'baseline_rss_bytes': baseline,
+                'steps': steps, 'broadcast': broadcast}
+
+    async def broadcast(self, base_url, cookie, sample, received, count):
+        request = ('post', reverse('broadcast_notification'),
+                   {'message': 'Event stream benchmark',
+                    'course': sample.course.id})
+        started = time.perf_counter()
+        status = await asyncio.get_running_loop().run_in_executor(
+            None, send, base_url, request, {'Cookie': cookie})
+        if status != 200:
+            raise RuntimeError(f'broadcast answered {status}')
+        reached = 0
+        try:
+            while reached < count:
+                event = await asyncio.wait_for(received.get(), 30)
+                reached += event == 'notification'
+        except asyncio.TimeoutError:
+            pass
+        return {'connections': count, 'reached': reached,
+                'seconds': round(time.perf_counter() - started, 3)}
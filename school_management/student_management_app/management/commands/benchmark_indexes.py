@@ -0,0 +1,97 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from student_management_app.dataset import SchoolGenerator
+from student_management_app.models import (
+    Attendance, AttendanceReport, StudentResult
+)
+
+
+INDEXED_MODELS = (Attendance, AttendanceReport, StudentResult)
+
+
+class Command(BaseCommand):
+    help = 'Shows query plans and timings of the hot attendance and result ' \
+           'queries with and without their composite indexes, on a dataset ' \
+           'generated in a throwaway test database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500)
+        parser.add_argument('--subjects', type=int, default=10)
+        parser.add_argument('--sessions', type=int, default=20,
+                            help='attendance sessions per subject')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='executions timed per query')
+
+    def handle(self, *args, **options):
+        database_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True)
+        try:
+            with transaction.atomic():
+                sample = self.generate(options)
+            self.run_queries('after: with composite indexes', sample, options)
+            self.drop_indexes()
+            self.run_queries('before: without composite indexes', sample,
+                             options)
+        finally:
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+
+    def generate(self, options):
+        '''
+        creates a one course school and returns the rows to query for
+        '''
+        SchoolGenerator(
+            courses=1, subjects=options['subjects'], staffs=1,
+            students=options['students'], semisters=1,
+            reports=options['students'] * options['subjects']
+            * options['sessions'],
+        ).generate_rows()
+        self.stdout.write(
+            f'Generated {AttendanceReport.objects.count()} attendance reports')
+
+        report = AttendanceReport.objects.select_related(
+            'attendance_id__subject_id'
+        ).order_by('attendance_id__attendance_date').last()
+        return {
+            'student': report.student_id,
+            'subject': report.attendance_id.subject_id,
+            'semister': report.attendance_id.semister_year_id,
+            'attendance': report.attendance_id,
+        }
+
+    def drop_indexes(self):
+        with connection.schema_editor() as editor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    editor.remove_index(model, index)
+                for constraint in model._meta.constraints:
+                    editor.remove_constraint(model, constraint)
+
+    def queries(self, sample):
+        semister = sample['semister']
+        return {
+            'reports of a student by status': AttendanceReport.objects.filter(
+                student_id=sample['student'], status=True),
+            'report of a student in a session': AttendanceReport.objects.filter(
+                attendance_id=sample['attendance'], student_id=sample['student']),
+            'sessions of a subject in a date range': Attendance.objects.filter(
+                subject_id=sample['subject'], semister_year_id=semister,
+                attendance_date__range=(
+                    semister.semister_starts,
+                    semister.semister_starts + datetime.timedelta(days=7))),
+            'result of a student in a subject': StudentResult.objects.filter(
+                student_id=sample['student'], subject_id=sample['subject']),
+        }
+
+    def run_queries(self, label, sample, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        for name, queryset in self.queries(sample).items():
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / options['repeat']
+            self.stdout.write(f'{name}: {elapsed * 1000:.3f} ms')
+            self.stdout.write(f'    {queryset.explain()}')
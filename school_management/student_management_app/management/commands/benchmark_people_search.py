@@ -0,0 +1,106 @@
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from student_management_app.dataset import (
+    FIRST_NAMES, LAST_NAMES, SchoolGenerator
+)
+from student_management_app.search import (
+    rebuild_people_search, search_people
+)
+from student_management_app.utils import percentile
+
+
+class Command(BaseCommand):
+    help = 'Times typeahead people searches against a throwaway test ' \
+           'database of generated users: every name is searched as it is ' \
+           'typed, one letter more per query, alone and followed by a ' \
+           'last name prefix. Fails when the p95 exceeds --target-ms.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000,
+                            help='generated students, plus 1%% staff')
+        parser.add_argument('--queries', type=int, default=2000)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--target-ms', type=float, default=20.0)
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--output', help='write the report as JSON')
+
+    def handle(self, *args, **options):
+        scratch = tempfile.mkdtemp()
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                scratch, 'benchmark.sqlite3')
+        database_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.generate(options)
+            report = self.measure(options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        self.stdout.write(
+            f"{report['vendor']}: {report['queries']} searches over "
+            f"{report['users']} users, mean {report['mean_ms']} ms, "
+            f"p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, "
+            f"p99 {report['p99_ms']} ms")
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+        if report['p95_ms'] > options['target_ms']:
+            raise CommandError(
+                f"p95 {report['p95_ms']} ms is over the "
+                f"{options['target_ms']} ms target")
+        self.stdout.write(self.style.SUCCESS('Within the latency target'))
+
+    def generate(self, options):
+        started = time.perf_counter()
+        SchoolGenerator(
+            courses=20, subjects=20, staffs=max(options['users'] // 100, 1),
+            students=options['users'], semisters=1, reports=0,
+        ).generate_rows()
+        indexed = rebuild_people_search()
+        if connection.vendor == 'postgresql':
+            # fresh statistics, so the planner picks the trigram indexes
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(
+            f'generated and indexed {indexed or options["users"]} users in '
+            f'{time.perf_counter() - started:.1f}s')
+
+    def typed(self, options):
+        pick = random.Random(options['seed']).choice
+        queries = []
+        while len(queries) < options['queries']:
+            first, last = pick(FIRST_NAMES), pick(LAST_NAMES)
+            queries.extend(first[:length] for length in range(1, 5))
+            queries.extend(f'{first} {last[:length]}'
+                           for length in range(1, 4))
+        return queries[:options['queries']]
+
+    def measure(self, options):
+        timings = []
+        found = 0
+        for query in self.typed(options):
+            started = time.perf_counter()
+            found += len(search_people(query, limit=options['limit']))
+            timings.append((time.perf_counter() - started) * 1000)
+        return {
+            'vendor': connection.vendor,
+            'users': options['users'],
+            'queries': len(timings),
+            'results': found,
+            'mean_ms': round(statistics.mean(timings), 3),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+        }
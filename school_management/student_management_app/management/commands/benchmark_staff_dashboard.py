@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from student_management_app.dashboard import staff_home_context
+from student_management_app.dataset import SchoolGenerator
+from student_management_app.models import CustomUser
+
+
+# (subjects taught, students in the staff member's courses)
+SCALES = ((1, 50), (5, 300), (20, 1500))
+
+
+class Command(BaseCommand):
+    help = 'Shows that the staff dashboard runs the same number of queries ' \
+           'for a staff member teaching 1 to 20 subjects to 50 to 1,500 ' \
+           'students, on schools generated in a throwaway test database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=4,
+                            help='courses the subjects are spread over')
+        parser.add_argument('--sessions', type=int, default=10,
+                            help='attendance sessions per subject')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='timed builds per scale')
+
+    def handle(self, *args, **options):
+        database_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True)
+        try:
+            for subjects, students in SCALES:
+                with transaction.atomic():
+                    self.run_scale(subjects, students, options)
+                    transaction.set_rollback(True)
+        finally:
+            connection.creation.destroy_test_db(database_name, verbosity=0)
+
+    def run_scale(self, subjects, students, options):
+        courses = min(options['courses'], subjects)
+        # a single staff member teaches every generated subject
+        SchoolGenerator(
+            courses=courses, subjects=subjects, staffs=1, students=students,
+            semisters=1,
+            reports=students * subjects // courses * options['sessions'],
+        ).generate()
+        staff_user_id = CustomUser.objects.get(
+            user_type=CustomUser.STAFF).id
+
+        with CaptureQueriesContext(connection) as queries:
+            context = staff_home_context(staff_user_id)
+        started = time.perf_counter()
+        for _ in range(options['repeat']):
+            staff_home_context(staff_user_id)
+        elapsed = (time.perf_counter() - started) / options['repeat']
+
+        reports = sum(context['attendance_present_list']) + \
+            sum(context['attendance_absent_list'])
+        self.stdout.write(
+            f'{context["subject_count"]} subjects, '
+            f'{context["students_count"]} students, {reports} reports: '
+            f'{len(queries)} queries, {elapsed * 1000:.3f} ms')
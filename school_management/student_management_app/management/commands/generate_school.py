@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from student_management_app.dataset import DEFAULT_PASSWORD, SchoolGenerator
+
+
+class Command(BaseCommand):
+    help = 'Fills the database with a synthetic school for benchmarking. ' \
+           f'Every generated user has the password "{DEFAULT_PASSWORD}".'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=50)
+        parser.add_argument('--subjects', type=int, default=2000)
+        parser.add_argument('--staffs', type=int, default=400)
+        parser.add_argument('--students', type=int, default=50000)
+        parser.add_argument('--reports', type=int, default=5000000,
+                            help='number of attendance reports')
+        parser.add_argument('--semisters', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='rows per bulk insert')
+
+    def handle(self, *args, **options):
+        generator = SchoolGenerator(
+            courses=options['courses'],
+            subjects=options['subjects'],
+            staffs=options['staffs'],
+            students=options['students'],
+            reports=options['reports'],
+            semisters=options['semisters'],
+            seed=options['seed'],
+            chunk_size=options['chunk_size'],
+            log=self.stdout.write,
+        )
+        started = time.perf_counter()
+        counts = generator.generate()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {sum(counts.values())} rows in {elapsed:.1f}s'))
@@ -0,0 +1,55 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_management_app.student_import import (
+    StudentImportError, import_students, read_rows, validate_students
+)
+
+
+class Command(BaseCommand):
+    help = 'Enrols the students listed in a CSV (with a header row) or ' \
+           'JSON file. Columns: first_name, last_name, username, email, ' \
+           'password, course_id, session_year_id, address, gender. ' \
+           'Nothing is written unless every row is valid.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'json'),
+                            help='defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='rows per bulk insert')
+        parser.add_argument('--workers', type=int,
+                            help='password hashing processes, defaults to '
+                                 'the number of CPUs')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='only validate the file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or \
+            ('json' if path.lower().endswith('.json') else 'csv')
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        with open(path, encoding='utf-8-sig') as source:
+            content = source.read()
+
+        try:
+            rows = validate_students(read_rows(content, file_format))
+            self.stdout.write(f'{len(rows)} valid rows')
+            if options['dry_run']:
+                return
+            for event in import_students(rows, options['batch_size'],
+                                         options['workers']):
+                if event['stage'] == 'done':
+                    self.stdout.write(self.style.SUCCESS(
+                        f"Created {event['created']} students"))
+                else:
+                    self.stdout.write(
+                        f"{event['stage']}: {event['done']}/{event['total']}")
+        except StudentImportError as error:
+            for entry in error.errors:
+                self.stderr.write(
+                    f"row {entry['row']} {entry.get('field', '')}: "
+                    f"{entry['error']}")
+            raise CommandError(str(error))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from student_management_app.attendance import rebuild_summaries, summary_drift
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the AttendanceSummary counters from AttendanceReport, ' \
+           'or checks them for drift with --check'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='only compare the stored counters with the reports')
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='rows per bulk insert when rebuilding')
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            written = rebuild_summaries(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt {written} attendance summaries'))
+            return
+
+        drift = summary_drift()
+        for row in drift[:50]:
+            self.stdout.write(
+                f"student {row['student_id']} subject {row['subject_id']} "
+                f"semister {row['semister_year_id']}: "
+                f"expected {row['expected']} stored {row['stored']}")
+        if drift:
+            raise CommandError(
+                f'{len(drift)} attendance summaries drifted, '
+                'run rebuild_attendance_summary to repair them')
+        self.stdout.write(self.style.SUCCESS('Attendance summaries in sync'))
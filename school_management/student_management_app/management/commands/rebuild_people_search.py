@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from student_management_app.search import rebuild_people_search
+
+
+class Command(BaseCommand):
+    help = 'Refills the SQLite people search index from CustomUser, e.g. ' \
+           'after users were written without signals. PostgreSQL ' \
+           'searches the user table itself and needs no rebuild.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='users per batch of index rows')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write(f'{connection.vendor} has no index to rebuild')
+            return
+        indexed = rebuild_people_search(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} users'))
@@ -0,0 +1,75 @@
+import datetime
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from student_management_app.benchmarks import (
+    BenchmarkError, compare_reports, run_benchmarks
+)
+from student_management_app.models import (
+    Courses, Subjects, Students, Attendance, AttendanceReport
+)
+
+
+class Command(BaseCommand):
+    help = 'Times and counts the queries of every route in ' \
+           'student_management_app/urls.py and writes a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='timed requests per route')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--compare', metavar='REPORT',
+                            help='earlier report to compare against')
+        parser.add_argument('--only', nargs='+', metavar='URL_NAME',
+                            help='restrict the run to these url names')
+
+    def handle(self, *args, **options):
+        try:
+            results = run_benchmarks(repeat=options['repeat'],
+                                     only=options['only'])
+        except BenchmarkError as error:
+            raise CommandError(str(error))
+        report = {
+            'commit': self.current_commit(),
+            'created_at': datetime.datetime.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': {
+                model.__name__: model.objects.count() for model in
+                (Courses, Subjects, Students, Attendance, AttendanceReport)
+            },
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, default=str)
+
+        for name, result in report['results'].items():
+            if 'skipped' in result:
+                self.stdout.write(f"{name:40} skipped: {result['skipped']}")
+            else:
+                self.stdout.write(
+                    f"{name:40} {result['status']} {result['queries']:6} "
+                    f"queries {result['mean_ms']:10.2f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Report written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                rows = compare_reports(json.load(baseline), report)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"Compared with {options['compare']}"))
+            for row in rows:
+                queries, mean_ms = row['queries'], row['mean_ms']
+                self.stdout.write(
+                    f"{row['name']:40} queries {queries[0]} -> {queries[1]}, "
+                    f"mean {mean_ms[0]:.2f} -> {mean_ms[1]:.2f} ms")
+
+    def current_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True,
+                text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
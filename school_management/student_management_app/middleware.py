@@ -0,0 +1,216 @@
+'''
+Opt-in request profiler.
+
+QueryProfilerMiddleware records, for every request, the wall time, the
+number of SQL queries, the time spent in SQL and the query templates that
+ran more than once (the usual sign of an N+1 loop). Samples are kept in an
+in-process ring buffer and summarised per view by profile_summary().
+The queries of a streamed response are counted until its last chunk.
+
+A sample keeps only numbers: the repeated templates are reduced to the
+fingerprints of the SAMPLE_DUPLICATES most repeated ones, and their text
+is kept once per fingerprint, for the QUERY_PROFILER_STATEMENTS most
+recently seen templates.
+
+Enable it by adding
+'student_management_app.middleware.QueryProfilerMiddleware' to
+settings.MIDDLEWARE, or by setting QUERY_PROFILER=1 in the environment.
+'''
+import collections
+import contextlib
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+from .utils import percentile
+
+
+logger = logging.getLogger(__name__)
+
+# repeated query templates kept per sample, most repeated first
+SAMPLE_DUPLICATES = 5
+
+Sample = collections.namedtuple(
+    'Sample', ['view', 'wall_ms', 'queries', 'sql_ms', 'duplicates'])
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.blake2b(sql.encode(), digest_size=8).hexdigest()
+
+
+class QueryRecorder:
+    '''
+    database execute wrapper counting and timing the queries of a request
+    '''
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sql_ms = 0.0
+        self.signatures = collections.Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - started) * 1000
+            self.count += 1
+            # parameters are kept out of the SQL, so the text is the template
+            self.signatures[sql] += 1
+
+    def duplicates(self) -> Dict[str, int]:
+        return {sql: runs for sql, runs in self.signatures.items() if runs > 1}
+
+    def top_duplicates(self) -> Tuple[Dict[str, int], Dict[str, str]]:
+        """
+        The SAMPLE_DUPLICATES most repeated templates.
+
+        Returns:
+            tuple of the runs keyed by fingerprint and the templates keyed
+            by fingerprint.
+        """
+        top = collections.Counter(self.duplicates()).most_common(
+            SAMPLE_DUPLICATES)
+        return ({fingerprint(sql): runs for sql, runs in top},
+                {fingerprint(sql): sql for sql, _ in top})
+
+
+class ProfileBuffer:
+    '''
+    thread safe ring buffer of the most recent request samples, with the
+    text of the query templates they refer to by fingerprint
+    '''
+
+    def __init__(self, size: int, statements: int) -> None:
+        self.lock = threading.Lock()
+        self.samples: Deque[Sample] = collections.deque(maxlen=size)
+        self.max_statements = statements
+        self.statements = collections.OrderedDict()
+
+    def add(self, sample: Sample, statements: Dict[str, str]) -> None:
+        with self.lock:
+            self.samples.append(sample)
+            for key, sql in statements.items():
+                self.statements[key] = sql
+                self.statements.move_to_end(key)
+            while len(self.statements) > self.max_statements:
+                self.statements.popitem(last=False)
+
+    def snapshot(self) -> Tuple[List[Sample], Dict[str, str]]:
+        with self.lock:
+            return list(self.samples), dict(self.statements)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.samples.clear()
+            self.statements.clear()
+
+
+buffer = ProfileBuffer(
+    getattr(settings, 'QUERY_PROFILER_BUFFER_SIZE', 5000),
+    getattr(settings, 'QUERY_PROFILER_STATEMENTS', 500))
+
+
+@contextlib.contextmanager
+def recording(recorder: QueryRecorder):
+    with contextlib.ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+class QueryProfilerMiddleware:
+    '''
+    records wall time and SQL activity of each request into the buffer,
+    and logs requests that exceed settings.QUERY_PROFILER_BUDGET queries
+    '''
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+        self.budget: Optional[int] = getattr(
+            settings, 'QUERY_PROFILER_BUDGET', None)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recording(recorder):
+            response = self.get_response(request)
+        if response.streaming and not getattr(response, 'is_async', False):
+            # the rows of a streamed response are queried while it is sent
+            response.streaming_content = self.stream(
+                response.streaming_content, request, recorder, started)
+        else:
+            self.record(request, recorder, started)
+        return response
+
+    def stream(self, content, request, recorder: QueryRecorder,
+               started: float):
+        try:
+            with recording(recorder):
+                yield from content
+        finally:
+            self.record(request, recorder, started)
+
+    def record(self, request, recorder: QueryRecorder,
+               started: float) -> None:
+        wall_ms = (time.perf_counter() - started) * 1000
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+        runs, statements = recorder.top_duplicates()
+        buffer.add(Sample(view, wall_ms, recorder.count, recorder.sql_ms,
+                          runs), statements)
+
+        if self.budget is not None and recorder.count > self.budget:
+            duplicates = recorder.duplicates()
+            logger.warning(
+                '%s ran %d queries (budget %d) in %.1f ms, %d repeated',
+                view, recorder.count, self.budget, wall_ms,
+                sum(duplicates.values()),
+                extra={'duplicate_queries': duplicates})
+
+
+def profile_summary(top: int = 5) -> Dict[str, Dict[str, Any]]:
+    """
+    Summarises the buffered samples per view.
+
+    Args:
+        top: number of most repeated query templates to report per view.
+
+    Returns:
+        dict of view name to request count, wall time and SQL time
+        percentiles, query count statistics and the query templates that
+        were repeated within a request most often; a template evicted
+        from the buffer is reported by its fingerprint.
+    """
+    samples, statements = buffer.snapshot()
+    per_view = collections.defaultdict(list)
+    for sample in samples:
+        per_view[sample.view].append(sample)
+
+    summary = {}
+    for view, samples in per_view.items():
+        wall = [sample.wall_ms for sample in samples]
+        sql = [sample.sql_ms for sample in samples]
+        queries = [sample.queries for sample in samples]
+        repeated = collections.Counter()
+        for sample in samples:
+            repeated.update(sample.duplicates)
+        summary[view] = {
+            'requests': len(samples),
+            'wall_ms': {f'p{p}': round(percentile(wall, p), 3)
+                        for p in (50, 95, 99)},
+            'sql_ms': {f'p{p}': round(percentile(sql, p), 3)
+                       for p in (50, 95, 99)},
+            'queries': {'mean': round(sum(queries) / len(queries), 2),
+                        'max': max(queries)},
+            'duplicate_queries': [
+                {'sql': statements.get(key, key), 'runs': runs}
+                for key, runs in repeated.most_common(top)
+            ],
+        }
+    return summary
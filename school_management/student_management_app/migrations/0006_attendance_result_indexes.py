@@ -0,0 +1,91 @@
+# Generated by Django 4.2.10 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+
+
+def remove_duplicates(apps, schema_editor):
+    '''
+    keeps one row per (attendance, student) report and per (student,
+    subject) result so that the unique constraints can be created.
+
+    The kept row is the one updated last; updated_at is a date, so rows
+    updated on the same day are told apart by the larger id. The ids of
+    the deleted rows are printed, and the AttendanceSummary counters are
+    rebuilt when reports were deleted.
+    '''
+    duplicated = [
+        ('AttendanceReport', ('attendance_id', 'student_id')),
+        ('StudentResult', ('student_id', 'subject_id')),
+    ]
+    deleted_reports = False
+    for model_name, fields in duplicated:
+        model = apps.get_model('student_management_app', model_name)
+        groups = model.objects.values(*fields).annotate(
+            rows=Count('id')).filter(rows__gt=1).order_by()
+        for group in groups:
+            keys = {field: group[field] for field in fields}
+            keep = model.objects.filter(**keys).order_by(
+                '-updated_at', '-id').values_list('id', flat=True).first()
+            duplicates = model.objects.filter(**keys).exclude(id=keep)
+            for duplicate_id in duplicates.values_list('id', flat=True):
+                print(f'\n  deleted duplicate {model_name} {duplicate_id}, '
+                      f'kept {keep}', end='')
+            duplicates.delete()
+            deleted_reports |= model_name == 'AttendanceReport'
+    if deleted_reports:
+        rebuild_summaries(apps)
+
+
+def rebuild_summaries(apps):
+    # the counters of 0005, recomputed from the remaining reports
+    AttendanceReport = apps.get_model('student_management_app',
+                                      'AttendanceReport')
+    AttendanceSummary = apps.get_model('student_management_app',
+                                       'AttendanceSummary')
+    AttendanceSummary.objects.all().delete()
+    rows = AttendanceReport.objects.values(
+        'student_id',
+        subject_id=F('attendance_id__subject_id'),
+        semister_year_id=F('attendance_id__semister_year_id'),
+    ).annotate(
+        present=Count('id', filter=Q(status=True)),
+        absent=Count('id', filter=Q(status=False)),
+        total=Count('id'),
+    ).order_by()
+    AttendanceSummary.objects.bulk_create([
+        AttendanceSummary(
+            student_id_id=row['student_id'],
+            subject_id_id=row['subject_id'],
+            semister_year_id_id=row['semister_year_id'],
+            present=row['present'], absent=row['absent'],
+            total=row['total'])
+        for row in rows.iterator()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_app', '0005_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['subject_id', 'semister_year_id', 'attendance_date'], name='attendance_subj_sem_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancereport',
+            index=models.Index(fields=['student_id', 'status'], name='attreport_student_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendancereport',
+            constraint=models.UniqueConstraint(fields=('attendance_id', 'student_id'), name='unique_attendance_report'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentresult',
+            constraint=models.UniqueConstraint(fields=('student_id', 'subject_id'), name='unique_student_result'),
+        ),
+    ]
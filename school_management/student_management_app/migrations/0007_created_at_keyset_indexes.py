@@ -0,0 +1,41 @@
+# Generated by Django 4.2.10 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_app', '0006_attendance_result_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='staffs',
+            index=models.Index(fields=['-created_at', '-id'], name='staffs_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subjects',
+            index=models.Index(fields=['-created_at', '-id'], name='subjects_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='students',
+            index=models.Index(fields=['-created_at', '-id'], name='students_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leavereportstudent',
+            index=models.Index(fields=['-created_at', '-id'], name='leavestudent_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leavereportstaff',
+            index=models.Index(fields=['-created_at', '-id'], name='leavestaff_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedbackstudent',
+            index=models.Index(fields=['-created_at', '-id'], name='feedbackstudent_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedbackstaffs',
+            index=models.Index(fields=['-created_at', '-id'], name='feedbackstaffs_created_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.10 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_app', '0007_created_at_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('attendance_date', models.DateField()),
+                ('semister_year_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='student_management_app.semistermodel')),
+                ('subject_id', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='student_management_app.subjects')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SemisterArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done')], default='running', max_length=10)),
+                ('sessions', models.IntegerField(default=0)),
+                ('reports', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('semister_year_id', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archive', to='student_management_app.semistermodel')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttendanceReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.BooleanField(default=False)),
+                ('attendance_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='student_management_app.archivedattendance')),
+                ('student_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='student_management_app.students')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedattendance',
+            index=models.Index(fields=['subject_id', 'semister_year_id', 'attendance_date'], name='archived_subj_sem_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedattendancereport',
+            constraint=models.UniqueConstraint(fields=('attendance_id', 'student_id'), name='unique_archived_report'),
+        ),
+    ]
@@ -0,0 +1,164 @@
+# Generated by Django 4.2.10 on 2026-10-18 13:00
+
+import datetime
+import re
+
+from django.db import migrations, models
+
+
+ISO_DATE = re.compile(r'\d{4}-\d{1,2}-\d{1,2}')
+OTHER_FORMATS = ('%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%d.%m.%Y', '%B %d, %Y',
+                 '%d %B %Y')
+
+
+def parse_leave_date(text, fallback):
+    """
+    Reads the free text leave_date, either one date or a range such as
+    "2024-02-01 to 2024-02-03"; text that holds no date becomes a one day
+    leave on the day it was applied for.
+
+    Slashed dates are read day first, as the school writes them, so
+    03/04/2024 is the 3rd of April; month first is only tried when day
+    first cannot read the text, as for 12/31/2024. split_leave_dates()
+    prints the leaves that could be read both ways or not at all.
+    """
+    found = []
+    for match in ISO_DATE.findall(text or ''):
+        try:
+            found.append(datetime.datetime.strptime(match, '%Y-%m-%d').date())
+        except ValueError:
+            pass
+    if not found:
+        for date_format in OTHER_FORMATS:
+            try:
+                found.append(datetime.datetime.strptime(
+                    (text or '').strip(), date_format).date())
+                break
+            except ValueError:
+                pass
+    if not found:
+        found = [fallback]
+    return min(found), max(found)
+
+
+def leave_date_doubt(text):
+    """
+    Why the reading of parse_leave_date() may not be what was meant:
+    'ambiguous' when the text is a valid date both day first and month
+    first, 'unreadable' when it holds no date, else None.
+    """
+    text = (text or '').strip()
+    readings = set()
+    for date_format in ('%d/%m/%Y', '%m/%d/%Y'):
+        try:
+            readings.add(datetime.datetime.strptime(text, date_format).date())
+        except ValueError:
+            pass
+    if len(readings) > 1:
+        return 'ambiguous'
+    if parse_leave_date(text, None) == (None, None):
+        return 'unreadable'
+    return None
+
+
+def split_leave_dates(apps, schema_editor):
+    for name in ('LeaveReportStudent', 'LeaveReportStaff'):
+        model = apps.get_model('student_management_app', name)
+        batch = []
+        for leave in model.objects.only(
+                'id', 'leave_date', 'created_at').iterator(chunk_size=2000):
+            leave.leave_start, leave.leave_end = parse_leave_date(
+                leave.leave_date, leave.created_at)
+            doubt = leave_date_doubt(leave.leave_date)
+            if doubt:
+                print(f'\n  {doubt} {name} {leave.id} leave_date '
+                      f'{leave.leave_date!r}, read as {leave.leave_start} '
+                      f'to {leave.leave_end}', end='')
+            batch.append(leave)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['leave_start', 'leave_end'])
+                batch = []
+        model.objects.bulk_update(batch, ['leave_start', 'leave_end'])
+
+
+def join_leave_dates(apps, schema_editor):
+    for name in ('LeaveReportStudent', 'LeaveReportStaff'):
+        model = apps.get_model('student_management_app', name)
+        batch = []
+        for leave in model.objects.only(
+                'id', 'leave_start', 'leave_end').iterator(chunk_size=2000):
+            leave.leave_date = str(leave.leave_start) \
+                if leave.leave_start == leave.leave_end \
+                else f'{leave.leave_start} to {leave.leave_end}'
+            batch.append(leave)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['leave_date'])
+                batch = []
+        model.objects.bulk_update(batch, ['leave_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_app', '0008_attendance_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leavereportstudent',
+            name='leave_start',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='leavereportstudent',
+            name='leave_end',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='leavereportstaff',
+            name='leave_start',
+            field=models.DateField(null=True),
+        ),
+        migrations.AddField(
+            model_name='leavereportstaff',
+            name='leave_end',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(split_leave_dates, join_leave_dates),
+        migrations.RemoveField(
+            model_name='leavereportstudent',
+            name='leave_date',
+        ),
+        migrations.RemoveField(
+            model_name='leavereportstaff',
+            name='leave_date',
+        ),
+        migrations.AlterField(
+            model_name='leavereportstudent',
+            name='leave_start',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='leavereportstudent',
+            name='leave_end',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='leavereportstaff',
+            name='leave_start',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='leavereportstaff',
+            name='leave_end',
+            field=models.DateField(),
+        ),
+        migrations.AddIndex(
+            model_name='leavereportstudent',
+            index=models.Index(fields=['leave_status', 'leave_start', 'leave_end'], name='leavestudent_status_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leavereportstaff',
+            index=models.Index(fields=['leave_status', 'leave_start', 'leave_end'], name='leavestaff_status_dates_idx'),
+        ),
+    ]
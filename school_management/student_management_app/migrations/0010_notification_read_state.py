@@ -0,0 +1,31 @@
+# Generated by Django 4.2.10 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_app', '0009_leave_date_ranges'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationstudent',
+            name='read',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='notificationstaffs',
+            name='read',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='notificationstudent',
+            index=models.Index(fields=['student_id', 'read'], name='notifstudent_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationstaffs',
+            index=models.Index(fields=['staff_id', 'read'], name='notifstaff_unread_idx'),
+        ),
+    ]
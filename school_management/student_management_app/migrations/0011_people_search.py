@@ -0,0 +1,56 @@
+# Generated by Django 4.2.10 on 2026-10-18 16:00
+
+from django.db import migrations
+
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'username', 'email')
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    table = apps.get_model('student_management_app', 'CustomUser')._meta.db_table
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in SEARCH_FIELDS:
+            # the expression of the istartswith lookups of search.py
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS people_{field}_trgm_idx '
+                f'ON {table} USING gin ((UPPER(("{field}")::text)) gin_trgm_ops)')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS people_search USING fts5('
+            'user_id UNINDEXED, user_type UNINDEXED, '
+            'first_name, last_name, username, email, '
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3')")
+        CustomUser = apps.get_model('student_management_app', 'CustomUser')
+        rows = [
+            (user_id.int & (2 ** 63 - 1), user_id.hex, user_type,
+             first_name, last_name, username, email)
+            for user_id, user_type, first_name, last_name, username, email in
+            CustomUser.objects.values_list('id', 'user_type', *SEARCH_FIELDS)
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO people_search (rowid, user_id, user_type, '
+                'first_name, last_name, username, email) '
+                'VALUES (%s, %s, %s, %s, %s, %s, %s)', rows)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS people_{field}_trgm_idx')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS people_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_app', '0010_notification_read_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
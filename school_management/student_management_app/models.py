@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser 
 from django.db import models 
+from django.db.models.functions import Lower
 from django.db.models.signals import post_save 
 from django.dispatch import receiver
 import uuid
@@ -43,6 +44,12 @@ class CustomUser(AbstractUser):
         editable = False
     )
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # case insensitive email lookups of availability.py
+            models.Index(Lower('email'), name='customuser_email_lower_idx'),
+        ]
+
 
 
 class BaseModel(models.Model):
@@ -77,6 +84,12 @@ class Staffs(BaseModel):
     admin = models.OneToOneField(CustomUser, on_delete = models.CASCADE)
     address = models.TextField()
 
+    class Meta:
+        indexes = [
+            # keyset pagination of the HOD lists
+            models.Index(fields=['-created_at', '-id'], name='staffs_created_idx'),
+        ]
+
     def __str__(self)-> str:
         return f'{self.admin.username} is Staff'
 
@@ -101,6 +114,11 @@ class Subjects(BaseModel):
         )  
     staff_id = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='subjects_created_idx'),
+        ]
+
     def __str__(self)-> str:
         return f'{subject_name}'
 
@@ -124,6 +142,11 @@ class Students(BaseModel):
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='students_created_idx'),
+        ]
+
     def __str__(self)-> str:
         return f'{self.admin.username} is Student'
 
@@ -142,6 +165,15 @@ class Attendance(BaseModel):
         SemisterModel,
         on_delete=models.CASCADE
     )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['subject_id', 'semister_year_id', 'attendance_date'],
+                name='attendance_subj_sem_date_idx'
+            ),
+        ]
+
     
 class AttendanceReport(BaseModel):
     '''
@@ -157,26 +189,149 @@ class AttendanceReport(BaseModel):
         ) 
     status = models.BooleanField(default=False) 
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['student_id', 'status'],
+                name='attreport_student_status_idx'
+            ),
+        ]
+        constraints = [
+            # also serves lookups on (attendance_id, student_id)
+            models.UniqueConstraint(
+                fields=['attendance_id', 'student_id'],
+                name='unique_attendance_report'
+            ),
+        ]
+
+
+class AttendanceSummary(BaseModel):
+    '''
+    Denormalised attendance counters of a student in a subject and semister,
+    kept up to date by the attendance write paths
+    '''
+    student_id = models.ForeignKey(Students, on_delete=models.CASCADE)
+    subject_id = models.ForeignKey(Subjects, on_delete=models.CASCADE)
+    semister_year_id = models.ForeignKey(
+        SemisterModel,
+        on_delete=models.CASCADE
+    )
+    present = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student_id', 'subject_id', 'semister_year_id'],
+                name='unique_attendance_summary'
+            ),
+        ]
+
+
+class SemisterArchive(models.Model):
+    '''
+    Progress and totals of a closed semister moved into the archive tables,
+    see archive.py
+    '''
+    RUNNING = 'running'
+    DONE = 'done'
+    status_choices = ((RUNNING, 'Running'), (DONE, 'Done'))
+
+    semister_year_id = models.OneToOneField(
+        SemisterModel,
+        on_delete=models.CASCADE,
+        related_name='archive'
+    )
+    status = models.CharField(
+        max_length=10, choices=status_choices, default=RUNNING)
+    sessions = models.IntegerField(default=0)
+    reports = models.IntegerField(default=0)
+    present = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+
+class ArchivedAttendance(models.Model):
+    '''
+    An Attendance session of an archived semister, keeping its id
+    '''
+    id = models.UUIDField(primary_key=True, editable=False)
+    subject_id = models.ForeignKey(Subjects, on_delete=models.DO_NOTHING)
+    semister_year_id = models.ForeignKey(
+        SemisterModel,
+        on_delete=models.CASCADE
+    )
+    attendance_date = models.DateField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['subject_id', 'semister_year_id', 'attendance_date'],
+                name='archived_subj_sem_date_idx'
+            ),
+        ]
+
+
+class ArchivedAttendanceReport(models.Model):
+    '''
+    An AttendanceReport of an archived semister, without the timestamps
+    '''
+    attendance_id = models.ForeignKey(
+        ArchivedAttendance,
+        on_delete=models.CASCADE
+    )
+    student_id = models.ForeignKey(Students, on_delete=models.CASCADE)
+    status = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['attendance_id', 'student_id'],
+                name='unique_archived_report'
+            ),
+        ]
+
 
 class LeaveReportStudent(BaseModel):
     '''
     Define a leave report for students
     '''
     student_id = models.ForeignKey(Students, on_delete=models.CASCADE) 
-    leave_date = models.CharField(max_length=255) 
+    # first and last day of the leave, both included
+    leave_start = models.DateField()
+    leave_end = models.DateField()
     leave_message = models.TextField() 
     leave_status = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='leavestudent_created_idx'),
+            # approved leaves overlapping a date range
+            models.Index(fields=['leave_status', 'leave_start', 'leave_end'],
+                         name='leavestudent_status_dates_idx'),
+        ]
+
 
 class LeaveReportStaff(BaseModel):
     '''
     Define a leave report for staff
     '''
     staff_id = models.ForeignKey(Staffs, on_delete=models.CASCADE) 
-    leave_date = models.CharField(max_length=255) 
+    # first and last day of the leave, both included
+    leave_start = models.DateField()
+    leave_end = models.DateField()
     leave_message = models.TextField() 
     leave_status = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='leavestaff_created_idx'),
+            # approved leaves overlapping a date range
+            models.Index(fields=['leave_status', 'leave_start', 'leave_end'],
+                         name='leavestaff_status_dates_idx'),
+        ]
+
 class FeedBackStudent(BaseModel):
     '''
     define a feed back model
@@ -185,6 +340,11 @@ class FeedBackStudent(BaseModel):
     feedback = models.TextField() 
     feedback_reply = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='feedbackstudent_created_idx'),
+        ]
+
 class FeedBackStaffs(BaseModel):
     '''
     define a feed back model for students
@@ -193,6 +353,11 @@ class FeedBackStaffs(BaseModel):
     feedback = models.TextField() 
     feedback_reply = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='feedbackstaffs_created_idx'),
+        ]
+
 
 class NotificationStudent(BaseModel):
     '''
@@ -200,6 +365,13 @@ class NotificationStudent(BaseModel):
     '''
     student_id = models.ForeignKey(Students, on_delete=models.CASCADE) 
     message = models.TextField()
+    read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # unread counter of a student
+            models.Index(fields=['student_id', 'read'], name='notifstudent_unread_idx'),
+        ]
 
 
 class NotificationStaffs(BaseModel):
@@ -208,6 +380,12 @@ class NotificationStaffs(BaseModel):
     '''
     staff_id = models.ForeignKey(Staffs, on_delete=models.CASCADE) 
     message = models.TextField()
+    read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['staff_id', 'read'], name='notifstaff_unread_idx'),
+        ]
 
 class StudentResult(BaseModel):
     '''
@@ -216,4 +394,12 @@ class StudentResult(BaseModel):
     student_id = models.ForeignKey(Students, on_delete=models.CASCADE) 
     subject_id = models.ForeignKey(Subjects, on_delete=models.CASCADE) 
     subject_exam_marks = models.FloatField(default=0) 
-    subject_assignment_marks = models.FloatField(default=0) 
\ No newline at end of file
+    subject_assignment_marks = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student_id', 'subject_id'],
+                name='unique_student_result'
+            ),
+        ] 
\ No newline at end of file
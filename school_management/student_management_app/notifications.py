@@ -0,0 +1,206 @@
+'''
+Broadcast notifications and the per user unread counters.
+
+A broadcast targets the students and staff of a course, a subject, a
+semister or a whole role, and writes one NotificationStudent or
+NotificationStaffs row per recipient with chunked bulk_create. The unread
+count of the notification badge is cached per user in the alias named by
+settings.NOTIFICATION_CACHE; it is dropped whenever the user's
+notifications change, so a page costs no query until then. Every new
+notification is also pushed to the open event streams of its recipient.
+'''
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import QuerySet
+
+from .events import NOTIFICATION, publish_many_on_commit
+from .models import (
+    CustomUser, Staffs, Students, NotificationStudent, NotificationStaffs
+)
+
+
+ROLES = ('student', 'staff')
+
+CHUNK_SIZE = 1000
+
+
+class BroadcastError(Exception):
+    '''
+    raised when a broadcast is rejected, nothing has been written
+    '''
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(f'{len(errors)} invalid broadcast fields')
+        self.errors = errors
+
+
+def notification_cache():
+    return caches[getattr(settings, 'NOTIFICATION_CACHE', 'default')]
+
+
+def unread_key(user_id: Any) -> str:
+    return f'notifications:unread:{user_id}'
+
+
+def forget_unread(user_ids: Iterable[Any]) -> None:
+    notification_cache().delete_many([unread_key(user_id)
+                                      for user_id in user_ids])
+
+
+def user_notifications(user: CustomUser) -> Optional[QuerySet]:
+    """
+    The notifications of a student or staff user, None for other users.
+    """
+    if user.user_type == CustomUser.STUDENT:
+        return NotificationStudent.objects.filter(student_id__admin=user.id)
+    if user.user_type == CustomUser.STAFF:
+        return NotificationStaffs.objects.filter(staff_id__admin=user.id)
+    return None
+
+
+def unread_count(user: CustomUser) -> int:
+    """
+    Number of unread notifications of a user, counted once and then
+    served from the cache.
+    """
+    cache = notification_cache()
+    count = cache.get(unread_key(user.id))
+    if count is None:
+        notifications = user_notifications(user)
+        count = 0 if notifications is None else \
+            notifications.filter(read=False).count()
+        cache.set(unread_key(user.id), count,
+                  timeout=getattr(settings, 'NOTIFICATION_CACHE_TIMEOUT', 300))
+    return count
+
+
+def mark_read(user: CustomUser, notification_ids: Optional[Any] = None) -> int:
+    """
+    Marks the given notifications of a user as read, all of them by
+    default.
+
+    Returns:
+        number of notifications marked.
+    """
+    notifications = user_notifications(user)
+    if notifications is None:
+        return 0
+    if notification_ids is not None:
+        notifications = notifications.filter(id__in=notification_ids)
+    marked = notifications.filter(read=False).update(read=True)
+    if marked:
+        forget_unread([user.id])
+    return marked
+
+
+def recipients(course: Any = None, subject: Any = None, semister: Any = None,
+               role: Optional[str] = None) -> Dict[str, QuerySet]:
+    """
+    The students and staff a broadcast reaches, as (id, admin_id) rows.
+
+    Every given target narrows the audience: a course or subject reaches
+    its students and the staff teaching it, a semister only reaches
+    students, and role keeps one of the two groups.
+
+    Raises:
+        BroadcastError: when the role is unknown, or staff with a semister,
+            which would reach nobody.
+    """
+    if role not in (None, *ROLES):
+        raise BroadcastError([{"field": "role",
+                               "error": "role must be student or staff"}])
+    if role == 'staff' and semister:
+        raise BroadcastError([{"field": "semister",
+                               "error": "a semister only reaches students"}])
+    audience = {}
+    if role in (None, 'student'):
+        students = Students.objects.all()
+        if course:
+            students = students.filter(course_id=course)
+        if subject:
+            students = students.filter(course_id__subjects=subject)
+        if semister:
+            students = students.filter(semister_year_id=semister)
+        audience['student'] = students.values_list('id', 'admin_id')
+    if role in (None, 'staff') and not semister:
+        staffs = Staffs.objects.all()
+        if course:
+            staffs = staffs.filter(admin__subjects__course_id=course)
+        if subject:
+            staffs = staffs.filter(admin__subjects=subject)
+        audience['staff'] = staffs.values_list('id', 'admin_id').distinct()
+    return audience
+
+
+def broadcast(message: str, course: Any = None, subject: Any = None,
+              semister: Any = None, role: Optional[str] = None
+              ) -> Dict[str, int]:
+    """
+    Sends a notification to every recipient of a target, see recipients(),
+    in one transaction.
+
+    Recipients are read with a server side cursor and written CHUNK_SIZE
+    rows per INSERT; their unread counters are dropped once committed.
+
+    Returns:
+        number of notifications written per role.
+
+    Raises:
+        BroadcastError: when the message is empty or the target invalid.
+    """
+    if not (message or '').strip():
+        raise BroadcastError([{"field": "message",
+                               "error": "message is required"}])
+    models = {
+        'student': (NotificationStudent, 'student_id_id'),
+        'staff': (NotificationStaffs, 'staff_id_id'),
+    }
+    sent = {}
+    with transaction.atomic():
+        for role_name, rows in recipients(course, subject, semister,
+                                          role).items():
+            model, recipient_field = models[role_name]
+            sent[role_name] = 0
+            chunk = []
+            for recipient_id, user_id in rows.iterator(chunk_size=CHUNK_SIZE):
+                chunk.append((recipient_id, user_id))
+                if len(chunk) >= CHUNK_SIZE:
+                    sent[role_name] += fan_out(model, recipient_field,
+                                               message, chunk)
+                    chunk = []
+            sent[role_name] += fan_out(model, recipient_field, message,
+                                       chunk)
+    return sent
+
+
+def fan_out(model: Any, recipient_field: str, message: str,
+            chunk: List[Tuple[Any, Any]]) -> int:
+    """
+    Writes one notification per (recipient id, user id) of a chunk.
+    """
+    if not chunk:
+        return 0
+    notifications = model.objects.bulk_create([
+        model(**{recipient_field: recipient_id}, message=message)
+        for recipient_id, _ in chunk
+    ])
+    user_ids = [user_id for _, user_id in chunk]
+    transaction.on_commit(lambda: forget_unread(user_ids))
+    publish_many_on_commit(
+        (user_id, {"type": NOTIFICATION, "id": notification.id,
+                   "message": message})
+        for notification, user_id in zip(notifications, user_ids))
+    return len(chunk)
+
+
+def unread_notifications(request) -> Dict[str, int]:
+    """
+    Template context processor exposing the badge count as
+    unread_notifications; registered in settings.TEMPLATES.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {"unread_notifications": 0}
+    return {"unread_notifications": unread_count(user)}
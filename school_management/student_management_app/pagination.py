@@ -0,0 +1,103 @@
+'''
+Keyset pagination on (created_at, id).
+
+Rows are read newest first and every page starts strictly after the last
+row of the previous one, so fetching page n costs the same as fetching
+page one, unlike OFFSET pagination.
+'''
+import base64
+import datetime
+import uuid
+from typing import Any, List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+ORDERING = ('-created_at', '-id')
+
+
+def encode_cursor(row: Any) -> str:
+    position = f'{row.created_at.isoformat()}|{row.id}'
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.date, uuid.UUID]:
+    """
+    Raises:
+        ValueError: when the cursor was not produced by encode_cursor.
+    """
+    try:
+        position = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, pk = position.split('|')
+        return datetime.date.fromisoformat(created_at), uuid.UUID(pk)
+    except (TypeError, ValueError) as error:
+        raise ValueError('invalid cursor') from error
+
+
+def keyset_page(queryset: QuerySet, cursor: Optional[str] = None,
+                page_size: int = 50) -> Tuple[List[Any], Optional[str]]:
+    """
+    Reads one page of a queryset, newest first.
+
+    Args:
+        queryset: rows of a BaseModel subclass.
+        cursor: the cursor returned with the previous page, if any.
+        page_size: maximum number of rows to return.
+
+    Returns:
+        tuple of the rows of the page and the cursor of the next page,
+        None on the last page.
+
+    Raises:
+        ValueError: when the cursor is invalid.
+    """
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    rows = list(queryset.order_by(*ORDERING)[:page_size + 1])
+    if len(rows) > page_size:
+        return rows[:page_size], encode_cursor(rows[page_size - 1])
+    return rows, None
+
+
+class KeysetPagination(BasePagination):
+    '''
+    DRF pagination class wrapping keyset_page, the response carries the
+    link to the next page and the results
+    '''
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            rows, self.next_cursor = keyset_page(
+                queryset,
+                request.query_params.get(self.cursor_query_param),
+                self.get_page_size(request))
+        except ValueError:
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+        return rows
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
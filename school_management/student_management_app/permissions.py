@@ -0,0 +1,27 @@
+from rest_framework.permissions import BasePermission
+
+from .models import CustomUser
+
+
+class IsHOD(BasePermission):
+    '''
+    grants access to authenticated HOD users only
+    '''
+    message = 'Only HODs can access this resource'
+
+    def has_permission(self, request, view) -> bool:
+        user = request.user
+        return bool(user and user.is_authenticated
+                    and user.user_type == CustomUser.HOD)
+
+
+class IsStudent(BasePermission):
+    '''
+    grants access to authenticated student users only
+    '''
+    message = 'Only students can access this resource'
+
+    def has_permission(self, request, view) -> bool:
+        user = request.user
+        return bool(user and user.is_authenticated
+                    and user.user_type == CustomUser.STUDENT)
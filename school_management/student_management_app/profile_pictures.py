@@ -0,0 +1,174 @@
+'''
+Upload pipeline of the student profile pictures.
+
+The upload is streamed once through SHA-256 into a spool file and stored
+under its digest (profile_pics/originals/ab/abcd....jpg), so the same
+image uploaded twice is stored once. The request only waits for that
+copy. A background worker pool then renders the thumbnail and web size
+JPEG derivatives, also named by the digest, and points
+Students.profile_pic at the web size one. A picture whose derivatives
+already exist is attached to them straight away.
+
+Derivatives need Pillow; without it the original stays attached.
+'''
+import datetime
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+from .models import Students
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+
+logger = logging.getLogger(__name__)
+
+# longest side in pixels of each derivative
+DERIVATIVES: Dict[str, int] = {
+    'thumbs': 128,
+    'web': 800,
+}
+
+SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
+
+# Pillow releases the GIL while decoding, resizing and encoding, so
+# threads are enough to keep the request workers free
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PROFILE_PIC_WORKERS', 2),
+    thread_name_prefix='profile-pics')
+
+
+class ProfilePictureError(ValueError):
+    '''
+    raised when an upload is not a supported image, nothing has been stored
+    '''
+
+
+def image_extension(head: bytes) -> str:
+    """
+    Raises:
+        ProfilePictureError: when the bytes are not a JPEG, PNG, GIF or
+            WebP image.
+    """
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    raise ProfilePictureError(
+        'profile picture must be a JPEG, PNG, GIF or WebP image')
+
+
+def store_original(upload) -> str:
+    """
+    Streams an upload into content addressed storage.
+
+    The client supplied name is ignored, the type is taken from the
+    leading bytes.
+
+    Args:
+        upload: an UploadedFile.
+
+    Returns:
+        storage name of the original.
+
+    Raises:
+        ProfilePictureError: when the upload is not a supported image.
+    """
+    digest = hashlib.sha256()
+    head = b''
+    with tempfile.TemporaryFile() as spool:
+        for chunk in upload.chunks():
+            if len(head) < 12:
+                head += chunk[:12 - len(head)]
+            digest.update(chunk)
+            spool.write(chunk)
+        extension = image_extension(head)
+
+        hexdigest = digest.hexdigest()
+        name = f'profile_pics/originals/{hexdigest[:2]}/{hexdigest}{extension}'
+        if not default_storage.exists(name):
+            spool.seek(0)
+            default_storage.save(name, File(spool))
+    return name
+
+
+def derivative_name(original: str, kind: str) -> str:
+    hexdigest = os.path.splitext(os.path.basename(original))[0]
+    return f'profile_pics/{kind}/{hexdigest[:2]}/{hexdigest}.jpg'
+
+
+def attach_profile_pic(student: Students, upload) -> None:
+    """
+    Stores an uploaded picture and attaches it to a student.
+
+    Until the derivatives are rendered the student points at the original;
+    the rendering is queued once the current transaction commits.
+
+    Raises:
+        ProfilePictureError: when the upload is not a supported image.
+    """
+    original = store_original(upload)
+    web = derivative_name(original, 'web')
+    if Image is not None and all(
+            default_storage.exists(derivative_name(original, kind))
+            for kind in DERIVATIVES):
+        student.profile_pic = web
+        student.save(update_fields=['profile_pic'])
+        return
+
+    student.profile_pic = original
+    student.save(update_fields=['profile_pic'])
+    if Image is not None:
+        transaction.on_commit(
+            lambda: executor.submit(build_derivatives, student.id, original))
+
+
+def render(image: Any, size: int) -> bytes:
+    copy = image.copy()
+    copy.thumbnail((size, size))
+    output = io.BytesIO()
+    copy.save(output, 'JPEG', quality=85, optimize=True)
+    return output.getvalue()
+
+
+def build_derivatives(student_id: Any, original: str) -> None:
+    """
+    Renders the missing derivatives of an original and moves the student
+    onto the web size one, unless a newer picture was attached meanwhile.
+
+    Runs in the worker pool.
+    """
+    try:
+        with default_storage.open(original) as source:
+            image = ImageOps.exif_transpose(Image.open(source)).convert('RGB')
+        for kind, size in DERIVATIVES.items():
+            name = derivative_name(original, kind)
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(render(image, size)))
+        Students.objects.filter(id=student_id, profile_pic=original).update(
+            profile_pic=derivative_name(original, 'web'),
+            updated_at=datetime.date.today())
+    except Exception:
+        logger.exception('could not render derivatives of %s', original)
+    finally:
+        # the worker threads outlive the request that queued them
+        connections.close_all()
@@ -0,0 +1,169 @@
+'''
+Set based write path for the results of a subject.
+
+Staff post a whole mark sheet at once. The students are resolved and the
+existing results read with one query each, and every new or changed mark
+is written back with a single upsert inside one transaction.
+'''
+import math
+import uuid
+from typing import Any, Dict, List, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Subjects, Students, StudentResult
+
+
+class ResultsError(Exception):
+    '''
+    raised when a mark sheet is rejected, nothing has been written
+    '''
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(f'{len(errors)} invalid result entries')
+        self.errors = errors
+
+
+def parse_mark(value: Any) -> float:
+    """
+    Raises:
+        ValidationError: when the mark is not a non-negative number.
+    """
+    mark = StudentResult._meta.get_field('subject_exam_marks').to_python(
+        value)
+    if mark is None or not math.isfinite(mark) or mark < 0:
+        raise ValidationError('invalid mark')
+    return mark
+
+
+def parse_mark_sheet(entries: Any) -> Tuple[Dict[str, Tuple[float, float]],
+                                             List[Dict[str, Any]]]:
+    """
+    Validates the posted mark sheet, a list of {"id": <admin id>,
+    "assignment_marks": <number>, "exam_marks": <number>} objects.
+
+    Args:
+        entries: the decoded results payload.
+
+    Returns:
+        tuple of the (assignment, exam) marks keyed by student admin id and
+        the list of per-student errors found.
+    """
+    if not isinstance(entries, list):
+        return {}, [{"id": None, "error": "results must be a list"}]
+
+    marks = {}
+    errors = []
+    for entry in entries:
+        admin_id = entry.get('id') if isinstance(entry, dict) else None
+        if admin_id is None:
+            errors.append({"id": None, "error": "missing student id"})
+            continue
+        try:
+            admin_id = str(uuid.UUID(str(admin_id)))
+        except ValueError:
+            errors.append({"id": admin_id, "error": "invalid student id"})
+            continue
+        if admin_id in marks:
+            errors.append({"id": admin_id, "error": "duplicate student"})
+            continue
+        try:
+            marks[admin_id] = (parse_mark(entry.get('assignment_marks')),
+                               parse_mark(entry.get('exam_marks')))
+        except ValidationError:
+            errors.append({"id": admin_id, "error": "invalid marks"})
+    return marks, errors
+
+
+def save_mark_sheet(subject_id: Any, entries: Any,
+                    staff_user_id: Any = None) -> Dict[str, int]:
+    """
+    Records the results of a subject for many students at once.
+
+    The whole sheet is validated before anything is written; unknown
+    students, students outside the course of the subject and malformed
+    marks reject the sheet with every error listed.
+
+    Args:
+        subject_id: id of the Subjects the marks are for.
+        entries: the decoded results payload.
+        staff_user_id: when given, the subject must be taught by this
+            CustomUser.
+
+    Returns:
+        dict with the number of created, updated and unchanged results.
+
+    Raises:
+        ResultsError: with the per-student errors.
+    """
+    marks, errors = parse_mark_sheet(entries)
+
+    subject = Subjects.objects.filter(id=subject_id).values(
+        'course_id', 'staff_id').first()
+    if subject is None:
+        errors.append({"id": None, "error": "unknown subject"})
+        raise ResultsError(errors)
+    if staff_user_id is not None and \
+            str(subject['staff_id']) != str(staff_user_id):
+        errors.append({"id": None, "error": "subject not taught by you"})
+
+    students = {
+        str(admin_id): student_id for admin_id, student_id in
+        Students.objects.filter(
+            admin__in=list(marks), course_id=subject['course_id'],
+        ).values_list('admin_id', 'id')
+    }
+    errors.extend(
+        {"id": admin_id, "error": "unknown student"}
+        for admin_id in marks if admin_id not in students
+    )
+    if errors:
+        raise ResultsError(errors)
+    return write_mark_sheet(subject_id, marks, students)
+
+
+def write_mark_sheet(subject_id: Any, marks: Dict[str, Tuple[float, float]],
+                     students: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Upserts a validated mark sheet in one transaction; results whose marks
+    did not change are not written.
+
+    Args:
+        subject_id: id of the Subjects the marks are for.
+        marks: (assignment, exam) marks keyed by admin id, from
+            parse_mark_sheet.
+        students: Students id keyed by admin id.
+
+    Returns:
+        the summary returned by save_mark_sheet.
+    """
+    with transaction.atomic():
+        existing = {
+            student_id: (assignment, exam) for student_id, assignment, exam in
+            StudentResult.objects.filter(
+                subject_id=subject_id, student_id__in=list(students.values()),
+            ).values_list('student_id', 'subject_assignment_marks',
+                          'subject_exam_marks')
+        }
+        rows = [
+            StudentResult(student_id_id=students[admin_id],
+                          subject_id_id=subject_id,
+                          subject_assignment_marks=assignment,
+                          subject_exam_marks=exam)
+            for admin_id, (assignment, exam) in marks.items()
+            if existing.get(students[admin_id]) != (assignment, exam)
+        ]
+        # a result created meanwhile by another sheet is updated, not
+        # duplicated
+        StudentResult.objects.bulk_create(
+            rows, batch_size=500, update_conflicts=True,
+            unique_fields=['student_id', 'subject_id'],
+            update_fields=['subject_assignment_marks', 'subject_exam_marks',
+                           'updated_at'])
+
+    created = sum(row.student_id_id not in existing for row in rows)
+    return {
+        "created": created,
+        "updated": len(rows) - created,
+        "unchanged": len(marks) - len(rows),
+    }
@@ -0,0 +1,224 @@
+'''
+Typeahead search of students and staff by first name, last name, username
+and email.
+
+The text index depends on the database vendor:
+
+* SQLite: the people_search FTS5 table of migration 0011, one row per
+  CustomUser keyed by user_rowid(). The receivers in signals.py keep it
+  in step with every save and delete; bulk_create sends no signals, so
+  the student import calls index_users() and the school generator
+  rebuild_people_search().
+* PostgreSQL: pg_trgm GIN indexes on the four columns, also from
+  migration 0011, which serve the istartswith lookups below; the table
+  itself is the index, so there is nothing to maintain.
+* other vendors run the same lookups without an index.
+
+Every word of the query has to be the prefix of a word of the user, so
+"jo ka" finds John Kamau while it is typed. Matches are read in index
+order up to the limit, which keeps short prefixes matching thousands of
+users as cheap as long ones, and the page is then sorted by name.
+'''
+import re
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import CustomUser
+
+
+SEARCH_TABLE = 'people_search'
+SEARCH_FIELDS = ('first_name', 'last_name', 'username', 'email')
+INDEXED_FIELDS = frozenset((*SEARCH_FIELDS, 'user_type'))
+
+KINDS = {
+    'hod': CustomUser.HOD,
+    'staff': CustomUser.STAFF,
+    'student': CustomUser.STUDENT,
+}
+KIND_NAMES = {user_type: kind for kind, user_type in KINDS.items()}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+MAX_TERMS = 5
+CHUNK_SIZE = 2000
+
+
+class SearchError(Exception):
+    '''
+    raised when a search is rejected, nothing has been queried
+    '''
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(f'{len(errors)} invalid search parameters')
+        self.errors = errors
+
+
+def uses_fts() -> bool:
+    return connection.vendor == 'sqlite'
+
+
+def user_rowid(user_id: Any) -> int:
+    """
+    The FTS5 rowid of a user: the low 63 bits of its UUID, random enough
+    for collisions to be negligible and small enough for a SQLite integer.
+    """
+    return uuid.UUID(str(user_id)).int & (2 ** 63 - 1)
+
+
+def search_terms(query: str) -> List[str]:
+    """
+    Splits a query into lower case words the way the FTS5 unicode61
+    tokenizer splits the indexed text, so underscores, dots and @ separate
+    words.
+    """
+    return re.findall(r'[^\W_]+', (query or '').lower())[:MAX_TERMS]
+
+
+def index_rows(users: Iterable[Any]) -> List[tuple]:
+    return [
+        (user_rowid(user.id), uuid.UUID(str(user.id)).hex, user.user_type,
+         user.first_name, user.last_name, user.username, user.email)
+        for user in users
+    ]
+
+
+def index_users(users: Iterable[CustomUser]) -> int:
+    """
+    Adds or refreshes the index rows of some users; a no-op unless the
+    database uses the FTS5 table.
+
+    Returns:
+        number of users indexed.
+    """
+    if not uses_fts():
+        return 0
+    rows = index_rows(users)
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                           [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, user_id, user_type, '
+            'first_name, last_name, username, email) '
+            'VALUES (%s, %s, %s, %s, %s, %s, %s)', rows)
+    return len(rows)
+
+
+def unindex_users(user_ids: Iterable[Any]) -> None:
+    if not uses_fts():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                           [(user_rowid(user_id),) for user_id in user_ids])
+
+
+def rebuild_people_search(batch_size: int = CHUNK_SIZE) -> int:
+    """
+    Refills the FTS5 table from CustomUser, in batches and in one
+    transaction, so searches never see it half empty.
+
+    Returns:
+        number of users indexed, 0 when the database does not use the
+        FTS5 table.
+    """
+    if not uses_fts():
+        return 0
+    indexed = 0
+    batch = []
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        for user in CustomUser.objects.only(
+                'id', 'user_type', *SEARCH_FIELDS).iterator(
+                chunk_size=batch_size):
+            batch.append(user)
+            if len(batch) >= batch_size:
+                indexed += index_users(batch)
+                batch = []
+        indexed += index_users(batch)
+    return indexed
+
+
+def matching_ids(terms: List[str], user_type: Optional[str],
+                 limit: int) -> List[Any]:
+    if uses_fts():
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = f'SELECT user_id FROM {SEARCH_TABLE} ' \
+              f'WHERE {SEARCH_TABLE} MATCH %s'
+        params = [match]
+        if user_type:
+            sql += ' AND user_type = %s'
+            params.append(user_type)
+        with connection.cursor() as cursor:
+            cursor.execute(sql + ' LIMIT %s', [*params, limit])
+            return [uuid.UUID(user_id) for user_id, in cursor.fetchall()]
+
+    users = CustomUser.objects.all()
+    for term in terms:
+        words = Q()
+        for field in SEARCH_FIELDS:
+            words |= Q(**{f'{field}__istartswith': term})
+        users = users.filter(words)
+    if user_type:
+        users = users.filter(user_type=user_type)
+    return list(users.values_list('id', flat=True)[:limit])
+
+
+def search_people(query: str, kind: Optional[str] = None,
+                  limit: Any = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
+    """
+    Finds the users every word of a query is a prefix of.
+
+    Args:
+        query: the text typed so far.
+        kind: 'student', 'staff' or 'hod' to search one role only.
+        limit: maximum number of matches, at most MAX_LIMIT.
+
+    Returns:
+        the matches sorted by name, each with the id of its Students or
+        Staffs row and, for students, the course name. Empty for a query
+        without words.
+
+    Raises:
+        SearchError: when the kind or the limit is invalid.
+    """
+    errors = []
+    if kind and kind not in KINDS:
+        errors.append({"field": "kind",
+                       "error": "kind must be student, staff or hod"})
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        errors.append({"field": "limit",
+                       "error": f"limit must be between 1 and {MAX_LIMIT}"})
+    if errors:
+        raise SearchError(errors)
+
+    terms = search_terms(query)
+    if not terms:
+        return []
+    ids = matching_ids(terms, KINDS.get(kind), limit)
+    users = CustomUser.objects.filter(id__in=ids).select_related(
+        'student_profile__course_id', 'staffs').order_by(
+        'last_name', 'first_name', 'username')
+
+    people = []
+    for user in users:
+        student = getattr(user, 'student_profile', None)
+        staff = getattr(user, 'staffs', None)
+        profile = student or staff
+        people.append({
+            "id": user.id,
+            "kind": KIND_NAMES.get(user.user_type),
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "username": user.username,
+            "email": user.email,
+            "profile_id": profile.id if profile else None,
+            "course": student.course_id.course_name
+            if student and student.course_id else None,
+        })
+    return people
@@ -1,5 +1,6 @@
 from .models import (
-    Students, CustomUser, Subjects, StudentResult)
+    Students, CustomUser, Subjects, StudentResult, Staffs,
+    LeaveReportStudent, LeaveReportStaff, FeedBackStudent, FeedBackStaffs)
 from rest_framework import serializers
 
 
@@ -36,4 +37,95 @@ class StudentResultSerializer(serializers.ModelSerializer):
     subject = SubjectSerializer(read_only=True)  
     class Meta:
         model = StudentResult
-        fields = ['student_id', 'subject_id', 'subject', 'subject_exam_marks', 'subject_assignment_marks']
\ No newline at end of file
+        fields = ['student_id', 'subject_id', 'subject', 'subject_exam_marks', 'subject_assignment_marks']
+
+class StudentListSerializer(serializers.ModelSerializer):
+    admin_id = serializers.UUIDField(source='admin.id', read_only=True)
+    username = serializers.CharField(source='admin.username', read_only=True)
+    first_name = serializers.CharField(source='admin.first_name', read_only=True)
+    last_name = serializers.CharField(source='admin.last_name', read_only=True)
+    email = serializers.CharField(source='admin.email', read_only=True)
+    course_name = serializers.CharField(source='course_id.course_name',
+                                        read_only=True, default=None)
+
+    class Meta:
+        model = Students
+        fields = ['id', 'admin_id', 'username', 'first_name', 'last_name',
+                  'email', 'gender', 'address', 'profile_pic', 'course_id',
+                  'course_name', 'semister_year_id', 'created_at']
+
+
+class StaffListSerializer(serializers.ModelSerializer):
+    admin_id = serializers.UUIDField(source='admin.id', read_only=True)
+    username = serializers.CharField(source='admin.username', read_only=True)
+    first_name = serializers.CharField(source='admin.first_name', read_only=True)
+    last_name = serializers.CharField(source='admin.last_name', read_only=True)
+    email = serializers.CharField(source='admin.email', read_only=True)
+
+    class Meta:
+        model = Staffs
+        fields = ['id', 'admin_id', 'username', 'first_name', 'last_name',
+                  'email', 'address', 'created_at']
+
+
+class SubjectListSerializer(serializers.ModelSerializer):
+    course_name = serializers.CharField(source='course_id.course_name',
+                                        read_only=True)
+    staff_first_name = serializers.CharField(source='staff_id.first_name',
+                                             read_only=True)
+    staff_last_name = serializers.CharField(source='staff_id.last_name',
+                                            read_only=True)
+
+    class Meta:
+        model = Subjects
+        fields = ['id', 'subject_name', 'course_id', 'course_name',
+                  'staff_id', 'staff_first_name', 'staff_last_name',
+                  'created_at']
+
+
+class LeaveReportStudentSerializer(serializers.ModelSerializer):
+    first_name = serializers.CharField(source='student_id.admin.first_name',
+                                       read_only=True)
+    last_name = serializers.CharField(source='student_id.admin.last_name',
+                                      read_only=True)
+
+    class Meta:
+        model = LeaveReportStudent
+        fields = ['id', 'student_id', 'first_name', 'last_name', 'leave_start',
+                  'leave_end', 'leave_message', 'leave_status', 'created_at']
+
+
+class LeaveReportStaffSerializer(serializers.ModelSerializer):
+    first_name = serializers.CharField(source='staff_id.admin.first_name',
+                                       read_only=True)
+    last_name = serializers.CharField(source='staff_id.admin.last_name',
+                                      read_only=True)
+
+    class Meta:
+        model = LeaveReportStaff
+        fields = ['id', 'staff_id', 'first_name', 'last_name', 'leave_start',
+                  'leave_end', 'leave_message', 'leave_status', 'created_at']
+
+
+class FeedBackStudentSerializer(serializers.ModelSerializer):
+    first_name = serializers.CharField(source='student_id.admin.first_name',
+                                       read_only=True)
+    last_name = serializers.CharField(source='student_id.admin.last_name',
+                                      read_only=True)
+
+    class Meta:
+        model = FeedBackStudent
+        fields = ['id', 'student_id', 'first_name', 'last_name', 'feedback',
+                  'feedback_reply', 'created_at']
+
+
+class FeedBackStaffsSerializer(serializers.ModelSerializer):
+    first_name = serializers.CharField(source='staff_id.admin.first_name',
+                                       read_only=True)
+    last_name = serializers.CharField(source='staff_id.admin.last_name',
+                                      read_only=True)
+
+    class Meta:
+        model = FeedBackStaffs
+        fields = ['id', 'staff_id', 'first_name', 'last_name', 'feedback',
+                  'feedback_reply', 'created_at']
@@ -0,0 +1,224 @@
+'''
+Signal receivers dropping the cached dashboards, choice lists and unread
+notification counters a model change affects, publishing the changes
+the event streams push to users, and keeping the people search index in
+step with CustomUser along with the filter of taken usernames and emails.
+
+A subject moved to another staff member or course, and a student moved
+to another course, also drop the dashboards that showed them before the
+save; pre_save reads the stored values. Attendance reports saved or
+deleted one at a time, by the admin or a cascade, are counted in
+AttendanceSummary here.
+
+Connected in StudentManagementAppConfig.ready(). bulk_create, bulk_update
+and update() send no signals, so the bulk attendance paths in
+attendance.py count their reports and invalidate explicitly, the
+broadcasts of notifications.py and the leave moderation of leaves.py
+invalidate and publish explicitly, and the student import indexes and
+records the users it creates.
+'''
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .attendance import count_report
+from .availability import known_names
+from .choices import COURSES, SEMISTERS, bump_choices_version
+from .dashboard_cache import (
+    invalidate, invalidate_students, invalidate_subject, staff_of_courses,
+    students_of_course
+)
+from .models import (
+    CustomUser, Courses, SemisterModel, Staffs, Subjects, Students, Attendance,
+    AttendanceReport, LeaveReportStaff, LeaveReportStudent,
+    NotificationStudent, NotificationStaffs, FeedBackStudent, FeedBackStaffs
+)
+from .events import (
+    FEEDBACK_REPLY, LEAVE_STATUS, NOTIFICATION, publish_on_commit
+)
+from .leaves import LEAVE_PENDING
+from .notifications import forget_unread
+from .search import INDEXED_FIELDS, index_users, unindex_users
+
+
+@receiver([post_save, post_delete], sender=AttendanceReport,
+          dispatch_uid='dashboard_attendance_report')
+def attendance_report_changed(sender, instance, **kwargs):
+    invalidate_students([instance.student_id_id])
+
+
+@receiver(pre_save, sender=AttendanceReport,
+          dispatch_uid='summary_attendance_report_previous')
+def attendance_report_saving(sender, instance, **kwargs):
+    instance._summary_previous = AttendanceReport.objects.filter(
+        pk=instance.pk).values(
+        'attendance_id', 'student_id', 'status').first()
+
+
+@receiver(post_save, sender=AttendanceReport,
+          dispatch_uid='summary_attendance_report_saved')
+def attendance_report_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_summary_previous', None)
+    current = {"attendance_id": instance.attendance_id_id,
+               "student_id": instance.student_id_id,
+               "status": instance.status}
+    if previous == current:
+        return
+    if previous:
+        count_report(**previous, removed=True)
+    count_report(**current)
+
+
+@receiver(post_delete, sender=AttendanceReport,
+          dispatch_uid='summary_attendance_report_deleted')
+def attendance_report_deleted(sender, instance, **kwargs):
+    count_report(instance.attendance_id_id, instance.student_id_id,
+                 instance.status, removed=True)
+
+
+@receiver([post_save, post_delete], sender=Attendance,
+          dispatch_uid='dashboard_attendance')
+def attendance_changed(sender, instance, **kwargs):
+    staff_user_ids = Subjects.objects.filter(
+        id=instance.subject_id_id).values_list('staff_id', flat=True)
+    invalidate(staff_user_ids=staff_user_ids)
+
+
+@receiver([post_save, post_delete], sender=LeaveReportStaff,
+          dispatch_uid='dashboard_leave_staff')
+def staff_leave_changed(sender, instance, **kwargs):
+    invalidate(staff_user_ids=Staffs.objects.filter(
+        id=instance.staff_id_id).values_list('admin_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=LeaveReportStudent,
+          dispatch_uid='dashboard_leave_student')
+def student_leave_changed(sender, instance, **kwargs):
+    invalidate(student_user_ids=Students.objects.filter(
+        id=instance.student_id_id).values_list('admin_id', flat=True))
+
+
+def remember_previous(instance, *fields):
+    # the stored values of the fields a save is about to change, so that
+    # the dashboards showing the row before the save are dropped as well
+    instance._dashboard_previous = type(instance).objects.filter(
+        pk=instance.pk).values(*fields).first() or {}
+
+
+@receiver(pre_save, sender=Students, dispatch_uid='dashboard_students_previous')
+def student_saving(sender, instance, **kwargs):
+    remember_previous(instance, 'course_id')
+
+
+@receiver([post_save, post_delete], sender=Students,
+          dispatch_uid='dashboard_students')
+def student_changed(sender, instance, **kwargs):
+    previous = getattr(instance, '_dashboard_previous', {})
+    course_ids = {instance.course_id_id, previous.get('course_id')}
+    invalidate(staff_user_ids=staff_of_courses(course_ids - {None}),
+               student_user_ids=[instance.admin_id])
+
+
+@receiver(pre_save, sender=Subjects, dispatch_uid='dashboard_subjects_previous')
+def subject_saving(sender, instance, **kwargs):
+    remember_previous(instance, 'staff_id', 'course_id')
+
+
+@receiver([post_save, post_delete], sender=Subjects,
+          dispatch_uid='dashboard_subjects')
+def subject_changed(sender, instance, **kwargs):
+    invalidate_subject(instance)
+    previous = getattr(instance, '_dashboard_previous', {})
+    if previous and (previous['staff_id'] != instance.staff_id_id or
+                     previous['course_id'] != instance.course_id_id):
+        invalidate(staff_user_ids=[previous['staff_id']],
+                   student_user_ids=students_of_course(previous['course_id']))
+
+
+@receiver([post_save, post_delete], sender=Courses,
+          dispatch_uid='choices_courses')
+def course_changed(sender, instance, **kwargs):
+    bump_choices_version(COURSES)
+    # the HOD dashboard lists the course names
+    invalidate()
+
+
+@receiver([post_save, post_delete], sender=SemisterModel,
+          dispatch_uid='choices_semisters')
+def semister_changed(sender, instance, **kwargs):
+    bump_choices_version(SEMISTERS)
+
+
+@receiver([post_save, post_delete], sender=NotificationStudent,
+          dispatch_uid='unread_notification_student')
+def student_notification_changed(sender, instance, **kwargs):
+    forget_unread(Students.objects.filter(
+        id=instance.student_id_id).values_list('admin_id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=NotificationStaffs,
+          dispatch_uid='unread_notification_staff')
+def staff_notification_changed(sender, instance, **kwargs):
+    forget_unread(Staffs.objects.filter(
+        id=instance.staff_id_id).values_list('admin_id', flat=True))
+
+
+def owner_user_ids(instance):
+    # CustomUser id of the student or staff member a row belongs to
+    if hasattr(instance, 'student_id_id'):
+        return Students.objects.filter(
+            id=instance.student_id_id).values_list('admin_id', flat=True)
+    return Staffs.objects.filter(
+        id=instance.staff_id_id).values_list('admin_id', flat=True)
+
+
+@receiver(post_save, sender=NotificationStudent,
+          dispatch_uid='event_notification_student')
+@receiver(post_save, sender=NotificationStaffs,
+          dispatch_uid='event_notification_staff')
+def notification_created(sender, instance, created, **kwargs):
+    if created:
+        publish_on_commit(owner_user_ids(instance), {
+            "type": NOTIFICATION, "id": instance.id,
+            "message": instance.message})
+
+
+@receiver(post_save, sender=FeedBackStudent,
+          dispatch_uid='event_feedback_student')
+@receiver(post_save, sender=FeedBackStaffs,
+          dispatch_uid='event_feedback_staff')
+def feedback_replied(sender, instance, created, **kwargs):
+    if not created and instance.feedback_reply:
+        publish_on_commit(owner_user_ids(instance), {
+            "type": FEEDBACK_REPLY, "id": instance.id,
+            "reply": instance.feedback_reply})
+
+
+@receiver(post_save, sender=LeaveReportStudent,
+          dispatch_uid='event_leave_student')
+@receiver(post_save, sender=LeaveReportStaff,
+          dispatch_uid='event_leave_staff')
+def leave_decided(sender, instance, created, **kwargs):
+    if not created and instance.leave_status != LEAVE_PENDING:
+        publish_on_commit(owner_user_ids(instance), {
+            "type": LEAVE_STATUS, "id": instance.id,
+            "status": instance.leave_status})
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='search_user_saved')
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # logins only save last_login
+    if update_fields is None or \
+            not update_fields.isdisjoint(INDEXED_FIELDS):
+        index_users([instance])
+
+
+@receiver(post_delete, sender=CustomUser, dispatch_uid='search_user_deleted')
+def user_deleted(sender, instance, **kwargs):
+    unindex_users([instance.id])
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid='availability_user_saved')
+def user_names_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or \
+            not update_fields.isdisjoint(('username', 'email')):
+        known_names.add([instance])
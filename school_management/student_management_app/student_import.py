@@ -0,0 +1,325 @@
+'''
+Bulk enrolment of students from a CSV or JSON file.
+
+The whole file is validated before anything is written, with at most one
+query for the usernames and emails already taken (see availability.py)
+and one per referenced model.
+Passwords are then hashed across a process pool shared by the imports of
+the process, since each PBKDF2 hash costs a few hundred milliseconds of
+CPU. Finally the CustomUser and Students rows are inserted with batched
+bulk_create in one transaction. import_students() yields progress events
+along the way, which the management command prints and the HOD endpoint
+streams; no event is yielded while the transaction is open, so a client
+leaving the stream can stop the hashing but never the insert.
+'''
+import atexit
+import csv
+import io
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .availability import known_names, taken_values
+from .dashboard_cache import invalidate, staff_of_courses
+from .models import CustomUser, Courses, SemisterModel, Students
+from .search import index_users
+from .utils import is_uuid
+
+
+REQUIRED_FIELDS = ('first_name', 'last_name', 'username', 'email',
+                   'password', 'course_id', 'session_year_id')
+OPTIONAL_FIELDS = ('address', 'gender')
+# the limits of AddStudentForm
+MAX_LENGTH = 50
+GENDERS = ('Male', 'Female')
+# fewer passwords than this are hashed in the calling process
+POOL_THRESHOLD = 8
+
+# hashing pools by number of workers, started by the first import needing one
+pools: Dict[int, ProcessPoolExecutor] = {}
+pools_lock = threading.Lock()
+
+
+class StudentImportError(Exception):
+    '''
+    raised when an import is rejected, nothing has been written
+    '''
+    def __init__(self, errors: List[Dict[str, Any]]) -> None:
+        super().__init__(f'{len(errors)} invalid student rows')
+        self.errors = errors
+
+
+def read_rows(content: str, file_format: str) -> List[Dict[str, Any]]:
+    """
+    Decodes an import file.
+
+    Args:
+        content: the text of the file.
+        file_format: "csv" (with a header row) or "json" (a list of
+            objects).
+
+    Returns:
+        list of the rows as dicts.
+
+    Raises:
+        StudentImportError: when the file cannot be decoded.
+    """
+    if file_format == 'csv':
+        return list(csv.DictReader(io.StringIO(content)))
+    if file_format == 'json':
+        try:
+            rows = json.loads(content)
+        except ValueError:
+            raise StudentImportError([{"row": None, "error": "invalid JSON"}])
+        if isinstance(rows, list) and all(isinstance(row, dict)
+                                          for row in rows):
+            return rows
+        raise StudentImportError(
+            [{"row": None, "error": "expected a list of objects"}])
+    raise StudentImportError(
+        [{"row": None, "error": f"unsupported format {file_format!r}"}])
+
+
+def clean_row(row: Dict[str, Any]) -> Dict[str, str]:
+    cleaned = {
+        field: str(row.get(field) or '').strip()
+        for field in REQUIRED_FIELDS + OPTIONAL_FIELDS
+    }
+    # ids are compared with the canonical form the database returns
+    for field in ('course_id', 'session_year_id'):
+        if is_uuid(cleaned[field]):
+            cleaned[field] = str(uuid.UUID(cleaned[field]))
+    return cleaned
+
+
+def row_errors(number: int, row: Dict[str, str]) -> List[Dict[str, Any]]:
+    errors = []
+    for field in REQUIRED_FIELDS:
+        if not row[field]:
+            errors.append({"row": number, "field": field,
+                           "error": "required"})
+    for field in REQUIRED_FIELDS + OPTIONAL_FIELDS:
+        if len(row[field]) > MAX_LENGTH and field not in (
+                'course_id', 'session_year_id'):
+            errors.append({"row": number, "field": field,
+                           "error": f"longer than {MAX_LENGTH} characters"})
+    checks = (
+        ('username', UnicodeUsernameValidator()),
+        ('email', validate_email),
+    )
+    for field, validator in checks:
+        if row[field]:
+            try:
+                validator(row[field])
+            except ValidationError:
+                errors.append({"row": number, "field": field,
+                               "error": "invalid"})
+    for field in ('course_id', 'session_year_id'):
+        if row[field] and not is_uuid(row[field]):
+            errors.append({"row": number, "field": field, "error": "invalid"})
+    if row['gender'] and row['gender'] not in GENDERS:
+        errors.append({"row": number, "field": "gender",
+                       "error": "use Male or Female"})
+    return errors
+
+
+def validate_students(rows: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Checks every row of an import before anything is written.
+
+    Usernames and emails are compared within the file and, with at most one
+    query, against the existing users; courses and semisters are resolved
+    with one query each.
+
+    Args:
+        rows: the decoded rows, see read_rows.
+
+    Returns:
+        the cleaned rows.
+
+    Raises:
+        StudentImportError: with one entry per invalid field; rows are
+            numbered from 1, not counting a CSV header.
+    """
+    cleaned = [clean_row(row) for row in rows]
+    errors = []
+    for number, row in enumerate(cleaned, start=1):
+        errors.extend(row_errors(number, row))
+
+    taken_usernames, taken_emails = taken_values(
+        [row['username'] for row in cleaned],
+        [row['email'] for row in cleaned])
+
+    course_ids = {row['course_id'] for row in cleaned
+                  if is_uuid(row['course_id'])}
+    semister_ids = {row['session_year_id'] for row in cleaned
+                    if is_uuid(row['session_year_id'])}
+    courses = {str(pk) for pk in Courses.objects.filter(
+        id__in=course_ids).values_list('id', flat=True)}
+    semisters = {str(pk) for pk in SemisterModel.objects.filter(
+        id__in=semister_ids).values_list('id', flat=True)}
+
+    seen_usernames = set()
+    seen_emails = set()
+    for number, row in enumerate(cleaned, start=1):
+        username, email = row['username'], row['email'].lower()
+        if username in taken_usernames:
+            errors.append({"row": number, "field": "username",
+                           "error": "already taken"})
+        elif username and username in seen_usernames:
+            errors.append({"row": number, "field": "username",
+                           "error": "duplicate in file"})
+        if email and email in taken_emails:
+            errors.append({"row": number, "field": "email",
+                           "error": "already taken"})
+        elif email and email in seen_emails:
+            errors.append({"row": number, "field": "email",
+                           "error": "duplicate in file"})
+        seen_usernames.add(username)
+        seen_emails.add(email)
+
+        if row['course_id'] in course_ids and row['course_id'] not in courses:
+            errors.append({"row": number, "field": "course_id",
+                           "error": "unknown course"})
+        if row['session_year_id'] in semister_ids and \
+                row['session_year_id'] not in semisters:
+            errors.append({"row": number, "field": "session_year_id",
+                           "error": "unknown semister"})
+
+    if errors:
+        raise StudentImportError(errors)
+    return cleaned
+
+
+def hashing_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    The process pool of a number of workers, started once per process and
+    reused by the following imports.
+
+    Each worker runs django.setup() so that the pool also works with the
+    spawn start method.
+    """
+    with pools_lock:
+        pool = pools.get(workers)
+        if pool is None:
+            pool = pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, initializer=django.setup)
+        return pool
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    with pools_lock:
+        for pool in pools.values():
+            pool.shutdown(cancel_futures=True)
+        pools.clear()
+
+
+def hash_passwords(passwords: List[str], workers: Optional[int] = None
+                   ) -> Iterator[str]:
+    """
+    Hashes passwords, in order, across the hashing pool; a handful of
+    passwords is hashed in the calling process.
+    """
+    if len(passwords) < POOL_THRESHOLD:
+        yield from map(make_password, passwords)
+        return
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(passwords) // (workers * 4))
+    try:
+        yield from hashing_pool(workers).map(make_password, passwords,
+                                             chunksize=chunksize)
+    except BrokenProcessPool:
+        # a worker died, the next import starts a new pool
+        with pools_lock:
+            pools.pop(workers, None)
+        raise
+
+
+def import_students(rows: List[Dict[str, str]], batch_size: int = 500,
+                    workers: Optional[int] = None
+                    ) -> Iterator[Dict[str, Any]]:
+    """
+    Creates a CustomUser and a Students row for each validated row.
+
+    Args:
+        rows: the rows returned by validate_students.
+        batch_size: rows per bulk_create and per progress event.
+        workers: hashing processes, defaults to the number of CPUs.
+
+    Yields:
+        progress events: {"stage": "hashing", "done", "total"}, then
+        {"stage": "done", "created"} once the rows are committed.
+
+    Raises:
+        StudentImportError: when a username was taken while the import
+            ran; nothing has been written.
+    """
+    total = len(rows)
+    hashes = []
+    for hashed in hash_passwords([row['password'] for row in rows], workers):
+        hashes.append(hashed)
+        if len(hashes) % batch_size == 0 or len(hashes) == total:
+            yield {"stage": "hashing", "done": len(hashes), "total": total}
+
+    # runs to the commit within one step of the generator, a consumer
+    # closing it can only do so at a yield
+    insert_students(rows, hashes, batch_size)
+    yield {"stage": "done", "created": total}
+
+
+def insert_students(rows: List[Dict[str, str]], hashes: List[str],
+                    batch_size: int) -> None:
+    try:
+        with transaction.atomic():
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                users = CustomUser.objects.bulk_create([
+                    CustomUser(username=row['username'],
+                               email=row['email'],
+                               first_name=row['first_name'],
+                               last_name=row['last_name'],
+                               password=hashed,
+                               user_type=CustomUser.STUDENT)
+                    for row, hashed in zip(batch, hashes[start:])
+                ])
+                # bulk_create sends no post_save to index and record them
+                index_users(users)
+                known_names.add(users)
+                Students.objects.bulk_create([
+                    Students(admin=user,
+                             address=row['address'],
+                             gender=row['gender'],
+                             course_id_id=row['course_id'],
+                             semister_year_id_id=row['session_year_id'])
+                    for row, user in zip(batch, users)
+                ])
+            course_ids = {row['course_id'] for row in rows}
+            transaction.on_commit(lambda: invalidate(
+                staff_user_ids=staff_of_courses(course_ids)))
+    except IntegrityError:
+        raise StudentImportError(
+            [{"row": None, "error": "a username was taken during the import"}])
+
+
+def progress_lines(rows: List[Dict[str, str]], **options) -> Iterator[str]:
+    """
+    import_students() events as newline delimited JSON, a failed import
+    ending with {"stage": "error", "errors"}.
+    """
+    try:
+        for event in import_students(rows, **options):
+            yield json.dumps(event) + '\n'
+    except StudentImportError as error:
+        yield json.dumps({"stage": "error", "errors": error.errors}) + '\n'
@@ -1,3 +1,1136 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings as django_settings
+from django.contrib.messages import get_messages
+from django.db import connection
+from django.db.models.functions import Lower
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from school_management import settings as project_settings
+
+from . import EventViews, events, exports, forms, middleware, \
+    profile_pictures
+from .archive import archive_semister, verify_semister
+from .availability import STAMP_KEY, AvailabilityError, \
+    availability_cache, check_availability, known_names
+from .attendance import attendance_dates, rebuild_summaries, \
+    register_statuses, save_register, summary_drift, update_register
+from .benchmarks import BenchmarkError, Sample
+from .dashboard import admin_home_context, staff_home_context
+from .dashboard_cache import HOD, STAFF, STUDENT, cached_dashboard
+from .models import (
+    CustomUser, Staffs, Courses, Subjects, Students, SemisterModel,
+    Attendance, AttendanceReport, LeaveReportStaff, LeaveReportStudent,
+    StudentResult
+)
+from .dataset import SchoolGenerator
+from .events import NOTIFICATION, Broker
+from .leaves import LEAVE_REJECTED, moderate_leaves, on_leave
+from .notifications import BroadcastError, broadcast, mark_read, \
+    unread_count
+from .results import ResultsError, save_mark_sheet
+from .search import SearchError, search_people
+from .student_import import StudentImportError, validate_students
+from .StudentViews import student_home_context
+
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+
+class SchoolFixtureMixin:
+    '''
+    builds a small school whose size can be grown between assertions
+    '''
+
+    def setUp(self):
+        self.semister = SemisterModel.objects.create(
+            semister_starts=datetime.date(2024, 1, 1),
+            semister_ends=datetime.date(2024, 6, 30))
+        self.users = 0
+
+    def make_user(self, user_type: str) -> CustomUser:
+        self.users += 1
+        return CustomUser.objects.create(
+            username=f'user{self.users}',
+            first_name=f'First{self.users}',
+            last_name=f'Last{self.users}',
+            user_type=user_type)
+
+    def grow_school(self, courses: int, students_per_course: int) -> None:
+        for _ in range(courses):
+            staff = Staffs.objects.create(
+                admin=self.make_user(CustomUser.STAFF), address='')
+            course = Courses.objects.create(course_name='course')
+            subject = Subjects.objects.create(
+                subject_name='subject', course_id=course,
+                staff_id=staff.admin)
+            attendance = Attendance.objects.create(
+                subject_id=subject, attendance_date=datetime.date(2024, 2, 1),
+                semister_year_id=self.semister)
+            LeaveReportStaff.objects.create(
+                staff_id=staff, leave_start=datetime.date(2024, 2, 2),
+                leave_end=datetime.date(2024, 2, 2), leave_message='',
+                leave_status=1)
+            for index in range(students_per_course):
+                student = Students.objects.create(
+                    admin=self.make_user(CustomUser.STUDENT),
+                    address='', course_id=course,
+                    semister_year_id=self.semister)
+                AttendanceReport.objects.create(
+                    student_id=student, attendance_id=attendance,
+                    status=bool(index % 2))
+                LeaveReportStudent.objects.create(
+                    student_id=student, leave_start=datetime.date(2024, 2, 2),
+                    leave_end=datetime.date(2024, 2, 2), leave_message='',
+                    leave_status=1)
+        rebuild_summaries()
+
+
+class SchoolGeneratorTest(TestCase):
+
+    def test_generated_school_holds_the_requested_reports(self):
+        with self.assertRaises(BenchmarkError):
+            Sample()
+        counts = SchoolGenerator(courses=2, subjects=3, staffs=2,
+                                 students=5, reports=7).generate()
+        self.assertEqual(counts['AttendanceReport'], 7)
+        self.assertEqual(AttendanceReport.objects.count(), 7)
+        self.assertEqual(summary_drift(), [])
+        self.assertEqual(len(Sample().users()), 4)
+
+
+class AdminHomeContextTest(SchoolFixtureMixin, TestCase):
+
+    def count_queries(self) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            admin_home_context()
+        return len(queries)
+
+    def test_query_count_is_independent_of_school_size(self):
+        self.grow_school(courses=1, students_per_course=2)
+        small = self.count_queries()
+        self.grow_school(courses=5, students_per_course=10)
+        self.assertEqual(self.count_queries(), small)
+
+    def test_series_match_fixtures(self):
+        self.grow_school(courses=2, students_per_course=3)
+        context = admin_home_context()
+
+        self.assertEqual(context['all_student_count'], 6)
+        self.assertEqual(context['course_count'], 2)
+        self.assertEqual(context['subject_count_list'], [1, 1])
+        self.assertEqual(context['student_count_list_in_course'], [3, 3])
+        self.assertEqual(context['student_count_list_in_subject'], [3, 3])
+        self.assertEqual(context['staff_attendance_present_list'], [1, 1])
+        self.assertEqual(context['staff_attendance_leave_list'], [1, 1])
+        self.assertEqual(sum(context['student_attendance_present_list']), 2)
+        # absences plus one approved leave each
+        self.assertEqual(sum(context['student_attendance_leave_list']), 10)
+
+
+class StaffHomeContextTest(SchoolFixtureMixin, TestCase):
+
+    def count_queries(self, staff_user_id) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            staff_home_context(staff_user_id)
+        return len(queries)
+
+    def test_query_count_is_independent_of_teaching_load(self):
+        self.grow_school(courses=1, students_per_course=2)
+        staff_user_id = Subjects.objects.get().staff_id_id
+        small = self.count_queries(staff_user_id)
+        self.grow_school(courses=3, students_per_course=5)
+        Subjects.objects.update(staff_id=staff_user_id)
+        self.assertEqual(self.count_queries(staff_user_id), small)
+
+        context = staff_home_context(staff_user_id)
+        self.assertEqual(context['subject_count'], 4)
+        self.assertEqual(context['students_count'], 17)
+        self.assertEqual(context['attendance_list'], [1, 1, 1, 1])
+        self.assertEqual(sum(context['attendance_present_list']), 7)
+        self.assertEqual(sum(context['attendance_absent_list']), 10)
+        self.assertEqual(context['leave_count'], 1)
+
+
+class StudentHomeContextTest(SchoolFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.grow_school(courses=2, students_per_course=3)
+        self.student = Students.objects.order_by('id').first()
+        course = self.student.course_id
+        staff_id = Subjects.objects.get(course_id=course).staff_id
+        Subjects.objects.create(subject_name='another subject',
+                                course_id=course, staff_id=staff_id)
+        for subject in Subjects.objects.filter(course_id=course):
+            for day, present in ((5, True), (6, False), (7, True)):
+                save_register(subject.id, self.semister.id,
+                              datetime.date(2024, 2, day),
+                              [{"id": str(self.student.admin_id),
+                                "status": present}])
+
+    def test_counters_match_the_reports(self):
+        context = student_home_context(self.student.admin)
+        reports = AttendanceReport.objects.filter(student_id=self.student)
+        by_subject = {
+            name: tuple(
+                reports.filter(attendance_id__subject_id__subject_name=name,
+                               status=status).count()
+                for status in (True, False))
+            for name in context['subject_name']
+        }
+        self.assertEqual(context['subject_name'],
+                         ['another subject', 'subject'])
+        self.assertEqual(
+            list(zip(context['data_present'], context['data_absent'])),
+            [by_subject[name] for name in context['subject_name']])
+        self.assertEqual(context['total_attendance'], reports.count())
+        self.assertEqual(context['attendance_present'],
+                         reports.filter(status=True).count())
+        # the percentage the dashboard charts
+        self.assertAlmostEqual(
+            context['attendance_present'] / context['total_attendance'],
+            reports.filter(status=True).count() / reports.count())
+
+    def test_api_is_for_students_only(self):
+        url = reverse('api_student_home')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.make_user(CustomUser.STAFF))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_login(self.student.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(),
+                         student_home_context(self.student.admin))
+
+
+class RosterEndpointsTest(SchoolFixtureMixin, TestCase):
+
+    def fetch(self, url_name: str, data: dict):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse(url_name), data)
+            body = b''.join(response.streaming_content)
+        return json.loads(body), len(queries)
+
+    def roster_queries(self, subject: Subjects):
+        attendance = Attendance.objects.filter(subject_id=subject).first()
+        requests = {
+            'get_students': {'subject': subject.id,
+                             'session_year': self.semister.id},
+            'get_attendance_student': {'attendance_date': attendance.id},
+            'admin_get_attendance_student': {'attendance_date': attendance.id},
+        }
+        return {name: self.fetch(name, data) for name, data in requests.items()}
+
+    def test_rosters_run_a_single_query(self):
+        self.grow_school(courses=1, students_per_course=2)
+        subject = Subjects.objects.get()
+        small = self.roster_queries(subject)
+        self.grow_school(courses=1, students_per_course=20)
+        for name, (rows, queries) in self.roster_queries(subject).items():
+            self.assertEqual(queries, 1, name)
+            self.assertEqual(queries, small[name][1], name)
+            self.assertEqual(len(rows), 2, name)
+
+    def test_rosters_are_json_arrays(self):
+        self.grow_school(courses=1, students_per_course=3)
+        rows, _ = self.roster_queries(
+            Subjects.objects.get())['get_attendance_student']
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(set(rows[0]), {'id', 'name', 'status'})
+
+
+class DashboardInvalidationTest(SchoolFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.grow_school(courses=2, students_per_course=2)
+        self.builds = []
+
+    def view(self, role, user_id):
+        return cached_dashboard(role, user_id,
+                                lambda: self.builds.append(user_id) or {})
+
+    def rebuilt(self, *dashboards):
+        self.builds = []
+        for role, user_id in dashboards:
+            self.view(role, user_id)
+        return self.builds
+
+    def test_writes_drop_the_dashboards_they_change(self):
+        student = Students.objects.select_related('course_id').first()
+        subject = Subjects.objects.get(course_id=student.course_id)
+        other = Subjects.objects.exclude(id=subject.id).get()
+        dashboards = [(HOD, None), (STAFF, subject.staff_id_id),
+                      (STUDENT, student.admin_id), (STAFF, other.staff_id_id)]
+        self.rebuilt(*dashboards)
+        self.assertEqual(self.rebuilt(*dashboards), [])
+
+        attendance = Attendance.objects.create(
+            subject_id=subject, attendance_date=datetime.date(2024, 2, 5),
+            semister_year_id=self.semister)
+        self.rebuilt(*dashboards)
+        AttendanceReport.objects.create(student_id=student,
+                                        attendance_id=attendance, status=True)
+        self.assertEqual(self.rebuilt(*dashboards),
+                         [None, subject.staff_id_id, student.admin_id])
+
+        # the staff of the course the student leaves loses the student too
+        student.course_id = other.course_id
+        student.save()
+        self.assertEqual(
+            self.rebuilt(*dashboards),
+            [None, subject.staff_id_id, student.admin_id,
+             other.staff_id_id])
+
+        # and a subject changing hands drops its previous teacher's
+        previous_staff = subject.staff_id_id
+        subject.staff_id_id = other.staff_id_id
+        subject.save()
+        self.assertIn(previous_staff, self.rebuilt((STAFF, previous_staff)))
+
+
+class AttendanceRegisterTest(SchoolFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.grow_school(courses=2, students_per_course=3)
+        self.subject = Subjects.objects.first()
+        self.students = list(Students.objects.filter(
+            course_id=self.subject.course_id).order_by('id'))
+
+    def register(self, *statuses):
+        return [{"id": str(student.admin_id), "status": status}
+                for student, status in zip(self.students, statuses)]
+
+    def test_summaries_follow_the_registers(self):
+        attendance = save_register(self.subject.id, self.semister.id,
+                                   '2024-02-08',
+                                   self.register(True, False, True))
+        self.assertEqual(summary_drift(), [])
+        update_register(attendance.id, self.register(False, False, True))
+        self.assertEqual(summary_drift(), [])
+
+        # reports edited or deleted one at a time, as in the admin
+        report = AttendanceReport.objects.get(
+            attendance_id=attendance, student_id=self.students[1])
+        report.status = True
+        report.save()
+        self.assertEqual(summary_drift(), [])
+        report.delete()
+        self.assertEqual(summary_drift(), [])
+        AttendanceReport.objects.create(
+            attendance_id=attendance, student_id=self.students[1],
+            status=False)
+        self.assertEqual(summary_drift(), [])
+        attendance.delete()
+        self.assertEqual(summary_drift(), [])
+
+    def test_corrections_write_only_the_changed_rows(self):
+        attendance = save_register(self.subject.id, self.semister.id,
+                                   '2024-02-08',
+                                   self.register(True, False, True))
+        stranger = Students.objects.exclude(
+            course_id=self.subject.course_id).first()
+        entries = self.register(True, True, True) + [
+            {"id": str(stranger.admin_id), "status": False}]
+
+        with CaptureQueriesContext(connection) as captured:
+            summary = update_register(attendance.id, entries)
+        self.assertEqual(summary, {"changed": 1, "unchanged": 2,
+                                   "missing": [str(stranger.admin_id)]})
+        writes = [query['sql'] for query in captured.captured_queries
+                  if query['sql'].startswith('UPDATE')]
+        # one bulk_update of the reports, one bump of the summaries
+        self.assertEqual(len(writes), 2)
+        self.assertIn('"student_management_app_attendancereport"', writes[0])
+        self.assertEqual(
+            list(AttendanceReport.objects.filter(attendance_id=attendance)
+                 .order_by('student_id').values_list('student_id', 'status')),
+            [(student.id, True) for student in self.students])
+
+        self.assertEqual(update_register(attendance.id, entries[:3]),
+                         {"changed": 0, "unchanged": 3, "missing": []})
+
+    async def test_async_views_answer_like_the_sync_ones(self):
+        stranger = await Students.objects.exclude(
+            course_id=self.subject.course_id).afirst()
+        rejected = self.register(True) + [
+            {"id": str(stranger.admin_id), "status": True}]
+        response = await self.async_client.post(
+            reverse('async_save_attendance_data'), {
+                'subject_id': self.subject.id,
+                'session_year_id': self.semister.id,
+                'attendance_date': '2024-02-08',
+                'student_ids': json.dumps(rejected),
+            })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [
+            {"id": str(stranger.admin_id), "error": "student not in course"}])
+
+        response = await self.async_client.post(
+            reverse('async_save_attendance_data'), {
+                'subject_id': self.subject.id,
+                'session_year_id': self.semister.id,
+                'attendance_date': '2024-02-08',
+                'student_ids': json.dumps(self.register(True, False, True)),
+            })
+        self.assertEqual(response.status_code, 200)
+        attendance_id = response.json()['attendance_id']
+
+        response = await self.async_client.post(
+            reverse('async_update_attendance_data'), {
+                'attendance_date': attendance_id,
+                'student_ids': json.dumps(self.register(True, True, True)),
+            })
+        self.assertEqual(response.json(), {
+            "status": "OK", "changed": 1, "unchanged": 2, "missing": []})
+        self.assertEqual(await sync_to_async(summary_drift)(), [])
+
+    def save(self, entries):
+        self.client.force_login(self.subject.staff_id)
+        return self.client.post(reverse('save_attendance_data'), {
+            'subject_id': self.subject.id,
+            'session_year_id': self.semister.id,
+            'attendance_date': '2024-02-08',
+            'student_ids': json.dumps(entries),
+        })
+
+    def test_register_with_foreign_students_is_rejected(self):
+        stranger = Students.objects.exclude(
+            course_id=self.subject.course_id).first()
+        unknown = '00000000-0000-4000-8000-000000000000'
+        entries = self.register(True, False) + [
+            {"id": str(stranger.admin_id), "status": True},
+            {"id": unknown, "status": True},
+        ]
+        sessions = Attendance.objects.count()
+        reports = AttendanceReport.objects.count()
+
+        response = self.save(entries)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [
+            {"id": str(stranger.admin_id), "error": "student not in course"},
+            {"id": unknown, "error": "unknown student"},
+        ])
+        self.assertEqual(Attendance.objects.count(), sessions)
+        self.assertEqual(AttendanceReport.objects.count(), reports)
+
+    def test_students_are_resolved_with_one_query(self):
+        def queries(*statuses):
+            with CaptureQueriesContext(connection) as captured:
+                save_register(self.subject.id, self.semister.id,
+                              '2024-02-08', self.register(*statuses))
+            return [query['sql'] for query in captured.captured_queries]
+
+        two = queries(True, False)
+        three = queries(True, False, True)
+        self.assertEqual(len(three), len(two))
+        lookups = [sql for sql in three if sql.startswith('SELECT') and
+                   'FROM "student_management_app_students"' in sql]
+        self.assertEqual(len(lookups), 1)
+
+
+class AttendanceArchiveTest(SchoolFixtureMixin, TestCase):
+
+    def test_archived_semister_reads_the_same(self):
+        self.grow_school(courses=2, students_per_course=3)
+        subject = Subjects.objects.first()
+        attendance_id = Attendance.objects.get(subject_id=subject).id
+        dashboard = admin_home_context()
+        register = list(register_statuses(attendance_id))
+
+        state = archive_semister(self.semister.id, batch_size=1)
+        self.assertEqual((state.sessions, state.reports), (2, 6))
+        self.assertFalse(AttendanceReport.objects.exists())
+        self.assertEqual(verify_semister(self.semister.id), [])
+
+        rebuild_summaries()
+        self.assertEqual(admin_home_context(), dashboard)
+        self.assertEqual(list(register_statuses(attendance_id)), register)
+        self.assertEqual(
+            [row['id'] for row in
+             attendance_dates(subject.id, self.semister.id)],
+            [attendance_id])
+
+    def test_sessions_saved_after_the_run_are_moved_by_the_next(self):
+        self.grow_school(courses=1, students_per_course=2)
+        subject = Subjects.objects.get()
+        archive_semister(self.semister.id)
+        # committed by a register that passed its checks before the run
+        Attendance.objects.create(
+            subject_id=subject, attendance_date=datetime.date(2024, 3, 1),
+            semister_year_id=self.semister)
+        self.assertEqual(
+            len(list(attendance_dates(subject.id, self.semister.id))), 1)
+        self.assertNotEqual(verify_semister(self.semister.id), [])
+
+        archive_semister(self.semister.id)
+        self.assertEqual(verify_semister(self.semister.id), [])
+        self.assertEqual(
+            len(list(attendance_dates(subject.id, self.semister.id))), 2)
+
+
+class AttendanceExportTest(SchoolFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.grow_school(courses=2, students_per_course=2)
+        self.course = Courses.objects.first()
+        student = Students.objects.filter(course_id=self.course).first()
+        self.student = student.admin
+        # a control character and a formula, as a registration could save
+        self.student.first_name = '=HYPERLINK("http://evil")\x0b'
+        self.student.save()
+        self.client.force_login(self.make_user(CustomUser.HOD))
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_attendance'), {
+            'semister': self.semister.id, 'course': self.course.id,
+            'date_from': '2024-02-01', 'date_to': '2024-02-01', **params})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    @skipUnless(openpyxl, 'openpyxl is not installed')
+    def test_xlsx_opens_with_the_filtered_rows(self):
+        workbook = openpyxl.load_workbook(
+            io.BytesIO(self.export(format='xlsx')), read_only=True)
+        rows = list(workbook.worksheets[0].iter_rows(values_only=True))
+        self.assertEqual(rows[0], exports.HEADER)
+        # the other course is filtered out
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row[1] for row in rows[1:]}, {'course'})
+        row = next(row for row in rows if row[3] == str(self.student.id))
+        self.assertEqual(row[4], '\'=HYPERLINK("http://evil")')
+        self.assertEqual(row[0], '2024-02-01')
+
+        # the date range excludes every session
+        workbook = openpyxl.load_workbook(io.BytesIO(self.export(
+            format='xlsx', date_from='2024-03-01', date_to='2024-03-31')))
+        self.assertEqual(len(list(workbook.worksheets[0].values)), 1)
+
+    def test_csv_cells_are_sanitised(self):
+        rows = list(csv.reader(io.StringIO(self.export().decode())))
+        self.assertEqual(tuple(rows[0]), exports.HEADER)
+        self.assertEqual(len(rows), 3)
+        row = next(row for row in rows if row[3] == str(self.student.id))
+        self.assertEqual(row[4], '\'=HYPERLINK("http://evil")')
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StudentImportTest(SchoolFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.course = Courses.objects.create(course_name='course')
+        self.hod = self.make_user(CustomUser.HOD)
+        self.client.force_login(self.hod)
+
+    def row(self, number, **fields):
+        return {'first_name': 'Ada', 'last_name': 'Lovelace',
+                'username': f'ada{number}',
+                'email': f'ada{number}@school.test', 'password': 'secret',
+                'course_id': str(self.course.id),
+                'session_year_id': str(self.semister.id),
+                'address': 'Nairobi', 'gender': 'Female', **fields}
+
+    def upload(self, rows):
+        content = json.dumps(rows).encode()
+        return self.client.post(reverse('import_students'), {
+            'file': SimpleUploadedFile('students.json', content)})
+
+    def test_valid_file_is_enrolled(self):
+        response = self.upload([self.row(number) for number in range(3)])
+        events = [json.loads(line) for line in
+                  b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(events[-1], {'stage': 'done', 'created': 3})
+        students = Students.objects.filter(course_id=self.course)
+        self.assertEqual(
+            sorted(students.values_list('admin__username', flat=True)),
+            ['ada0', 'ada1', 'ada2'])
+        user = CustomUser.objects.get(username='ada1')
+        self.assertEqual(user.user_type, CustomUser.STUDENT)
+        self.assertTrue(user.check_password('secret'))
+
+    def test_every_row_error_is_reported(self):
+        rows = [
+            self.row(1, first_name='', email='not-an-email'),
+            self.row(2, course_id='nope', gender='Other'),
+            self.row(3, session_year_id=str(self.course.id)),
+            # the username and email of row 1
+            self.row(1),
+        ]
+        with self.assertRaises(StudentImportError) as raised:
+            validate_students(rows)
+        self.assertEqual(
+            [(error['row'], error['field'], error['error'])
+             for error in raised.exception.errors],
+            [(1, 'first_name', 'required'), (1, 'email', 'invalid'),
+             (2, 'course_id', 'invalid'), (2, 'gender', 'use Male or Female'),
+             (3, 'session_year_id', 'unknown semister'),
+             (4, 'username', 'duplicate in file')])
+
+        response = self.upload(rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.json()['errors']), 6)
+        self.assertFalse(Students.objects.exists())
+
+    def test_existing_users_are_taken(self):
+        rows = [self.row(1, username=self.hod.username),
+                self.row(2, email='ADA9@school.test')]
+        CustomUser.objects.filter(id=self.hod.id).update(
+            email='ada9@school.test')
+        # as another process would, publishing a new stamp on commit
+        availability_cache().set(STAMP_KEY, uuid.uuid4().hex)
+        response = self.upload(rows)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(error['row'], error['field'], error['error'])
+             for error in response.json()['errors']],
+            [(1, 'username', 'already taken'),
+             (2, 'email', 'already taken')])
+
+
+class HodListPaginationTest(SchoolFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        # every row is created today, the id breaks the ties
+        self.grow_school(courses=3, students_per_course=3)
+        self.client.force_login(self.make_user(CustomUser.HOD))
+
+    def pages(self, url, **params):
+        ids = []
+        response = self.client.get(url, {'page_size': 2, **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.json()['results'])
+            if response.json()['next'] is None:
+                return ids
+            response = self.client.get(response.json()['next'])
+
+    def test_pages_cover_every_row_once(self):
+        ids = self.pages(reverse('api_students'))
+        self.assertEqual(len(ids), 9)
+        self.assertEqual(set(ids), {str(pk) for pk in
+                                    Students.objects.values_list('id',
+                                                                 flat=True)})
+
+    def test_filters_narrow_the_rows(self):
+        course = Courses.objects.first()
+        ids = self.pages(reverse('api_students'), course=course.id)
+        self.assertEqual(set(ids), {str(pk) for pk in Students.objects.filter(
+            course_id=course).values_list('id', flat=True)})
+        response = self.client.get(reverse('api_students'),
+                                   {'course': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_cursor_and_other_roles_are_rejected(self):
+        response = self.client.get(reverse('api_staffs'), {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_login(self.make_user(CustomUser.STAFF))
+        response = self.client.get(reverse('api_staffs'))
+        self.assertEqual(response.status_code, 403)
+
+
+class ProfilePictureTest(SchoolFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        settings = self.settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.grow_school(courses=1, students_per_course=2)
+
+    def picture(self, colour='red', size=(1200, 600)):
+        image = io.BytesIO()
+        profile_pictures.Image.new('RGB', size, colour).save(image, 'PNG')
+        return SimpleUploadedFile('me.png', image.getvalue())
+
+    def stored(self, kind):
+        root = os.path.join(django_settings.MEDIA_ROOT, 'profile_pics', kind)
+        return sorted(name for _, _, names in os.walk(root) for name in names)
+
+    @skipUnless(profile_pictures.Image, 'Pillow is not installed')
+    def test_same_image_is_stored_once(self):
+        first, second = Students.objects.all()
+        profile_pictures.attach_profile_pic(first, self.picture())
+        profile_pictures.attach_profile_pic(second, self.picture())
+        self.assertEqual(len(self.stored('originals')), 1)
+        self.assertEqual(first.profile_pic.name, second.profile_pic.name)
+
+        profile_pictures.attach_profile_pic(second, self.picture('blue'))
+        self.assertEqual(len(self.stored('originals')), 2)
+
+    @skipUnless(profile_pictures.Image, 'Pillow is not installed')
+    def test_derivatives_are_rendered_by_digest(self):
+        student = Students.objects.first()
+        with self.captureOnCommitCallbacks() as callbacks:
+            profile_pictures.attach_profile_pic(student, self.picture())
+        self.assertEqual(len(callbacks), 1)
+        original = student.profile_pic.name
+
+        with mock.patch.object(profile_pictures.connections, 'close_all'):
+            profile_pictures.build_derivatives(student.id, original)
+        student.refresh_from_db()
+        web = profile_pictures.derivative_name(original, 'web')
+        self.assertEqual(student.profile_pic.name, web)
+        for kind, size in profile_pictures.DERIVATIVES.items():
+            name = profile_pictures.derivative_name(original, kind)
+            with profile_pictures.default_storage.open(name) as stored:
+                image = profile_pictures.Image.open(stored)
+                self.assertEqual(image.format, 'JPEG')
+                self.assertEqual(max(image.size), size)
+
+        # a later upload of the same picture is attached to them directly
+        other = Students.objects.exclude(id=student.id).get()
+        with self.captureOnCommitCallbacks() as callbacks:
+            profile_pictures.attach_profile_pic(other, self.picture())
+        self.assertEqual(callbacks, [])
+        self.assertEqual(other.profile_pic.name, web)
+
+    def add_student(self, picture):
+        self.client.force_login(self.make_user(CustomUser.HOD))
+        response = self.client.post(reverse('add_student_save'), {
+            'first_name': 'Ada', 'last_name': 'Lovelace',
+            'username': 'ada', 'email': 'ada@school.test',
+            'password': 'secret', 'address': 'Nairobi', 'gender': 'Female',
+            'course_id': Courses.objects.get().id,
+            'session_year_id': self.semister.id,
+            'profile_pic': picture,
+        })
+        self.assertRedirects(response, reverse('add_student'),
+                             fetch_redirect_response=False)
+        return [str(message) for message in
+                get_messages(response.wsgi_request)]
+
+    def test_non_image_is_rejected(self):
+        self.assertEqual(
+            self.add_student(SimpleUploadedFile('me.png', b'<svg></svg>')),
+            ['Failed to Add Student! The profile picture is not an image.'])
+        self.assertFalse(CustomUser.objects.filter(username='ada').exists())
+        self.assertEqual(self.stored('originals'), [])
+
+    @skipUnless(profile_pictures.Image, 'Pillow is not installed')
+    def test_other_failures_keep_the_generic_message(self):
+        with mock.patch.object(CustomUser.objects, 'create_user',
+                               side_effect=ValueError('bad username')):
+            self.assertEqual(self.add_student(self.picture()),
+                             ['Failed to Add Student!'])
+
+
+class MarkSheetTest(SchoolFixtureMixin, TestCase):
+
+    def test_sheet_is_upserted_with_constant_queries(self):
+        self.grow_school(courses=1, students_per_course=20)
+        subject = Subjects.objects.get()
+        admin_ids = [str(admin_id) for admin_id in
+                     Students.objects.values_list('admin_id', flat=True)]
+        sheet = [{'id': admin_id, 'assignment_marks': 20, 'exam_marks': 50}
+                 for admin_id in admin_ids]
+
+        with CaptureQueriesContext(connection) as queries:
+            summary = save_mark_sheet(subject.id, sheet, subject.staff_id_id)
+        self.assertLess(len(queries), 10)
+        self.assertEqual(summary,
+                         {'created': 20, 'updated': 0, 'unchanged': 0})
+
+        sheet[0]['exam_marks'] = 70
+        self.assertEqual(save_mark_sheet(subject.id, sheet),
+                         {'created': 0, 'updated': 1, 'unchanged': 19})
+        self.assertEqual(StudentResult.objects.count(), 20)
+
+    def test_row_errors_are_returned_together(self):
+        self.grow_school(courses=1, students_per_course=2)
+        subject = Subjects.objects.get()
+        admin_id = str(Students.objects.values_list(
+            'admin_id', flat=True).first())
+        sheet = [
+            {'id': admin_id, 'assignment_marks': -1, 'exam_marks': 50},
+            {'id': 'nope', 'assignment_marks': 1, 'exam_marks': 1},
+            {'id': str(subject.id), 'assignment_marks': 1, 'exam_marks': 1},
+        ]
+        with self.assertRaises(ResultsError) as raised:
+            save_mark_sheet(subject.id, sheet)
+        self.assertEqual([error['error'] for error in raised.exception.errors],
+                         ['invalid marks', 'invalid student id',
+                          'unknown student'])
+        self.assertFalse(StudentResult.objects.exists())
+
+
+class LeaveModerationTest(SchoolFixtureMixin, TestCase):
+
+    def test_leaves_are_moderated_with_one_update(self):
+        self.grow_school(courses=1, students_per_course=5)
+        leave_ids = [str(leave_id) for leave_id in
+                     LeaveReportStudent.objects.values_list('id', flat=True)]
+        unknown = str(self.semister.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            summary = moderate_leaves('student', leave_ids + [unknown],
+                                      'reject')
+        updates = [query for query in queries
+                   if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(summary, {'updated': 5, 'missing': [unknown]})
+        self.assertFalse(LeaveReportStudent.objects.exclude(
+            leave_status=LEAVE_REJECTED).exists())
+
+    def test_on_leave_matches_overlapping_ranges(self):
+        self.grow_school(courses=2, students_per_course=0)
+        LeaveReportStaff.objects.filter(
+            id=LeaveReportStaff.objects.first().id,
+        ).update(leave_start=datetime.date(2024, 1, 29),
+                 leave_end=datetime.date(2024, 2, 12))
+        self.assertEqual(on_leave(LeaveReportStaff, datetime.date(2024, 2, 5),
+                                  datetime.date(2024, 2, 11)).count(), 1)
+        self.assertEqual(on_leave(LeaveReportStaff, datetime.date(2024, 1, 29),
+                                  datetime.date(2024, 2, 4)).count(), 2)
+
+    def test_unknown_leave_is_reported(self):
+        self.grow_school(courses=1, students_per_course=1)
+        self.client.force_login(self.make_user(CustomUser.HOD))
+        leave = LeaveReportStudent.objects.get()
+        for leave_id, expected in ((leave.id, []),
+                                   (self.semister.id, ['Leave not found'])):
+            response = self.client.get(reverse(
+                'student_leave_reject', args=[leave_id]))
+            self.assertEqual(
+                [str(message) for message in
+                 get_messages(response.wsgi_request)], expected)
+        leave.refresh_from_db()
+        self.assertEqual(leave.leave_status, LEAVE_REJECTED)
+
+
+class LeaveDateMigrationTest(SimpleTestCase):
+
+    def test_free_text_dates_are_read(self):
+        migration = importlib.import_module(
+            'student_management_app.migrations.0009_leave_date_ranges')
+        applied = datetime.date(2024, 1, 15)
+        cases = [
+            ('2024-02-01', (datetime.date(2024, 2, 1),) * 2, None),
+            ('2024-02-01 to 2024-02-03',
+             (datetime.date(2024, 2, 1), datetime.date(2024, 2, 3)), None),
+            # day first, and reported as ambiguous
+            ('03/04/2024', (datetime.date(2024, 4, 3),) * 2, 'ambiguous'),
+            ('12/31/2024', (datetime.date(2024, 12, 31),) * 2, None),
+            ('next monday', (applied, applied), 'unreadable'),
+            (None, (applied, applied), 'unreadable'),
+        ]
+        for text, dates, doubt in cases:
+            with self.subTest(text=text):
+                self.assertEqual(migration.parse_leave_date(text, applied),
+                                 dates)
+                self.assertEqual(migration.leave_date_doubt(text), doubt)
+
+
+class BroadcastTest(SchoolFixtureMixin, TestCase):
+
+    def test_broadcast_reaches_the_course_and_updates_badges(self):
+        self.grow_school(courses=2, students_per_course=3)
+        course = Courses.objects.first()
+        student = Students.objects.filter(course_id=course).first().admin
+        staff = Subjects.objects.get(course_id=course).staff_id
+        self.assertEqual(unread_count(student), 0)
+        with self.assertNumQueries(0):
+            unread_count(student)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sent = broadcast('Exams start Monday', course=course.id)
+        self.assertEqual(sent, {'student': 3, 'staff': 1})
+        self.assertEqual(unread_count(student), 1)
+        self.assertEqual(unread_count(staff), 1)
+
+        self.assertEqual(mark_read(student), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(student), 0)
+
+    def test_a_chunk_is_published_in_one_callback(self):
+        self.grow_school(courses=1, students_per_course=3)
+        with mock.patch.object(events.broker, 'publish_many') as publish:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                broadcast('Exams start Monday', role='student')
+        # the unread counters and the events of the one chunk
+        self.assertEqual(len(callbacks), 2)
+        publish.assert_called_once()
+        self.assertEqual(len(publish.call_args.args[0]), 3)
+
+    def test_semister_with_staff_role_is_rejected(self):
+        self.grow_school(courses=1, students_per_course=2)
+        with self.assertRaises(BroadcastError) as raised:
+            broadcast('Exams start Monday', semister=self.semister.id,
+                      role='staff')
+        self.assertEqual([error['field'] for error in raised.exception.errors],
+                         ['semister'])
+        self.assertEqual(
+            broadcast('Exams start Monday', semister=self.semister.id),
+            {'student': 2})
+
+
+class QueryProfilerTest(SchoolFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        middleware.buffer.clear()
+        self.addCleanup(middleware.buffer.clear)
+
+    def test_profiled_request_is_summarised(self):
+        self.grow_school(courses=1, students_per_course=2)
+        with mock.patch.dict(os.environ, {'QUERY_PROFILER': '1'}):
+            profiled = importlib.reload(project_settings).MIDDLEWARE
+        importlib.reload(project_settings)
+        self.assertEqual(profiled[0], 'student_management_app.middleware.'
+                                      'QueryProfilerMiddleware')
+
+        with self.settings(MIDDLEWARE=profiled):
+            response = self.client.post(reverse('get_students'), {
+                'subject': Subjects.objects.get().id,
+                'session_year': self.semister.id})
+            b''.join(response.streaming_content)
+        summary = middleware.profile_summary()
+        self.assertEqual(list(summary), ['get_students'])
+        self.assertEqual(summary['get_students']['requests'], 1)
+        self.assertEqual(summary['get_students']['queries'],
+                         {'mean': 1, 'max': 1})
+        self.assertEqual(summary['get_students']['duplicate_queries'], [])
+
+    def test_samples_keep_fingerprints_only(self):
+        recorder = middleware.QueryRecorder()
+        statements = [f'SELECT {n}' for n in
+                      range(middleware.SAMPLE_DUPLICATES + 2)]
+        for runs, sql in enumerate(statements, start=2):
+            for _ in range(runs):
+                recorder(lambda *args: None, sql, (), False, {})
+        runs, texts = recorder.top_duplicates()
+        buffer = middleware.ProfileBuffer(size=2, statements=3)
+        for _ in range(3):
+            buffer.add(middleware.Sample('view', 1.0, recorder.count, 0.5,
+                                         runs), texts)
+        samples, kept = buffer.snapshot()
+        self.assertEqual(len(samples), 2)
+        self.assertEqual(len(samples[0].duplicates),
+                         middleware.SAMPLE_DUPLICATES)
+        self.assertTrue(all(len(key) == 16 for key in samples[0].duplicates))
+        # the two least repeated templates are not sampled, and only three
+        # of the sampled ones keep their text
+        self.assertEqual(len(kept), 3)
+        self.assertLess(set(kept.values()), set(statements[2:]))
+
+
+class EventBrokerTest(SimpleTestCase):
+
+    async def test_events_reach_the_streams_of_their_user(self):
+        broker = Broker()
+        first = broker.subscribe('user1')
+        second = broker.subscribe('user1')
+        other = broker.subscribe('user2')
+        event = {'type': NOTIFICATION, 'message': 'hello'}
+
+        # signal receivers publish from worker threads
+        reached = await asyncio.to_thread(broker.publish, ['user1'], event)
+        self.assertEqual(reached, 2)
+        for subscription in (first, second):
+            self.assertEqual(
+                await asyncio.wait_for(subscription.queue.get(), 1), event)
+        self.assertTrue(other.queue.empty())
+
+        for subscription in (first, second, other):
+            broker.unsubscribe(subscription)
+        self.assertEqual(broker.connections(), 0)
+
+
+class EventStreamTest(SchoolFixtureMixin, TestCase):
+
+    async def test_events_committed_while_counting_are_pushed(self):
+        student = await sync_to_async(self.make_user)(CustomUser.STUDENT)
+        await sync_to_async(self.client.force_login)(student)
+        self.async_client.cookies = self.client.cookies
+        event = {'type': NOTIFICATION, 'id': 1, 'message': 'hello'}
+
+        def counted(user):
+            # a broadcast committed while the count is read
+            events.broker.publish([user.id], event)
+            return 0
+
+        with mock.patch.object(EventViews, 'unread_count', counted):
+            response = await self.async_client.get(reverse('events'))
+        chunks = response.streaming_content
+        received = [await anext(chunks) for _ in range(3)]
+        # the server would close the stream when the client goes
+        for subscription in list(
+                events.broker.subscribers.get(str(student.id), ())):
+            events.broker.unsubscribe(subscription)
+        self.assertEqual(received[1], events.format_event(
+            {'type': 'unread', 'count': 0}).encode())
+        self.assertEqual(received[2], events.format_event(event).encode())
+
+
+class PeopleSearchTest(SchoolFixtureMixin, TestCase):
+
+    def found(self, query, **kwargs):
+        return [person['username'] for person in search_people(query,
+                                                               **kwargs)]
+
+    def test_prefixes_follow_user_changes(self):
+        self.grow_school(courses=1, students_per_course=2)
+        student = Students.objects.select_related('admin').first()
+        user = student.admin
+        user.first_name, user.email = 'Wanjiru', 'wanjiru.k@school.test'
+        user.save()
+
+        people = search_people('wan')
+        self.assertEqual([person['id'] for person in people], [user.id])
+        self.assertEqual(people[0]['kind'], 'student')
+        self.assertEqual(people[0]['profile_id'], student.id)
+        self.assertEqual(people[0]['course'], 'course')
+        # every word has to match, in any field
+        self.assertEqual(self.found(f'{user.last_name[:4]} wanj'),
+                         [user.username])
+        self.assertEqual(self.found('wanjiru', kind='staff'), [])
+        self.assertEqual(len(self.found('first')), 2)
+
+        user.first_name = 'Akinyi'
+        user.save(update_fields=['first_name'])
+        self.assertEqual(self.found('wanj akin'), [user.username])
+
+        # a user without reports, deleting a student would orphan them
+        other = self.make_user(CustomUser.HOD)
+        self.assertEqual(self.found(other.username), [other.username])
+        other.delete()
+        self.assertEqual(self.found(other.username), [])
+
+    def test_rejects_invalid_parameters(self):
+        with self.assertRaises(SearchError) as raised:
+            search_people('a', kind='parent', limit=500)
+        self.assertEqual([error['field'] for error in raised.exception.errors],
+                         ['kind', 'limit'])
+        self.assertEqual(search_people(' .@ '), [])
+
+
+class AvailabilityTest(SchoolFixtureMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        known_names.reset()
+
+    def test_unknown_names_need_no_query_with_a_shared_stamp(self):
+        shared = {'BACKEND': 'django.core.cache.backends.filebased.'
+                             'FileBasedCache',
+                  'LOCATION': tempfile.mkdtemp()}
+        with self.settings(CACHES={**django_settings.CACHES,
+                                   'availability': shared}):
+            self.addCleanup(shutil.rmtree, shared['LOCATION'], True)
+            user = self.make_user(CustomUser.STUDENT)
+            user.email = 'Taken@School.test'
+            user.save()
+            check_availability(['warmup'], [])
+
+            with self.assertNumQueries(0):
+                self.assertEqual(
+                    check_availability(['free1', 'free2'],
+                                       ['free@school.test']),
+                    {'usernames': {'free1': True, 'free2': True},
+                     'emails': {'free@school.test': True}})
+            # the taken values of a batch are confirmed with a single query
+            with self.assertNumQueries(1):
+                self.assertEqual(
+                    check_availability([user.username, 'free1'],
+                                       ['taken@school.test']),
+                    {'usernames': {user.username: False, 'free1': True},
+                     'emails': {'taken@school.test': False}})
+
+            # saved users are added to the filter without a rebuild
+            other = self.make_user(CustomUser.STAFF)
+            with self.assertNumQueries(1):
+                self.assertFalse(
+                    check_availability([other.username])['usernames'][
+                        other.username])
+
+    def test_users_written_without_signals_are_taken(self):
+        check_availability(['warmup'], [])
+        # as another process would, publishing a new stamp on commit
+        CustomUser.objects.bulk_create([CustomUser(
+            username='bulkuser', email='bulk@school.test')])
+        availability_cache().set(STAMP_KEY, uuid.uuid4().hex)
+        # the rebuild streams the users once, then the batch is confirmed
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                check_availability(['bulkuser'], ['BULK@school.test']),
+                {'usernames': {'bulkuser': False},
+                 'emails': {'BULK@school.test': False}})
+
+        # a per process stamp hears of nothing, so every value is queried
+        local = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        with self.settings(CACHES={**django_settings.CACHES,
+                                   'availability': local}):
+            CustomUser.objects.bulk_create([CustomUser(
+                username='bulkuser2', email='bulk2@school.test')])
+            self.assertEqual(
+                check_availability(['bulkuser2'], [])['usernames'],
+                {'bulkuser2': False})
+
+    @skipUnless(connection.vendor == 'sqlite', 'reads the SQLite plan')
+    def test_emails_are_looked_up_by_index(self):
+        users = CustomUser.objects.annotate(
+            email_lower=Lower('email')).filter(email_lower__in=['a@b.test'])
+        self.assertIn('customuser_email_lower_idx', users.explain())
+
+    def test_rejects_invalid_batches(self):
+        with self.assertRaises(AvailabilityError):
+            check_availability('user1', [])
+        with self.assertRaises(AvailabilityError):
+            check_availability(['user'] * 600, ['a@school.test'] * 600)
+
+    def test_bulk_checks_are_for_hods_only(self):
+        data = {'usernames': json.dumps(['user1'])}
+        self.client.force_login(self.make_user(CustomUser.STAFF))
+        response = self.client.post(reverse('check_availability'), data)
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_login(self.make_user(CustomUser.HOD))
+        response = self.client.post(reverse('check_availability'), data)
+        self.assertEqual(response.json()['usernames'], {'user1': False})
+
+
+class StudentFormChoicesTest(TestCase):
+
+    def test_importing_forms_runs_no_query(self):
+        with self.assertNumQueries(0):
+            importlib.reload(forms)
+
+    def test_choices_follow_course_changes(self):
+        course = Courses.objects.create(course_name='Biology')
+        form = forms.AddStudentForm()
+        self.assertIn((str(course.id), 'Biology'),
+                      list(form.fields['course_id'].choices))
+
+        # served from the cache until a course changes
+        with self.assertNumQueries(0):
+            list(forms.EditStudentForm().fields['course_id'].choices)
+
+        other = Courses.objects.create(course_name='Algebra')
+        self.assertEqual(
+            list(forms.EditStudentForm().fields['course_id'].choices),
+            [(str(other.id), 'Algebra'), (str(course.id), 'Biology')])
@@ -1,20 +1,23 @@
 from django.contrib import admin 
 from django.urls import path, include 
 from . import views 
-from .import HodViews, StaffViews, StudentViews 
+from .import HodViews, StaffViews, StaffAsyncViews, StudentViews, HodApiViews, EventViews 
 
 urlpatterns = [ 
 	path('admin/', admin.site.urls), 
 	path('contact', views.contact, name="contact"), 
 	path('login/', views.LoginUser.as_view(), name="login"), 
 	path('logout_user', views.LogoutView.as_view(), name="logout_user"), 
+	path('notifications/', views.Notifications.as_view(), name="notifications"), 
+	path('events/', EventViews.event_stream, name="events"), 
 	path('registration/', views.RegisterUser.as_view(), name="registration"), 
 	
 	# URLS for Student 
 	path('student_home/', StudentViews.student_home, name="student_home"), 
+	path('api/student_home/', StudentViews.StudentHome.as_view(), name="api_student_home"), 
 	path('student_profile/', StudentViews.StudentProfile.as_view(), name="student_profile"), 
 	path('student_profile_update/', StudentViews.StudentProfile.as_view(), name="student_profile_update"), 
-	path('student_view_result/', StudentViews.StudentViewResult.as_view() name="student_view_result"), 
+	path('student_view_result/', StudentViews.StudentViewResult.as_view(), name="student_view_result"), 
 
 
 	# URLS for Staff 
@@ -26,6 +29,10 @@ urlpatterns = [
 	path('get_attendance_dates/', StaffViews.get_attendance_dates, name="get_attendance_dates"), 
 	path('get_attendance_student/', StaffViews.get_attendance_student, name="get_attendance_student"), 
 	path('update_attendance_data/', StaffViews.update_attendance_data, name="update_attendance_data"), 
+	path('async/get_students/', StaffAsyncViews.get_students, name="async_get_students"), 
+	path('async/save_attendance_data/', StaffAsyncViews.save_attendance_data, name="async_save_attendance_data"), 
+	path('async/get_attendance_dates/', StaffAsyncViews.get_attendance_dates, name="async_get_attendance_dates"), 
+	path('async/update_attendance_data/', StaffAsyncViews.update_attendance_data, name="async_update_attendance_data"), 
 	path('staff_apply_leave/', StaffViews.staff_apply_leave, name="staff_apply_leave"), 
 	path('staff_apply_leave_save/', StaffViews.staff_apply_leave_save, name="staff_apply_leave_save"), 
 	path('staff_feedback/', StaffViews.staff_feedback, name="staff_feedback"), 
@@ -34,6 +41,7 @@ urlpatterns = [
 	path('staff_profile_update/', StaffViews.staff_profile_update, name="staff_profile_update"), 
 	path('staff_add_result/', StaffViews.staff_add_result, name="staff_add_result"), 
 	path('staff_add_result_save/', StaffViews.staff_add_result_save, name="staff_add_result_save"), 
+	path('staff_save_results/', StaffViews.staff_save_results, name="staff_save_results"), 
 	
 	# URL for Admin 
 	path('admin_home/', HodViews.admin_home, name="admin_home"), 
@@ -57,6 +65,7 @@ urlpatterns = [
 	path('delete_session/<session_id>/', HodViews.delete_session, name="delete_session"), 
 	path('add_student/', HodViews.add_student, name="add_student"), 
 	path('add_student_save/', HodViews.add_student_save, name="add_student_save"), 
+	path('import_students/', HodViews.import_students, name="import_students"), 
 	path('edit_student/<student_id>', HodViews.edit_student, name="edit_student"), 
 	path('edit_student_save/', HodViews.edit_student_save, name="edit_student_save"), 
 	path('manage_student/', HodViews.manage_student, name="manage_student"), 
@@ -69,6 +78,7 @@ urlpatterns = [
 	path('delete_subject/<subject_id>/', HodViews.delete_subject, name="delete_subject"), 
 	path('check_email_exist/', HodViews.check_email_exist, name="check_email_exist"), 
 	path('check_username_exist/', HodViews.check_username_exist, name="check_username_exist"), 
+	path('check_availability/', HodViews.check_availability_view, name="check_availability"), 
 	path('student_feedback_message/', HodViews.student_feedback_message, name="student_feedback_message"), 
 	path('student_feedback_message_reply/', HodViews.student_feedback_message_reply, name="student_feedback_message_reply"), 
 	path('staff_feedback_message/', HodViews.staff_feedback_message, name="staff_feedback_message"), 
@@ -79,10 +89,25 @@ urlpatterns = [
 	path('staff_leave_view/', HodViews.staff_leave_view, name="staff_leave_view"), 
 	path('staff_leave_approve/<leave_id>/', HodViews.staff_leave_approve, name="staff_leave_approve"), 
 	path('staff_leave_reject/<leave_id>/', HodViews.staff_leave_reject, name="staff_leave_reject"), 
+	path('moderate_leaves/', HodViews.moderate_leaves_view, name="moderate_leaves"), 
+	path('broadcast_notification/', HodViews.broadcast_notification, name="broadcast_notification"), 
 	path('admin_view_attendance/', HodViews.admin_view_attendance, name="admin_view_attendance"), 
 	path('admin_get_attendance_dates/', HodViews.admin_get_attendance_dates, name="admin_get_attendance_dates"), 
 	path('admin_get_attendance_student/', HodViews.admin_get_attendance_student, name="admin_get_attendance_student"), 
+	path('export_attendance/', HodViews.export_attendance, name="export_attendance"), 
+	path('query_profile/', HodViews.query_profile, name="query_profile"), 
+	path('dashboard_cache_stats/', HodViews.dashboard_cache_stats, name="dashboard_cache_stats"), 
 	path('admin_profile/', HodViews.admin_profile, name="admin_profile"), 
 	path('admin_profile_update/', HodViews.admin_profile_update, name="admin_profile_update"), 
+
+	# Paginated JSON lists for the Admin manage pages 
+	path('api/students/', HodApiViews.StudentListView.as_view(), name="api_students"), 
+	path('api/staffs/', HodApiViews.StaffListView.as_view(), name="api_staffs"), 
+	path('api/subjects/', HodApiViews.SubjectListView.as_view(), name="api_subjects"), 
+	path('api/student_leaves/', HodApiViews.LeaveReportStudentListView.as_view(), name="api_student_leaves"), 
+	path('api/staff_leaves/', HodApiViews.LeaveReportStaffListView.as_view(), name="api_staff_leaves"), 
+	path('api/student_feedback/', HodApiViews.FeedBackStudentListView.as_view(), name="api_student_feedback"), 
+	path('api/staff_feedback/', HodApiViews.FeedBackStaffsListView.as_view(), name="api_staff_feedback"), 
+	path('api/people/', HodApiViews.PeopleSearchView.as_view(), name="api_people_search"), 
 	
 ] 
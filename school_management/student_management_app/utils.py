@@ -0,0 +1,85 @@
+'''
+Small helpers shared across the app.
+'''
+import uuid
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Sequence,
+    Union
+)
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of a non empty sequence.
+
+    Args:
+        values: the samples, in any order.
+        percent: the percentile to read, between 0 and 100.
+
+    Returns:
+        the sample at that rank.
+    """
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def is_uuid(value: Any) -> bool:
+    """
+    Tells whether a posted value is a valid UUID primary key.
+    """
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return value is not None
+
+
+def json_array_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Encodes rows as a JSON array one element at a time.
+    """
+    encoder = DjangoJSONEncoder()
+    separator = '['
+    for row in rows:
+        yield separator + encoder.encode(row)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+async def ajson_array_chunks(rows: AsyncIterable[Dict[str, Any]]
+                             ) -> AsyncIterator[str]:
+    """
+    Async json_array_chunks().
+    """
+    encoder = DjangoJSONEncoder()
+    separator = '['
+    async for row in rows:
+        yield separator + encoder.encode(row)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+def stream_json_array(rows: Union[Iterable[Dict[str, Any]],
+                                  AsyncIterable[Dict[str, Any]]]
+                      ) -> StreamingHttpResponse:
+    """
+    Streams rows to the client as a JSON array, encoding each row once
+    while the underlying query is still being read.
+
+    Args:
+        rows: iterable of JSON serialisable dicts, typically built from
+            a values() queryset iterator, or an async iterable of them
+            for the ASGI views.
+
+    Returns:
+        StreamingHttpResponse with an application/json body.
+    """
+    if hasattr(rows, '__aiter__'):
+        chunks = ajson_array_chunks(rows)
+    else:
+        chunks = json_array_chunks(rows)
+    return StreamingHttpResponse(chunks, content_type='application/json')
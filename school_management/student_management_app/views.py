@@ -8,6 +8,9 @@ from typing import Dict
 from django.contrib import messages
 from django.http import HttpRequest, HttpResponse
 from rest_framework.permissions import IsAuthenticated
+from django.core.exceptions import ValidationError
+
+from .notifications import mark_read, unread_count
 
 
 def contact(request: HttpRequest)-> HttpResponse:
@@ -184,3 +187,33 @@ class LogoutView(APIView):
         logout(request) 
         return Response({"message": "Successfully logged out"})
 
+
+class Notifications(APIView):
+    """
+    Unread notification count of the logged in student or staff member.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns the unread count, served from the cache.
+        """
+        return Response({"unread": unread_count(request.user)})
+
+    def post(self, request, *args, **kwargs):
+        """
+        Marks notifications as read: those listed in ids, or all of them
+        when ids is absent.
+
+        Returns:
+            Response with the number marked and the new unread count.
+        """
+        ids = request.data.get('ids')
+        if ids is not None and not isinstance(ids, list):
+            return Response({"error": "ids must be a list"}, status=400)
+        try:
+            marked = mark_read(request.user, ids)
+        except (ValidationError, ValueError):
+            return Response({"error": "invalid notification id"}, status=400)
+        return Response({"marked": marked,
+                         "unread": unread_count(request.user)})